@@ -77,6 +77,7 @@ contrib = None
 # Handlers
 SESSION_HANDLER = None
 TICKER_HANDLER = None
+TASK_HANDLER = None
 MONITOR_HANDLER = None
 CHANNEL_HANDLER = None
 
@@ -124,7 +125,7 @@ def _init():
     global search_object, search_script, search_player, search_channel, search_help, search_tag
     global create_object, create_script, create_player, create_channel, create_message, create_help_entry
     global settings,lockfuncs, logger, utils, gametime, ansi, spawn, managers
-    global contrib, TICKER_HANDLER, MONITOR_HANDLER, SESSION_HANDLER, CHANNEL_HANDLER
+    global contrib, TICKER_HANDLER, TASK_HANDLER, MONITOR_HANDLER, SESSION_HANDLER, CHANNEL_HANDLER
 
     from .players.players import DefaultPlayer
     from .players.players import DefaultGuest
@@ -173,6 +174,7 @@ def _init():
 
     # handlers
     from .scripts.tickerhandler import TICKER_HANDLER
+    from .scripts.taskhandler import TASK_HANDLER
     from .server.sessionhandler import SESSION_HANDLER
     from .comms.channelhandler import CHANNEL_HANDLER
     from .scripts.monitorhandler import MONITOR_HANDLER
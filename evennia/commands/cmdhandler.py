@@ -227,9 +227,11 @@ def get_and_merge_cmdsets(caller, session, player, obj, callertype):
                 if location:
                     # Gather all cmdsets stored on objects in the room and
                     # also in the caller's inventory and the location itself
-                    local_objlist = yield (location.contents_get(exclude=obj) +
-                                           obj.contents_get() + [location])
-                    local_objlist = [o for o in local_objlist if not o._is_deleted]
+                    local_objlist = yield [lobj for lobj in
+                                           chain(location.contents_cache.get_partition(),
+                                                 obj.contents_cache.get_partition(),
+                                                 (location,))
+                                           if lobj is not obj]
                     for lobj in local_objlist:
                         try:
                             # call hook in case we need to do dynamic changing to cmdset
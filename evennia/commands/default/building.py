@@ -9,7 +9,7 @@ from django.db.models import Q
 from evennia.objects.models import ObjectDB
 from evennia.locks.lockhandler import LockException
 from evennia.commands.cmdhandler import get_and_merge_cmdsets
-from evennia.utils import create, utils, search
+from evennia.utils import create, utils, search, logger
 from evennia.utils.utils import inherits_from, class_from_module
 from evennia.utils.eveditor import EvEditor
 from evennia.utils.spawner import spawn
@@ -618,9 +618,13 @@ class CmdDestroy(COMMAND_DEFAULT_CLASS):
     switches:
        override - The @destroy command will usually avoid accidentally
                   destroying player objects. This switch overrides this safety.
+       tree - also destroy everything inside the objects, like a whole
+              zone. Characters of players and objects you may not
+              delete are moved to their homes.
     examples:
        @destroy house, roof, door, 44-78
        @destroy 5-10, flower, 45
+       @destroy/tree 100-400
 
     Destroys one or many objects. If dbrefs are used, a range to delete can be
     given, e.g. 4-10. Also the end points will be deleted.
@@ -657,6 +661,11 @@ class CmdDestroy(COMMAND_DEFAULT_CLASS):
                         "Re-point settings.DEFAULT_HOME to another " \
                         "object before continuing." % objname
 
+            if "tree" in self.switches:
+                # deleted together at the end
+                tree.append(obj)
+                return ""
+
             had_exits = hasattr(obj, "exits") and obj.exits
             had_objs = hasattr(obj, "contents") and any(obj for obj in obj.contents
                                                         if not (hasattr(obj, "exits") and obj not in obj.exits))
@@ -672,7 +681,18 @@ class CmdDestroy(COMMAND_DEFAULT_CLASS):
                     string += " Objects inside %s were moved to their homes." % objname
             return string
 
+        def _tree_deleted(deleted):
+            "Report when all chunks of a /tree deletion are done"
+            caller.msg("%i object%s destroyed." % (len(deleted), "" if len(deleted) == 1 else "s"))
+
+        def _tree_failed(failure):
+            "Report a /tree deletion that stopped halfway"
+            logger.log_err("@destroy/tree: %s" % failure.getTraceback())
+            caller.msg("ERROR: Destroying stopped with an error (%s). Objects not yet "
+                       "destroyed were left in place." % failure.getErrorMessage())
+
         string = ""
+        tree = []
         for objname in self.lhslist:
             if '-' in objname:
                 # might be a range of dbrefs
@@ -685,6 +705,10 @@ class CmdDestroy(COMMAND_DEFAULT_CLASS):
                     string += delobj(objname)
             else:
                 string += delobj(objname, True)
+        if tree:
+            string += "\nDestroying %s and everything inside ..." % ", ".join(obj.name for obj in tree)
+            deferred = ObjectDB.objects.delete_objects(tree, cooperative=True, accessing_obj=caller)
+            deferred.addCallbacks(_tree_deleted, _tree_failed)
         if string:
             caller.msg(string.strip())
 
@@ -488,7 +488,7 @@ class CmdOption(COMMAND_DEFAULT_CLASS):
 
             if "save" in self.switches:
                 # save all options
-                self.caller.db._saved_protocol_flags = flags
+                self.caller.db._saved_protocol_flags = dict(flags)
                 self.msg("{gSaved all options. Use @option/clear to remove.{n")
             if "clear" in self.switches:
                 # clear all saves
@@ -15,9 +15,10 @@ main test suite started with
 import re
 
 from django.conf import settings
-from mock import Mock
+from mock import Mock, patch
 
 from evennia.commands.default.cmdset_character import CharacterCmdSet
+from evennia.objects.models import ObjectDB
 from evennia.utils.test_resources import EvenniaTest
 from evennia.commands.default import help, general, system, admin, player, building, batchprocess, comms
 from evennia.utils import ansi, utils
@@ -232,6 +233,12 @@ class TestBuilding(CommandTest):
     def test_wipe(self):
         self.call(building.CmdDestroy(), "Obj", "Obj was destroyed.")
 
+    def test_wipe_tree_error(self):
+        from twisted.internet.defer import fail
+        with patch.object(ObjectDB.objects, "delete_objects", return_value=fail(RuntimeError("boom"))):
+            with patch("evennia.commands.default.building.logger"):
+                self.call(building.CmdDestroy(), "/tree Obj", "ERROR: Destroying stopped with an error (boom).")
+
     def test_dig(self):
         self.call(building.CmdDig(), "TestRoom1=testroom;tr,back;b", "Created room TestRoom1")
 
@@ -5,13 +5,16 @@ Comm system components.
 """
 from __future__ import print_function
 
+from django.conf import settings
 from django.db import models
 from django.db.models import Q
 from evennia.typeclasses.managers import (TypedObjectManager, TypeclassManager,
                                           returns_typeclass_list, returns_typeclass)
+from evennia.typeclasses.searchindex import get_search_index
 from evennia.utils import logger
 
 _GA = object.__getattribute__
+_AGGRESSIVE_CACHE = settings.TYPECLASS_AGGRESSIVE_CACHE
 _PlayerDB = None
 _ObjectDB = None
 _ChannelDB = None
@@ -340,6 +343,23 @@ class ChannelDBManager(TypedObjectManager):
         """
         return self.all()
 
+    def _search_index_exact(self, ostring):
+        """
+        Find channels by exact key or alias through the search index.
+
+        Args:
+            ostring (str): The key or alias to look for.
+
+        Returns:
+            channels (list): The channels with a matching key or, if
+                there are none, the channels with a matching alias.
+
+        """
+        ostring = ostring.strip().lower()
+        channels = self.get_by_ids(get_search_index(self.model).exact(ostring))
+        keymatches = [channel for channel in channels if channel.db_key.lower() == ostring]
+        return keymatches or channels
+
     @returns_typeclass
     def get_channel(self, channelkey):
         """
@@ -353,6 +373,9 @@ class ChannelDBManager(TypedObjectManager):
             channel (Channel or None): A channel match.
 
         """
+        if _AGGRESSIVE_CACHE:
+            channels = self._search_index_exact(channelkey)
+            return channels[0] if channels else None
         # first check the channel key
         channels = self.filter(db_key__iexact=channelkey)
         if not channels:
@@ -401,6 +424,9 @@ class ChannelDBManager(TypedObjectManager):
             channels = self.filter(id=dbref)
         except Exception:
             pass
+        if not channels and exact and _AGGRESSIVE_CACHE:
+            # keys and aliases are in the search index
+            return self._search_index_exact(ostring)
         if not channels:
             # no id match. Search on the key.
             if exact:
@@ -410,7 +436,7 @@ class ChannelDBManager(TypedObjectManager):
         if not channels:
             # still no match. Search by alias.
             channels = [channel for channel in self.all()
-                        if ostring.lower() in [a.lower
+                        if ostring.lower() in [a.lower()
                             for a in channel.aliases.all()]]
         return channels
 
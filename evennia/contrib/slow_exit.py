@@ -72,11 +72,11 @@ class SlowExit(DefaultExit):
 
         traversing_object.msg("You start moving %s at a %s." % (self.key, move_speed))
         # create a delayed movement
-        deferred = utils.delay(move_delay, callback=move_callback)
-        # we store the deferred on the character, this will allow us
+        task = utils.delay(move_delay, callback=move_callback)
+        # we store the task on the character, this will allow us
         # to abort the movement. We must use an ndb here since
-        # deferreds cannot be pickled.
-        traversing_object.ndb.currently_moving = deferred
+        # tasks cannot be pickled.
+        traversing_object.ndb.currently_moving = task
 
 
 #
@@ -133,7 +133,7 @@ class CmdStop(Command):
     def func(self):
         """
         This is a very simple command, using the
-        stored deferred from the exit traversal above.
+        stored task from the exit traversal above.
         """
         currently_moving = self.caller.ndb.currently_moving
         if currently_moving:
@@ -2,20 +2,34 @@
 Custom manager for Objects.
 """
 import re
+from collections import OrderedDict, defaultdict
 from itertools import chain
+from django.db import transaction
 from django.db.models import Q
 from django.conf import settings
 from django.db.models.fields import exceptions
-from evennia.typeclasses.managers import TypedObjectManager, TypeclassManager
+from django.utils.translation import ugettext as _
+from evennia.typeclasses.managers import TypedObjectManager, TypeclassManager, bulk_create_with_ids
 from evennia.typeclasses.managers import returns_typeclass, returns_typeclass_list
+from evennia.typeclasses.searchindex import get_search_index
 from evennia.utils.utils import to_unicode, is_iter, make_iter, string_partial_matching
+from evennia.utils.utils import class_from_module
+from evennia.utils.logger import log_trace, log_err
 from builtins import int
 
 __all__ = ("ObjectManager",)
 _GA = object.__getattribute__
+_AGGRESSIVE_CACHE = settings.TYPECLASS_AGGRESSIVE_CACHE
 
 # delayed import
 _ATTR = None
+_MONITOR_HANDLER = None
+_ScriptDB = None
+
+# objects per chunk (and transaction) when deleting objects in bulk
+_DELETE_CHUNK_SIZE = 200
+
+_ERRTXT = "Couldn't perform move ('%s'). Contact an admin."
 
 _MULTIMATCH_REGEX = re.compile(settings.SEARCH_MULTIMATCH_REGEX, re.I + re.U)
 
@@ -250,6 +264,17 @@ class ObjectDBManager(TypedObjectManager):
             # if candidates is an empty iterable there can be no matches
             # Exit early.
             return []
+        if _AGGRESSIVE_CACHE:
+            if candidates is not None:
+                # the candidates and their aliases are already in memory
+                return self._match_candidates(ostring, exact, candidates, typeclasses)
+            # global search; find the candidates with the search index
+            index = get_search_index(self.model)
+            dbids = index.exact(ostring) if exact else index.prefix(ostring)
+            matches = self.get_by_ids(dbids, typeclasses=typeclasses)
+            if exact or not matches:
+                return matches
+            return self._match_candidates(ostring, False, matches)
 
         # build query objects
         candidates_id = [_GA(obj, "id") for obj in make_iter(candidates) if obj]
@@ -288,6 +313,60 @@ class ObjectDBManager(TypedObjectManager):
                 return [alias_candidates[ind] for ind in index_matches]
             return []
 
+    def _match_candidates(self, ostring, exact, candidates, typeclasses=None):
+        """
+        In-memory version of `get_objs_with_key_or_alias`, used when
+        searching among candidates. Candidates are usually the contents
+        of a room and an inventory, which are already cached, as are
+        their aliases once read, so this avoids querying the database.
+
+        Args:
+            ostring (str): A search criterion.
+            exact (bool): Require exact (but case-insensitive) match
+                of ostring, otherwise use `string_partial_matching`.
+            candidates (list): Only match among these candidates.
+            typeclasses (list, optional): Only match objects with these
+                typeclass paths.
+
+        Returns:
+            matches (list): A list of matches of length 0, 1 or more.
+
+        """
+        # sort and make unique by id, the way the database would have
+        candidates = dict((_GA(obj, "id"), obj) for obj in make_iter(candidates)
+                          if obj and _GA(obj, "id"))
+        candidates = [candidates[dbid] for dbid in sorted(candidates)]
+        if typeclasses:
+            typeclasses = make_iter(typeclasses)
+            candidates = [obj for obj in candidates
+                          if _GA(obj, "db_typeclass_path") in typeclasses]
+        ostring = to_unicode(ostring).lower()
+
+        def _aliases(obj):
+            # aliases of every category match, like in the database search
+            return [to_unicode(alias).lower() for alias in obj.aliases.search_names()]
+
+        if exact:
+            return [obj for obj in candidates
+                    if _GA(obj, "db_key").lower() == ostring or ostring in _aliases(obj)]
+
+        # fuzzy matching
+        key_strings = [_GA(obj, "db_key") for obj in candidates]
+        index_matches = string_partial_matching(key_strings, ostring, ret_index=True)
+        if index_matches:
+            # a match by key
+            return [obj for ind, obj in enumerate(candidates) if ind in index_matches]
+        # match by alias rather than by key
+        alias_strings = []
+        alias_candidates = []
+        for candidate in candidates:
+            aliases = _aliases(candidate)
+            if any(ostring in alias for alias in aliases):
+                alias_strings.extend(aliases)
+                alias_candidates.extend([candidate] * len(aliases))
+        index_matches = string_partial_matching(alias_strings, ostring, ret_index=True)
+        return [alias_candidates[ind] for ind in index_matches]
+
     # main search methods and helper functions
 
     @returns_typeclass_list
@@ -417,6 +496,530 @@ class ObjectDBManager(TypedObjectManager):
     # ObjectManager Copy method
     #
 
+    def move_objects(self, objects, destination, quiet=False, emit_to_obj=None,
+                     use_destination=True, to_none=False, move_hooks=True):
+        """
+        Move a group of objects to the same destination together, like
+        a party of followers or everyone in an area. This works like
+        calling `move_to` on each object, but the new location of all
+        objects is stored with one database query, the contents cache
+        of each location is updated once and each location gets one
+        announcement for the whole group.
+
+        Args:
+            objects (list): The objects to move.
+            destination (Object): Where to move them. If this is an
+                exit, its destination is used.
+            quiet (bool, optional): Don't announce the move.
+            emit_to_obj (Object, optional): Object to receive error
+                messages. Defaults to the object that failed to move.
+            use_destination (bool, optional): If unset, allow moving
+                the objects "inside" an exit.
+            to_none (bool, optional): Allow `destination` to be `None`.
+                No hooks are called in that case.
+            move_hooks (bool, optional): If unset, don't call any
+                move-related hooks.
+
+        Returns:
+            moved (list): The objects that were moved.
+
+        Notes:
+            No access checks are done in this method.
+
+            The hooks called (if `move_hooks=True`) are, in order:
+
+             1. `obj.at_before_move(destination)` for each object (if
+                this returns False, that object stays)
+             2. `source_location.at_objects_leave(objs, destination)`
+             3. `source_location.announce_objects_leave(objs, destination)`
+             4. (move happens here)
+             5. `destination.announce_objects_arrive(objs, source_location)`
+             6. `destination.at_objects_receive(objs, source_location)`
+             7. `obj.at_after_move(source_location)` for each object
+
+            Hooks 2-6 are called once for each location the objects
+            are moved from, with the objects moved from it. The
+            announce hooks are only called if `quiet` is unset.
+
+        """
+        global _MONITOR_HANDLER
+        if not _MONITOR_HANDLER:
+            from evennia.scripts.monitorhandler import MONITOR_HANDLER as _MONITOR_HANDLER
+
+        def _logerr(obj, hookname, err=None):
+            "Log an error and tell the object it could not move"
+            log_trace()
+            (emit_to_obj or obj).msg("%s%s" % (_(_ERRTXT) % hookname, "" if err is None else " (%s)" % err))
+
+        objects = list(OrderedDict((obj, None) for obj in make_iter(objects) if obj))
+        if not destination:
+            if not to_none:
+                for obj in objects:
+                    (emit_to_obj or obj).msg(_("The destination doesn't exist."))
+                return []
+            move_hooks = quiet = False
+        elif destination.destination and use_destination:
+            # traverse exits
+            destination = destination.destination
+
+        if move_hooks:
+            vetoed = []
+            for obj in objects:
+                try:
+                    if not obj.at_before_move(destination):
+                        vetoed.append(obj)
+                except Exception as err:
+                    _logerr(obj, "at_before_move()", err)
+                    vetoed.append(obj)
+            objects = [obj for obj in objects if obj not in vetoed]
+
+        # don't move anything into itself
+        loop, location, depth = set(), destination, 0
+        while location and depth <= 10:
+            loop.add(location.id)
+            location, depth = location.db_location, depth + 1
+        for obj in objects:
+            if obj.id in loop:
+                (emit_to_obj or obj).msg("Error: %s.location = %s creates a location loop." % (obj.key, destination))
+        objects = [obj for obj in objects if obj.id not in loop]
+
+        # group the objects by where they come from
+        groups = OrderedDict()
+        for obj in objects:
+            groups.setdefault(obj.location, []).append(obj)
+
+        for source_location, group in groups.items():
+            if not source_location:
+                continue
+            hookname = None
+            try:
+                if move_hooks:
+                    hookname = "at_objects_leave()"
+                    source_location.at_objects_leave(group, destination)
+                if not quiet:
+                    hookname = "announce_objects_leave()"
+                    source_location.announce_objects_leave(group, destination)
+            except Exception as err:
+                for obj in group:
+                    _logerr(obj, hookname, err)
+                del groups[source_location]
+
+        moved = [obj for group in groups.values() for obj in group]
+        if not moved:
+            return []
+
+        # perform the move
+        self.filter(id__in=[obj.id for obj in moved]).update(db_location=destination)
+        for obj in moved:
+            obj.db_location = destination
+            if obj in _MONITOR_HANDLER.monitors:
+                _MONITOR_HANDLER.at_update(obj, "db_location")
+        for source_location, group in groups.items():
+            if source_location:
+                source_location.contents_cache.remove(group)
+        if destination:
+            destination.contents_cache.add(moved)
+
+        for source_location, group in groups.items():
+            try:
+                if not quiet:
+                    destination.announce_objects_arrive(group, source_location)
+                if move_hooks:
+                    destination.at_objects_receive(group, source_location)
+            except Exception as err:
+                _logerr(group[0], "at_objects_receive()", err)
+        if move_hooks:
+            for source_location, group in groups.items():
+                for obj in group:
+                    try:
+                        obj.at_after_move(source_location)
+                    except Exception as err:
+                        _logerr(obj, "at_after_move()", err)
+        return moved
+
+    def batch_create_objects(self, createdicts):
+        """
+        Create many objects at once, for example when spawning a horde
+        of mobs or filling a new area. The objects, their Tags and
+        their Attributes are inserted with a few bulk database queries
+        instead of one save per object, Tag and Attribute. The creation
+        hooks are then called on each object, like when using
+        `create.create_object`.
+
+        Args:
+            createdicts (list): One dict per object to create, with the
+                keys `typeclass`, `key`, `location`, `home`,
+                `destination`, `permissions`, `locks`, `aliases` and
+                `tags` as for `create.create_object`, plus `attributes`
+                and `nattributes` (dicts of name:value). Missing keys
+                are treated as `None`. Locations must be given as
+                Objects, not as #dbrefs.
+
+        Returns:
+            objects (list): The new objects, in the order of
+                `createdicts`.
+
+        Notes:
+            The hooks are called in the following order:
+
+             1. `obj.basetype_setup()` and `obj.at_object_creation()`
+                for each object, after which the given `key`,
+                `location`, `home`, `destination` and `locks` are
+                re-applied, since the create call overrides the hooks.
+             2. (permissions, aliases, tags and Attributes of all
+                objects are added here)
+             3. `location.at_object_receive(obj, None)` and
+                `obj.at_after_move(None)` for each object with a
+                location, then the nattributes are set and
+                `obj.basetype_posthook_setup()` is called.
+
+            The `at_first_save` hook is not called, nor the
+            `at_<field>_postsave` hooks.
+
+            Everything is done in one transaction, so if anything
+            fails, none of the objects are created.
+
+        """
+        dbmodel = self.model.__dbclass__
+        typeclasses = {}
+        instances = []
+        for cdict in createdicts:
+            typeclass = cdict.get("typeclass") or settings.BASE_OBJECT_TYPECLASS
+            if isinstance(typeclass, basestring):
+                if typeclass not in typeclasses:
+                    typeclasses[typeclass] = class_from_module(typeclass, settings.TYPECLASS_PATHS)
+                typeclass = typeclasses[typeclass]
+            instances.append(typeclass(db_key=cdict.get("key") or "",
+                                       db_location=cdict.get("location"),
+                                       db_home=cdict.get("home"),
+                                       db_destination=cdict.get("destination"),
+                                       db_typeclass_path=typeclass.path))
+        index = get_search_index(dbmodel, build=False)
+        groups = OrderedDict()
+        objs = []
+        try:
+            # don't leave objects without their Tags or Attributes behind
+            with transaction.atomic():
+                objs = bulk_create_with_ids(dbmodel, instances)
+                # update the caches the save hooks would have updated
+                for obj, cdict in zip(objs, createdicts):
+                    # assigning the relations again avoids a query when they are used
+                    obj.db_location = cdict.get("location")
+                    obj.db_home = cdict.get("home")
+                    obj.db_destination = cdict.get("destination")
+                    if obj.db_location:
+                        groups.setdefault(obj.db_location, []).append(obj)
+                    if not obj.db_key:
+                        obj.key = "#%i" % obj.id
+                    elif index is not None:
+                        index.update(obj.id, key=obj.db_key)
+                for location, group in groups.items():
+                    location.contents_cache.add(group)
+
+                for obj, cdict in zip(objs, createdicts):
+                    obj.basetype_setup()
+                    obj.at_object_creation()
+                    for field in ("key", "location", "home", "destination"):
+                        value = cdict.get(field)
+                        if value and getattr(obj, field) != value:
+                            setattr(obj, field, value)
+                    if cdict.get("locks"):
+                        obj.locks.add(cdict["locks"])
+
+                tagdata, attrdata = [], []
+                for obj, cdict in zip(objs, createdicts):
+                    for field, tagtype in (("permissions", "permission"), ("aliases", "alias"),
+                                           ("tags", None)):
+                        tagdata.extend((obj, tag, None, tagtype)
+                                       for tag in make_iter(cdict.get(field)) if tag)
+                    if cdict.get("attributes"):
+                        attrdata.extend((obj, key, value, None)
+                                        for key, value in cdict["attributes"].items())
+                self.batch_add_tags(tagdata)
+                self.batch_add_attributes(attrdata)
+                if index is not None:
+                    for obj, cdict in zip(objs, createdicts):
+                        if cdict.get("aliases"):
+                            index.update(obj.id, aliases=obj.aliases.search_names())
+
+                for obj, cdict in zip(objs, createdicts):
+                    if cdict.get("location"):
+                        cdict["location"].at_object_receive(obj, None)
+                        obj.at_after_move(None)
+                    if cdict.get("nattributes"):
+                        for key, value in cdict["nattributes"].items():
+                            obj.nattributes.add(key, value)
+                    obj.basetype_posthook_setup()
+        except Exception:
+            # the new rows are rolled back; forget the objects again
+            self._forget_created(objs, groups)
+            raise
+        return objs
+
+    def _forget_created(self, objects, locations=()):
+        """
+        Remove objects whose creation was rolled back from the caches.
+
+        Args:
+            objects (list): The objects that no longer exist.
+            locations (list, optional): Locations whose contents caches
+                held the objects. Defaults to the objects' locations.
+
+        """
+        index = get_search_index(self.model.__dbclass__, build=False)
+        locations = set(locations) | set(obj.db_location for obj in objects if obj.db_location)
+        for location in locations:
+            location.contents_cache.init()
+        for obj in objects:
+            if index is not None:
+                index.remove(obj.id)
+            obj.flush_from_cache(force=True)
+
+    def delete_objects(self, objects, cooperative=False, chunk_size=_DELETE_CHUNK_SIZE,
+                       accessing_obj=None):
+        """
+        Delete objects together with everything inside them, like a
+        whole zone or a chest with its contents. Unlike calling
+        `delete` on each object, the Attributes, Tags and database
+        rows of the objects are removed with a few bulk queries and
+        the caches of the surrounding objects are updated once.
+
+        Args:
+            objects (list): The objects to delete.
+            cooperative (bool, optional): Run the hooks and delete the
+                objects in chunks, letting the reactor run between
+                them. Otherwise everything is deleted before this
+                method returns.
+            chunk_size (int, optional): The number of objects per chunk.
+            accessing_obj (Object or Player, optional): If given, only
+                objects this one passes the `delete` lock of are
+                deleted. The others are kept like player characters.
+
+        Returns:
+            deleted (list or Deferred): The deleted objects. If
+                `cooperative` is set, this is a Deferred firing with
+                the list once all chunks are done.
+
+        Notes:
+            The objects to delete are the given objects, everything
+            located inside them (recursively) and all exits leading to
+            any of them. Objects controlled by a player are not
+            deleted, nor are objects failing the access check or whose
+            `at_object_delete` hook returns False, nor anything inside
+            such objects. Those of them located inside a deleted object
+            are moved to their home, or to the default home.
+
+            Scripts on the deleted objects are stopped and their
+            Attributes (including nicks) deleted.
+
+            Without `cooperative`, everything is deleted in one
+            transaction, so if anything fails, nothing is deleted. In
+            cooperative mode each chunk is deleted in its own
+            transaction, so if a chunk fails, the chunks before it stay
+            deleted. Objects that were not deleted may be deleted again.
+
+        """
+        deleted = []
+        if cooperative:
+            from twisted.internet.task import cooperate
+            steps = self._delete_objects_iter(objects, chunk_size, deleted, accessing_obj)
+            return cooperate(steps).whenDone().addCallback(lambda result: deleted)
+        removed = []
+        steps = self._delete_objects_iter(objects, chunk_size, deleted, accessing_obj,
+                                          removed=removed)
+        try:
+            with transaction.atomic():
+                for step in steps:
+                    pass
+        except Exception:
+            # the database rows are back; so must the objects be
+            dbmodel = self.model.__dbclass__
+            for chunk, chunkids, locations in removed:
+                for obj, dbid in zip(chunk, chunkids):
+                    obj.id = dbid
+                    dbmodel.cache_instance(obj)
+                for location in locations:
+                    location.contents_cache.init()
+            raise
+        for chunk, chunkids, locations in removed:
+            self._finish_delete(chunk, chunkids, deleted)
+        return deleted
+
+    def _finish_delete(self, objects, dbids, deleted):
+        """
+        Mark objects deleted from the database as deleted.
+
+        Args:
+            objects (list): The deleted objects.
+            dbids (list): Their former ids.
+            deleted (list): The objects are added to this list.
+
+        """
+        index = get_search_index(self.model.__dbclass__, build=False)
+        for obj, dbid in zip(objects, dbids):
+            # scrambling properties, like TypedObject.delete
+            obj.delete = obj._deleted
+            obj._is_deleted = True
+            if index is not None:
+                index.remove(dbid)
+        deleted.extend(objects)
+
+    def _rescue_objects(self, objects, deleted_ids):
+        """
+        Move objects out of locations that are about to be deleted.
+        This is the bulk version of `DefaultObject.clear_contents`.
+
+        Args:
+            objects (list): The objects to move.
+            deleted_ids (set): The ids of all objects being deleted.
+
+        """
+        default_home = None
+        homes = OrderedDict()
+        for obj in objects:
+            home = obj.home
+            if not home or home.id in deleted_ids:
+                if default_home is None:
+                    default_home = self.model.__dbclass__.objects.get_id(settings.DEFAULT_HOME) or False
+                    if default_home and default_home.id in deleted_ids:
+                        default_home = False
+                home = obj.home = default_home or None
+            homes.setdefault(home, []).append(obj)
+        for home, group in homes.items():
+            for obj in group:
+                if not home:
+                    obj.msg(_("Something went wrong! You are dumped into nowhere. Contact an admin."))
+                    log_err("Missing default home, '%s(#%d)' now has a null location." % (obj.name, obj.dbid))
+                elif obj.has_player:
+                    obj.msg(_("Your current location has ceased to exist,"
+                              " moving you to %s(#%d).") % (home.name, home.dbid))
+            self.move_objects(group, home, to_none=True)
+
+    def _delete_objects_iter(self, objects, chunk_size, deleted, accessing_obj=None,
+                             removed=None):
+        """
+        Do the work of `delete_objects`, yielding between chunks.
+
+        Args:
+            objects (list): The objects to delete.
+            chunk_size (int): The number of objects per chunk.
+            deleted (list): The deleted objects are added to this list.
+            accessing_obj (Object or Player, optional): Only delete
+                objects this one may delete.
+            removed (list, optional): If given, the caller runs the
+                whole pass in one transaction. Each chunk is then added
+                here as `(objects, ids, locations)` once its rows are
+                deleted, to be finished after the commit, instead of
+                being added to `deleted`.
+
+        """
+        global _ScriptDB, _ATTR
+        if not _ScriptDB:
+            from evennia.scripts.models import ScriptDB as _ScriptDB
+        if not _ATTR:
+            from evennia.typeclasses.models import Attribute as _ATTR
+        dbmodel = self.model.__dbclass__
+        attr_through = dbmodel.db_attributes.through
+
+        # collect the tree, breadth-first so containers come before their contents
+        candidates = OrderedDict((obj.id, obj) for obj in make_iter(objects) if obj)
+        frontier = list(candidates)
+        while frontier:
+            found = []
+            for ichunk in range(0, len(frontier), chunk_size):
+                chunk = frontier[ichunk:ichunk + chunk_size]
+                for obj in dbmodel.objects.filter(Q(db_location_id__in=chunk) |
+                                                  Q(db_destination_id__in=chunk)):
+                    if obj.id not in candidates:
+                        candidates[obj.id] = obj
+                        found.append(obj.id)
+            frontier = found
+
+        # call the delete hooks; objects refusing to be deleted keep their contents
+        kept = set()
+        todelete = []
+        ndeleted = 0
+        try:
+            for iobj, obj in enumerate(candidates.values()):
+                if (obj.db_location_id in kept or obj.db_player_id or obj.delete_iter > 0 or
+                        (accessing_obj and not obj.access(accessing_obj, "delete")) or
+                        not obj.at_object_delete()):
+                    kept.add(obj.id)
+                else:
+                    obj.delete_iter += 1
+                    todelete.append(obj)
+                if iobj % chunk_size == chunk_size - 1:
+                    yield
+            deleted_ids = set(obj.id for obj in todelete)
+
+            for ichunk in range(0, len(todelete), chunk_size):
+                chunk = todelete[ichunk:ichunk + chunk_size]
+                chunkids = [obj.id for obj in chunk]
+                # anything else inside the objects must be moved out first
+                strays = dbmodel.objects.filter(db_location_id__in=chunkids)
+                self._rescue_objects([obj for obj in strays if obj.id not in deleted_ids],
+                                     deleted_ids)
+                for script in _ScriptDB.objects.filter(db_obj_id__in=chunkids):
+                    script.stop()
+                # locations that will still exist afterwards
+                groups = OrderedDict()
+                for obj in chunk:
+                    if obj.db_location_id and obj.db_location_id not in deleted_ids:
+                        groups.setdefault(obj.db_location, []).append(obj)
+                for location, group in groups.items():
+                    location.contents_cache.remove(group)
+                try:
+                    with transaction.atomic():
+                        attrids = list(attr_through.objects.filter(
+                            objectdb_id__in=chunkids).values_list("attribute_id", flat=True))
+                        for iattr in range(0, len(attrids), chunk_size):
+                            _ATTR.objects.filter(id__in=attrids[iattr:iattr + chunk_size]).delete()
+                        # this also removes the Tag links and flushes the idmapper cache
+                        dbmodel.objects.filter(id__in=chunkids).delete()
+                except Exception:
+                    for location in groups:
+                        location.contents_cache.init()
+                    raise
+                if removed is None:
+                    self._finish_delete(chunk, chunkids, deleted)
+                    ndeleted += len(chunk)
+                else:
+                    removed.append((chunk, chunkids, list(groups)))
+                yield
+        except Exception:
+            # let the objects that were not deleted run their hooks again
+            for obj in todelete[ndeleted:]:
+                obj.delete_iter -= 1
+            raise
+
+    def _copy_extras(self, copies):
+        """
+        Copy everything but the database fields from objects to their
+        copies: Attributes, Tags, cmdsets and Scripts.
+
+        Args:
+            copies (list): A list of `(original, copy)` pairs.
+
+        """
+        global _ScriptDB
+        if not _ScriptDB:
+            from evennia.scripts.models import ScriptDB as _ScriptDB
+        self.batch_copy_attributes(copies)
+        index = get_search_index(self.model, build=False)
+        if index is not None:
+            for original, new_object in copies:
+                index.update(new_object.id, aliases=new_object.aliases.search_names())
+        for original, new_object in copies:
+            # copy over all cmdsets, if any
+            for icmdset, cmdset in enumerate(original.cmdset.all()):
+                if icmdset == 0:
+                    new_object.cmdset.add_default(cmdset)
+                else:
+                    new_object.cmdset.add(cmdset)
+            # copy over all scripts, if any
+            for script in original.scripts.all():
+                _ScriptDB.objects.copy_script(script, new_obj=new_object)
+
     def copy_object(self, original_object, new_key=None,
                     new_location=None, new_home=None,
                     new_permissions=None, new_locks=None,
@@ -441,55 +1044,122 @@ class ObjectDBManager(TypedObjectManager):
                 optionally modified as per the ingoing keyword
                 arguments.  `None` if an error was encountered.
 
-        """
+        Notes:
+            The Attributes and Tags of the original are copied in bulk,
+            without unpickling the Attribute values.
 
-        # get all the object's stats
-        typeclass_path = original_object.typeclass_path
-        if not new_key:
-            new_key = original_object.key
-        if not new_location:
-            new_location = original_object.location
-        if not new_home:
-            new_home = original_object.home
-        if not new_aliases:
-            new_aliases = original_object.aliases.all()
-        if not new_locks:
-            new_locks = original_object.db_lock_storage
-        if not new_permissions:
-            new_permissions = original_object.permissions.all()
-        if not new_destination:
-            new_destination = original_object.destination
-
-        # create new object
-        from evennia.utils import create
-        from evennia.scripts.models import ScriptDB
-        new_object = create.create_object(typeclass_path,
-                                          key=new_key,
-                                          location=new_location,
-                                          home=new_home,
-                                          permissions=new_permissions,
-                                          locks=new_locks,
-                                          aliases=new_aliases,
-                                          destination=new_destination)
+        """
+        excluded = []
+        if new_aliases:
+            excluded.append("alias")
+        if new_permissions:
+            excluded.append("permission")
+        new_object = self.batch_create_objects([{
+            "typeclass": original_object.typeclass_path,
+            "key": new_key or original_object.key,
+            "location": new_location or original_object.location,
+            "home": new_home or original_object.home,
+            "destination": new_destination or original_object.destination,
+            "locks": new_locks or original_object.db_lock_storage,
+            "permissions": new_permissions,
+            "aliases": new_aliases}])[0]
         if not new_object:
             return None
+        self.batch_copy_tags([(original_object, new_object)], exclude_tagtypes=excluded)
+        self._copy_extras([(original_object, new_object)])
+        return new_object
 
-        # copy over all attributes from old to new.
-        for attr in original_object.attributes.all():
-            new_object.attributes.add(attr.key, attr.value)
+    def copy_objects(self, originals, new_location=None):
+        """
+        Copy many objects at once, like all the rooms, exits and items
+        of a zone used as a template. References between the copied
+        objects are re-pointed to the copies, so an exit between two
+        copied rooms leads between the two new rooms and items stay
+        inside their copied containers.
 
-        # copy over all cmdsets, if any
-        for icmdset, cmdset in enumerate(original_object.cmdset.all()):
-            if icmdset == 0:
-                new_object.cmdset.add_default(cmdset)
-            else:
-                new_object.cmdset.add(cmdset)
+        Args:
+            originals (list): The objects to copy.
+            new_location (Object, optional): Where to put the copies of
+                objects that are not located inside another copied
+                object. Defaults to their original location.
 
-        # copy over all scripts, if any
-        for script in original_object.scripts.all():
-            ScriptDB.objects.copy_script(script, new_obj=new_object)
+        Returns:
+            copies (list): The new objects, in the order of `originals`.
 
-        return new_object
+        Notes:
+            The copies are created with `batch_create_objects`, one
+            bulk insert for each level of nesting, and get the
+            Attributes and Tags of their originals copied in bulk.
+            Homes and destinations between the copies may form loops,
+            so they are re-pointed once all copies exist.
+
+        """
+        originals = list(OrderedDict((obj, None) for obj in make_iter(originals) if obj))
+        internal = set(obj.id for obj in originals)
+        copied = {}
+
+        def _ref(obj, fieldname):
+            "Point a reference to the copy of its target, if there is one"
+            dbid = getattr(obj, "%s_id" % fieldname)
+            return copied[dbid] if dbid in copied else getattr(obj, fieldname)
+
+        # plan the levels first, so a broken tree is refused before anything is created
+        levels = []
+        planned = set()
+        remaining = originals
+        while remaining:
+            # copy containers before their contents
+            level = [obj for obj in remaining
+                     if obj.db_location_id not in internal or obj.db_location_id in planned]
+            if not level:
+                # a location loop; move_to refuses these, so the database is broken
+                log_err("copy_objects: location loop among %s." %
+                        ", ".join("#%i" % obj.id for obj in remaining))
+                return []
+            levels.append(level)
+            planned.update(obj.id for obj in level)
+            remaining = [obj for obj in remaining if obj.id not in planned]
+
+        try:
+            # don't leave some of the copies behind if copying fails
+            with transaction.atomic():
+                for level in levels:
+                    new_objects = self.batch_create_objects([{
+                        "typeclass": obj.typeclass_path,
+                        "key": obj.key,
+                        "location": (_ref(obj, "db_location") if obj.db_location_id in internal
+                                     else new_location or obj.location),
+                        "home": _ref(obj, "db_home"),
+                        "destination": _ref(obj, "db_destination"),
+                        "locks": obj.db_lock_storage} for obj in level])
+                    for obj, new_object in zip(level, new_objects):
+                        copied[obj.id] = new_object
+
+                # re-point homes and destinations to copies created after their referrers
+                repoint = defaultdict(list)
+                for obj in originals:
+                    new_object = copied[obj.id]
+                    for fieldname in ("db_home", "db_destination"):
+                        dbid = getattr(obj, "%s_id" % fieldname)
+                        if (dbid in copied and
+                                getattr(new_object, "%s_id" % fieldname) != copied[dbid].id):
+                            repoint[(fieldname, dbid)].append(new_object)
+                for (fieldname, dbid), new_objects in repoint.items():
+                    target = copied[dbid]
+                    self.filter(id__in=[new_object.id for new_object in new_objects]).update(
+                        **{fieldname: target})
+                    for new_object in new_objects:
+                        # set in memory only; the database is already updated
+                        setattr(new_object, fieldname, target)
+
+                copies = [(obj, copied[obj.id]) for obj in originals]
+                self.batch_copy_tags(copies)
+                self._copy_extras(copies)
+        except Exception:
+            # the copies are rolled back; forget them again
+            self._forget_created(copied.values())
+            raise
+        return [new_object for obj, new_object in copies]
 
     def clear_all_sessids(self):
         """
@@ -14,6 +14,7 @@ the database object. Like everything else, they can be accessed
 transparently through the decorating TypeClass.
 """
 from builtins import object
+from bisect import bisect_left, insort
 
 from django.conf import settings
 from django.db import models
@@ -25,12 +26,22 @@ from evennia.utils import logger
 from evennia.utils.utils import (make_iter, dbref, lazy_property)
 
 
+# the roles of objects in a location, as partitioned by the ContentsHandler
+_CONTENT_ROLES = ("exits", "characters", "things")
+
+
 class ContentsHandler(object):
     """
     Handles and caches the contents of an object to avoid excessive
     lookups (this is done very often due to cmdhandler needing to look
     for object-cmdsets). It is stored on the 'contents_cache' property
     of the ObjectDB.
+
+    The contents are partitioned by role: "exits" (objects with a
+    destination), "characters" (objects puppeted by a Session) and
+    "things" (everything else). Each partition is kept as a tuple
+    sorted by id, which is only rebuilt after the partition changed.
+
     """
     def __init__(self, obj):
         """
@@ -42,72 +53,190 @@ class ContentsHandler(object):
 
         """
         self.obj = obj
+        # pk: role
         self._pkcache = {}
-        self._idcache = obj.__class__.__instance_cache__
+        # role: [pk, pk, ...] sorted by pk
+        self._rolecache = dict((role, []) for role in _CONTENT_ROLES)
+        # role (or None for all contents): (obj, obj, ...)
+        self._partitions = {}
+        self._flush_count = None
         self.init()
 
+    def _get_role(self, obj):
+        """
+        Get the role of an object in this location.
+
+        Args:
+            obj (Object): The object to check.
+
+        Returns:
+            role (str): One of "exits", "characters" or "things".
+
+        """
+        if obj.db_destination_id:
+            return "exits"
+        elif obj.db_sessid:
+            return "characters"
+        return "things"
+
+    def _set_role(self, pk, role):
+        """
+        Store the role of an object, moving it between partitions
+        if needed.
+
+        Args:
+            pk (int): The id of the object.
+            role (str or None): The new role, or None to remove the
+                object from the cache.
+
+        """
+        old_role = self._pkcache.get(pk)
+        if old_role == role:
+            return
+        if old_role:
+            pks = self._rolecache[old_role]
+            del pks[bisect_left(pks, pk)]
+            self._partitions.pop(old_role, None)
+            del self._pkcache[pk]
+        if role:
+            insort(self._rolecache[role], pk)
+            self._partitions.pop(role, None)
+            self._pkcache[pk] = role
+        self._partitions.pop(None, None)
+
     def init(self):
         """
         Re-initialize the content cache
 
         """
-        self._pkcache.update(dict((obj.pk, None) for obj in
-                            ObjectDB.objects.filter(db_location=self.obj) if obj.pk))
+        self._pkcache = {}
+        self._rolecache = dict((role, []) for role in _CONTENT_ROLES)
+        self._partitions = {}
+        for obj in ObjectDB.objects.filter(db_location=self.obj):
+            if obj.pk:
+                self._set_role(obj.pk, self._get_role(obj))
+        self.obj.invalidate_appearance()
+
+    def _build(self, pks):
+        """
+        Get the objects for a list of ids from the idmapper cache.
+
+        Args:
+            pks (list): The ids to look up.
+
+        Returns:
+            objects (tuple): The objects.
+
+        Raises:
+            KeyError: If an object is not in the idmapper cache.
 
-    def get(self, exclude=None):
         """
-        Return the contents of the cache.
+        idcache = self.obj.__dbclass__.__instance_cache__
+        return tuple(idcache[pk] for pk in pks)
+
+    def get_partition(self, role=None):
+        """
+        Get all contents with a given role. The result is cached until
+        the contents change, so this is cheap to call often.
 
         Args:
-            exclude (Object or list of Object): object(s) to ignore
+            role (str, optional): One of "exits", "characters" or
+                "things". If not given, return all contents.
 
         Returns:
-            objects (list): the Objects inside this location
+            objects (tuple): The Objects with this role in this
+                location, sorted by id. Don't modify this.
 
         """
-        if exclude:
-            pks = [pk for pk in self._pkcache if pk not in [excl.pk for excl in make_iter(exclude)]]
-        else:
-            pks = self._pkcache
+        flush_count = self.obj.__dbclass__.__flush_count__
+        if flush_count != self._flush_count:
+            # some objects were flushed from the idmapper cache; we must not
+            # hand out the old instances.
+            self._partitions = {}
+            self._flush_count = flush_count
         try:
-            return [self._idcache[pk] for pk in pks]
+            return self._partitions[role]
+        except KeyError:
+            pass
+        pks = self._rolecache[role] if role else sorted(self._pkcache)
+        try:
+            partition = self._build(pks)
         except KeyError:
             # this can happen if the idmapper cache was cleared for an object
             # in the contents cache. If so we need to re-initialize and try again.
             self.init()
+            pks = self._rolecache[role] if role else sorted(self._pkcache)
             try:
-                return [self._idcache[pk] for pk in pks]
+                partition = self._build(pks)
             except KeyError:
                 # this means an actual failure of caching. Return real database match.
                 logger.log_err("contents cache failed for %s." % (self.obj.key))
-                return list(ObjectDB.objects.filter(db_location=self.obj))
+                return tuple(obj for obj in ObjectDB.objects.filter(db_location=self.obj)
+                             if not role or self._get_role(obj) == role)
+        self._partitions[role] = partition
+        return partition
+
+    def get(self, exclude=None, role=None):
+        """
+        Return the contents of the cache.
+
+        Args:
+            exclude (Object or list of Object): object(s) to ignore
+            role (str, optional): Only return objects with this role,
+                one of "exits", "characters" or "things".
+
+        Returns:
+            objects (list): the Objects inside this location
+
+        """
+        partition = self.get_partition(role)
+        if exclude:
+            exclude = make_iter(exclude)
+            return [obj for obj in partition if obj not in exclude]
+        return list(partition)
 
     def add(self, obj):
         """
         Add a new object to this location
 
         Args:
-            obj (Object): object to add
+            obj (Object or list): object(s) to add
 
         """
-        self._pkcache[obj.pk] = None
+        for obj in make_iter(obj):
+            self._set_role(obj.pk, self._get_role(obj))
+        self.obj.invalidate_appearance()
 
     def remove(self, obj):
         """
         Remove object from this location
 
         Args:
-            obj (Object): object to remove
+            obj (Object or list): object(s) to remove
+
+        """
+        for obj in make_iter(obj):
+            self._set_role(obj.pk, None)
+        self.obj.invalidate_appearance()
+
+    def update(self, obj):
+        """
+        Re-check the role of an object in this location, for example
+        after its destination changed or it was puppeted.
+
+        Args:
+            obj (Object): object to update
 
         """
-        self._pkcache.pop(obj.pk, None)
+        if obj.pk in self._pkcache:
+            self._set_role(obj.pk, self._get_role(obj))
+            self.obj.invalidate_appearance()
 
     def clear(self):
         """
         Clear the contents cache and re-initialize
 
         """
-        self._pkcache = {}
         self.init()
 
 #------------------------------------------------------------
@@ -198,10 +327,29 @@ class ObjectDB(TypedObject):
     __defaultclasspath__ = "evennia.objects.objects.DefaultObject"
     __applabel__ = "objects"
 
+    # the appearance render cache, see invalidate_appearance()
+    appearance_version = 0
+    _appearance_cache = None
+    _appearance_cacheable = None
+
     @lazy_property
     def contents_cache(self):
         return ContentsHandler(self)
 
+    def invalidate_appearance(self):
+        """
+        Drop the cached appearance of this object, as rendered by
+        `return_appearance`, and bump its `appearance_version`. This
+        is called automatically when the contents, Attributes or key
+        of this object change, or when the key or locks of an object
+        inside it change. Call it after any other change the
+        appearance depends on.
+
+        """
+        self.appearance_version += 1
+        self._appearance_cache = None
+        self._appearance_cacheable = None
+
     # cmdset_storage property handling
     def __cmdset_storage_get(self):
         "getter"
@@ -307,6 +455,61 @@ class ObjectDB(TypedObject):
                 logger.log_warn("db_location direct save triggered contents_cache.init() for all objects!")
                 [o.contents_cache.init() for o in self.__dbclass__.get_all_cached_instances()]
 
+    def at_db_key_postsave(self, new):
+        """
+        This is called automatically after the key was saved. The key
+        is shown in the appearance of this object and of its location.
+
+        Args:
+            new (bool): Set if this key has not yet been saved before.
+
+        """
+        super(ObjectDB, self).at_db_key_postsave(new)
+        self.invalidate_appearance()
+        if self.db_location:
+            self.db_location.invalidate_appearance()
+
+    def at_db_lock_storage_postsave(self, new):
+        """
+        This is called automatically after the locks were saved. The
+        `view` lock decides if this object shows up in the appearance
+        of its location.
+
+        Args:
+            new (bool): Set if the locks have not yet been saved before.
+
+        """
+        self.invalidate_appearance()
+        if self.db_location:
+            self.db_location.invalidate_appearance()
+
+    def at_db_destination_postsave(self, new):
+        """
+        This is called automatically after the destination field was
+        saved. Setting or removing a destination makes an object an
+        exit or not, so the contents cache of its location must be
+        updated.
+
+        Args:
+            new (bool): Set if this destination has not yet been saved before.
+
+        """
+        if self.db_location:
+            self.db_location.contents_cache.update(self)
+
+    def at_db_sessid_postsave(self, new):
+        """
+        This is called automatically after the sessid field was saved,
+        that is, when the object is puppeted or unpuppeted. This
+        updates the contents cache of its location.
+
+        Args:
+            new (bool): Set if this field has not yet been saved before.
+
+        """
+        if self.db_location:
+            self.db_location.contents_cache.update(self)
+
     class Meta(object):
         "Define Django meta options"
         verbose_name = "Object"
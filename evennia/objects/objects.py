@@ -5,7 +5,10 @@ These are the (default) starting points for all in-game visible
 entities.
 
 """
+import re
 import time
+from collections import OrderedDict
+from string import Formatter
 from builtins import object
 from future.utils import listvalues, with_metaclass
 
@@ -21,7 +24,7 @@ from evennia.commands.cmdsethandler import CmdSetHandler
 from evennia.commands import cmdhandler
 from evennia.utils import logger
 from evennia.utils.utils import (variable_from_module, lazy_property,
-                                 make_iter, to_unicode, calledby)
+                                 make_iter, to_unicode, calledby, list_to_string)
 
 _MULTISESSION_MODE = settings.MULTISESSION_MODE
 
@@ -31,6 +34,15 @@ _SESSIONS = None
 _AT_SEARCH_RESULT = variable_from_module(*settings.SEARCH_AT_RESULT.rsplit('.', 1))
 # the sessid_max is based on the length of the db_sessid csv field (excluding commas)
 _SESSID_MAX = 16 if _MULTISESSION_MODE in (1, 3) else 1
+# lookers passing this lock see the dbref in get_display_name
+_DISPLAY_NAME_LOCK = "perm(Builders)"
+# finds the end of the name in a format field like {name.attr} or {name[0]}
+_RE_FORMAT_FIELD = re.compile(r"[.\[]")
+_FORMATTER = Formatter()
+# lock functions whose result only depends on the permissions of the
+# accessing object; used to decide if an appearance can be cached
+_PERMISSION_LOCKFUNCS = ("true", "all", "false", "none", "superuser",
+                         "perm", "perm_above", "pperm", "pperm_above")
 
 from django.utils.translation import ugettext as _
 
@@ -237,8 +249,12 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
         """
         Returns all exits from this object, i.e. all objects at this
         location having the property destination != `None`.
+
+        Returns:
+            exits (tuple): The exits. This is cached; don't modify it.
+
         """
-        return [exi for exi in self.contents if exi.destination]
+        return self.contents_cache.get_partition("exits")
 
     # main methods
 
@@ -263,7 +279,7 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
             builders.
 
         """
-        if self.locks.check_lockstring(looker, "perm(Builders)"):
+        if self.locks.check_lockstring(looker, _DISPLAY_NAME_LOCK):
             return "{}(#{})".format(self.name, self.id)
         return self.name
 
@@ -493,6 +509,29 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
             `at_msg_receive` will be called on this Object.
             All extra kwargs will be passed on to the protocol.
 
+        """
+        if not self._call_msg_hooks(text, from_obj, kwargs):
+            return
+
+        kwargs["options"] = options
+
+        # relay to session(s)
+        sessions = make_iter(session) if session else self.sessions.all()
+        for session in sessions:
+            session.data_out(text=text, **kwargs)
+
+    def _call_msg_hooks(self, text, from_obj, kwargs):
+        """
+        Call the send- and receive hooks of a message to this object.
+
+        Args:
+            text (str or tuple): The message.
+            from_obj (Object or None): The sender, if any.
+            kwargs (dict): Other send-commands of the message.
+
+        Returns:
+            receive (bool): If this object accepts the message.
+
         """
         # try send hooks
         if from_obj:
@@ -503,16 +542,10 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
         try:
             if not self.at_msg_receive(text=text, **kwargs):
                 # if at_msg_receive returns false, we abort message to this object
-                return
+                return False
         except Exception:
             logger.log_trace()
-
-        kwargs["options"] = options
-
-        # relay to session(s)
-        sessions = make_iter(session) if session else self.sessions.all()
-        for session in sessions:
-            session.data_out(text=text, **kwargs)
+        return True
 
     def for_contents(self, func, exclude=None, **kwargs):
         """
@@ -563,6 +596,13 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
             the room before substitution. If an item in the mapping does
             not have `get_display_name()`, its string value will be used.
 
+            Recipients seeing the same substitutions share one
+            formatted message. Objects using the default
+            `get_display_name` only look different to Builders, so
+            their names are only looked up once for Builders and once
+            for everyone else. Recipients that don't overload `msg`
+            get their message sent to all their Sessions at once.
+
         Example:
             Say char is a Character object and npc is an NPC object:
 
@@ -572,19 +612,86 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
                 mapping=dict(attacker=char, defender=npc, action=action),
                 exclude=(char, npc))
         """
-        contents = self.contents
+        contents = self.contents_cache.get_partition()
         if exclude:
             exclude = make_iter(exclude)
             contents = [obj for obj in contents if obj not in exclude]
-        for obj in contents:
-            if mapping:
-                substitutions = {t: sub.get_display_name(obj)
-                                    if hasattr(sub, 'get_display_name')
-                                    else str(sub)
-                                 for t, sub in mapping.items()}
-                obj.msg(message.format(**substitutions), from_obj=from_obj, **kwargs)
+        if not mapping:
+            self._msg_group(contents, message, from_obj, kwargs)
+            return
+
+        # only substitute the fields actually used in the message
+        fields = [field for field in set(_RE_FORMAT_FIELD.split(fieldname, 1)[0]
+                                         for _, fieldname, _, _ in _FORMATTER.parse(message)
+                                         if fieldname)
+                  if field in mapping]
+        static, default, custom = {}, [], []
+        for field in fields:
+            sub = mapping[field]
+            if not hasattr(sub, "get_display_name"):
+                static[field] = str(sub)
+            elif getattr(sub.get_display_name, "__func__", None) is DefaultObject.get_display_name.__func__:
+                default.append((field, sub))
             else:
-                obj.msg(message, from_obj=from_obj, **kwargs)
+                custom.append((field, sub))
+
+        # name: display name for default-named objects, per builder status
+        names = {}
+        # (names, ...): formatted message
+        messages = {}
+        # message: [recipient, ...]
+        recipients = OrderedDict()
+        for obj in contents:
+            key = []
+            if default:
+                builder = default[0][1].locks.check_lockstring(obj, _DISPLAY_NAME_LOCK)
+                for field, sub in default:
+                    name = names.get((field, builder))
+                    if name is None:
+                        name = names[(field, builder)] = sub.get_display_name(obj)
+                    key.append(name)
+            key.extend(sub.get_display_name(obj) for field, sub in custom)
+            key = tuple(key)
+            text = messages.get(key)
+            if text is None:
+                substitutions = dict(static)
+                substitutions.update(zip([field for field, _ in default + custom], key))
+                text = messages[key] = message.format(**substitutions)
+            recipients.setdefault(text, []).append(obj)
+        for text, objs in recipients.items():
+            self._msg_group(objs, text, from_obj, kwargs)
+
+    def _msg_group(self, objs, text, from_obj, kwargs):
+        """
+        Send the same message to many objects, as by `msg_contents`.
+        The message is sent to the Sessions of all objects using the
+        default `msg` at once; others get their `msg` called.
+
+        Args:
+            objs (list): The objects to message.
+            text (str or tuple): The message.
+            from_obj (Object or None): The sender, if any.
+            kwargs (dict): Other keywords to `msg`.
+
+        """
+        global _SESSIONS
+        if not _SESSIONS:
+            from evennia.server.sessionhandler import SESSIONS as _SESSIONS
+        if "session" in kwargs:
+            # a specific session was requested; let each object handle it
+            for obj in objs:
+                obj.msg(text, from_obj=from_obj, **kwargs)
+            return
+        kwargs = dict(kwargs)
+        options = kwargs.pop("options", None)
+        sessions = []
+        for obj in objs:
+            if getattr(obj.msg, "__func__", None) is not DefaultObject.msg.__func__:
+                obj.msg(text, from_obj=from_obj, options=options, **kwargs)
+            elif obj._call_msg_hooks(text, from_obj, kwargs):
+                sessions.extend(obj.sessions.all())
+        if sessions:
+            _SESSIONS.data_out(sessions, text=text, options=options, **kwargs)
 
     def move_to(self, destination, quiet=False,
                 emit_to_obj=None, use_destination=True, to_none=False, move_hooks=True):
@@ -1215,6 +1322,82 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
         """
         pass
 
+    def at_objects_leave(self, moved_objs, target_location):
+        """
+        Called just before a group of objects leave from inside this
+        object together, as moved by `ObjectDB.objects.move_objects`.
+        By default this calls `at_object_leave` for each of them.
+
+        Args:
+            moved_objs (list): The objects leaving.
+            target_location (Object): Where `moved_objs` are going.
+
+        """
+        for moved_obj in moved_objs:
+            self.at_object_leave(moved_obj, target_location)
+
+    def at_objects_receive(self, moved_objs, source_location):
+        """
+        Called after a group of objects were moved into this object
+        together, as moved by `ObjectDB.objects.move_objects`. By
+        default this calls `at_object_receive` for each of them.
+
+        Args:
+            moved_objs (list): The objects moved into this one.
+            source_location (Object): Where `moved_objs` came from.
+
+        """
+        for moved_obj in moved_objs:
+            self.at_object_receive(moved_obj, source_location)
+
+    def announce_objects_leave(self, moved_objs, destination):
+        """
+        Called if the departure of a group of objects moved together
+        out of this object is to be announced. This replaces the
+        `announce_move_from` of the moved objects with one message to
+        each object remaining in this one.
+
+        Args:
+            moved_objs (list): The objects leaving, still inside this one.
+            destination (Object): The place they are going to.
+
+        """
+        moved = set(moved_objs)
+        verb = "is" if len(moved_objs) == 1 else "are"
+        string = "%s %s leaving %s, heading for %s."
+        for obj in self.contents_cache.get_partition():
+            if obj not in moved:
+                obj.msg(string % (list_to_string([mobj.get_display_name(obj) for mobj in moved_objs]),
+                                  verb, self.get_display_name(obj),
+                                  destination.get_display_name(obj)))
+
+    def announce_objects_arrive(self, moved_objs, source_location):
+        """
+        Called if the arrival of a group of objects moved together
+        into this object is to be announced. This replaces the
+        `announce_move_to` of the moved objects with one message to
+        each other object inside this one.
+
+        Args:
+            moved_objs (list): The objects arriving, already inside this one.
+            source_location (Object): The place they came from. This may be `None`.
+
+        """
+        if not source_location and self.has_player:
+            # created from nowhere into a player's inventory
+            self.msg("You now have %s in your possession." %
+                     list_to_string([mobj.get_display_name(self) for mobj in moved_objs]))
+            return
+        moved = set(moved_objs)
+        verb = "arrives" if len(moved_objs) == 1 else "arrive"
+        string = "%s %s to %s%s."
+        for obj in self.contents_cache.get_partition():
+            if obj not in moved:
+                obj.msg(string % (list_to_string([mobj.get_display_name(obj) for mobj in moved_objs]),
+                                  verb, self.get_display_name(obj),
+                                  " from %s" % source_location.get_display_name(obj)
+                                  if source_location else ""))
+
     def at_traverse(self, traversing_object, target_location):
         """
         This hook is responsible for handling the actual traversal,
@@ -1314,28 +1497,122 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
 
     # hooks called by the default cmdset.
 
+    def _has_static_appearance(self):
+        """
+        Check if this object looks the same to all lookers with the
+        same permissions, that is if its `view` lock only checks
+        permissions and `get_display_name` is not overloaded.
+
+        Returns:
+            static (bool): If the appearance only depends on permissions.
+
+        """
+        if self.get_display_name.__func__ is not DefaultObject.get_display_name.__func__:
+            return False
+        lock = self.locks.locks.get("view")
+        return not lock or all(func.__name__ in _PERMISSION_LOCKFUNCS for func, _, _ in lock[1])
+
+    def get_appearance_cache_key(self, looker):
+        """
+        Get the key under which `return_appearance` caches the
+        appearance of this object for `looker`. By default lookers
+        with the same permissions share the cached appearance, as
+        long as this object and its contents have `view` locks only
+        checking permissions and don't overload `get_display_name`.
+        A looker inside this object gets its own entry, since it does
+        not see itself.
+
+        Args:
+            looker (Object): Object doing the looking.
+
+        Returns:
+            key (hashable or None): The cache key, or `None` to not
+                cache this appearance. Overload this to add any other
+                state the appearance depends on to the key.
+
+        """
+        if self._appearance_cacheable is None:
+            self._appearance_cacheable = self._has_static_appearance() and all(
+                con._has_static_appearance() for con in self.contents_cache.get_partition())
+        if not self._appearance_cacheable:
+            return None
+        try:
+            key = (looker.locks.lock_bypass, tuple(sorted(looker.permissions.all())))
+        except AttributeError:
+            return None
+        player = getattr(looker, "player", None)
+        if player:
+            key += (tuple(sorted(player.permissions.all())), bool(player.attributes.get("_quell")))
+        if getattr(looker, "location", None) == self:
+            key += (looker.id,)
+        return key
+
+    def get_dynamic_appearance(self, looker, appearance):
+        """
+        Add the dynamic parts of the appearance of this object, which
+        must not be cached. This is called by `return_appearance` on
+        every look, with the (possibly cached) result of
+        `render_appearance`.
+
+        Args:
+            looker (Object): Object doing the looking.
+            appearance (str): The rendered appearance.
+
+        Returns:
+            appearance (str): The final appearance.
+
+        """
+        return appearance
+
     def return_appearance(self, looker):
         """
         This formats a description. It is the hook a 'look' command
         should call.
 
+        The result of `render_appearance` is cached per looker
+        permissions (see `get_appearance_cache_key`) until the
+        appearance changes (see `invalidate_appearance`). Use
+        `get_dynamic_appearance` for parts that must not be cached.
+
         Args:
             looker (Object): Object doing the looking.
+
         """
         if not looker:
             return
+        cachekey = self.get_appearance_cache_key(looker)
+        if cachekey is None:
+            appearance = self.render_appearance(looker)
+        else:
+            if self._appearance_cache is None:
+                self._appearance_cache = {}
+            appearance = self._appearance_cache.get(cachekey)
+            if appearance is None:
+                appearance = self._appearance_cache[cachekey] = self.render_appearance(looker)
+        return self.get_dynamic_appearance(looker, appearance)
+
+    def render_appearance(self, looker):
+        """
+        Render the description of this object and what is in it, as
+        seen by `looker`. Use `return_appearance` to get the
+        appearance; it caches the result of this method.
+
+        Args:
+            looker (Object): Object doing the looking.
+
+        Returns:
+            appearance (str): The appearance.
+
+        """
         # get and identify all objects
-        visible = (con for con in self.contents if con != looker and
-                                                    con.access(looker, "view"))
-        exits, users, things = [], [], []
-        for con in visible:
-            key = con.get_display_name(looker)
-            if con.destination:
-                exits.append(key)
-            elif con.has_player:
-                users.append("{c%s{n" % key)
-            else:
-                things.append(key)
+        def _visible(role):
+            "Get the display names of all visible contents with a role"
+            return [con.get_display_name(looker)
+                    for con in self.contents_cache.get_partition(role)
+                    if con != looker and con.access(looker, "view")]
+        exits = _visible("exits")
+        users = ["{c%s{n" % key for key in _visible("characters")]
+        things = _visible("things")
         # get description, build string
         string = "{c%s{n\n" % self.get_display_name(looker)
         desc = self.db.desc
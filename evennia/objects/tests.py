@@ -0,0 +1,405 @@
+"""
+Tests for the Object system.
+
+"""
+from mock import patch
+from evennia.objects.models import ObjectDB
+from evennia.utils.test_resources import EvenniaTest
+
+
+class TestObjectSearch(EvenniaTest):
+    "Test searching for objects among candidates and globally"
+    def setUp(self):
+        super(TestObjectSearch, self).setUp()
+        self.obj1.key = "big shiny sword"
+        self.obj1.aliases.add("blade")
+        self.obj2.key = "small shield"
+        self.obj2.aliases.add(["buckler", "bronze buckler"])
+        self.candidates = [self.obj2, self.char1, self.obj1, self.obj1]
+
+    def _search(self, searchdata, **kwargs):
+        return ObjectDB.objects.object_search(searchdata, candidates=self.candidates, **kwargs)
+
+    def test_candidates_exact(self):
+        for obj in self.candidates:
+            obj.aliases.all()
+        with self.assertNumQueries(0):
+            self.assertEqual(self._search("BIG shiny sword"), [self.obj1])
+            self.assertEqual(self._search("blade"), [self.obj1])
+            self.assertEqual(self._search("sword"), [])
+            self.assertEqual(self._search("blade", typeclass="evennia.objects.objects.DefaultCharacter"), [])
+
+    def test_candidates_alias_category(self):
+        self.obj1.aliases.add("gizmo", category="foo")
+        self.assertEqual(self._search("gizmo"), [self.obj1])
+        self.assertEqual(self._search("giz", exact=False), [self.obj1])
+
+    def test_candidates_fuzzy(self):
+        self.assertEqual(self._search("sword", exact=False), [self.obj1])
+        self.assertEqual(self._search("s", exact=False), [self.obj1, self.obj2])
+        self.assertEqual(self._search("bronze", exact=False), [self.obj2])
+        self.assertEqual(self._search("2-s", exact=False), [self.obj2])
+
+    def test_global(self):
+        self.assertEqual(ObjectDB.objects.object_search("blade"), [self.obj1])
+        self.assertEqual(ObjectDB.objects.object_search("big sh", exact=False), [self.obj1])
+
+
+class TestTagCache(EvenniaTest):
+    "Test that cached tag lookups keep keys and categories apart"
+    def test_dashes(self):
+        tags = self.obj1.tags
+        tags.add("x", category="a-b")
+        tags.add("x-a", category="b")
+        tags.all()
+        self.assertEqual(tags.all(category="b"), ["x-a"])
+        self.assertEqual(tags.all(category="a-b"), ["x"])
+        self.assertEqual(tags.get("x", category="b"), None)
+        self.assertEqual(tags.get("x-a", category="b"), "x-a")
+        tags.clear(category="b")
+        self.assertEqual(tags.all(category="a-b"), ["x"])
+
+
+class TestSearchIndex(EvenniaTest):
+    "Test the global search index and that it stays up to date"
+    def setUp(self):
+        super(TestSearchIndex, self).setUp()
+        from evennia.typeclasses.searchindex import SearchIndex
+        self.index = SearchIndex(ObjectDB)
+        self.index.rebuild()
+
+    def test_lookups(self):
+        index = self.index
+        self.assertEqual(index.exact("OBJ"), set([self.obj1.id]))
+        self.assertEqual(index.prefix("obj"), set([self.obj1.id, self.obj2.id]))
+        self.assertEqual(index.prefix("room"), set([self.room1.id, self.room2.id]))
+        self.obj1.key = "big shiny sword"
+        index.update(self.obj1.id, key=self.obj1.key)
+        self.assertEqual(index.word_prefix("bi sw"), set([self.obj1.id]))
+        self.assertEqual(index.word_prefix("bi room"), set())
+
+    def test_updates(self):
+        from evennia.typeclasses.searchindex import get_search_index
+        index = get_search_index(ObjectDB)
+        index.rebuild()
+        self.obj1.key = "Lantern"
+        self.obj1.aliases.add("lamp")
+        self.assertEqual(index.exact("lantern"), set([self.obj1.id]))
+        self.assertEqual(index.exact("lamp"), set([self.obj1.id]))
+        self.assertEqual(index.exact("obj"), set())
+        self.assertEqual(ObjectDB.objects.object_search("lamp"), [self.obj1])
+        self.obj1.aliases.remove("lamp")
+        self.assertEqual(index.exact("lamp"), set())
+        obj2id = self.obj2.id
+        self.obj2.delete()
+        self.assertEqual(index.exact("obj2"), set())
+        self.assertFalse(obj2id in index.word_ids.get("obj2", ()))
+
+    def test_alias_categories(self):
+        from evennia.typeclasses.searchindex import get_search_index
+        index = get_search_index(ObjectDB)
+        self.obj1.aliases.add("gizmo", category="foo")
+        index.rebuild()
+        self.obj1.aliases.add("thing")
+        self.assertEqual(ObjectDB.objects.object_search("gizmo"), [self.obj1])
+        self.assertEqual(ObjectDB.objects.object_search("thing"), [self.obj1])
+        self.obj1.aliases.remove("thing")
+        self.assertEqual(ObjectDB.objects.object_search("gizmo"), [self.obj1])
+
+    def test_players(self):
+        from evennia.players.models import PlayerDB
+        self.assertEqual(PlayerDB.objects.player_search("testplayer"), [self.player])
+        self.player.key = "Renamed"
+        self.assertEqual(PlayerDB.objects.player_search("RENAMED"), [self.player])
+        self.assertEqual(PlayerDB.objects.player_search("testplayer"), [])
+
+
+class TestContentsHandler(EvenniaTest):
+    "Test the partitioned contents cache"
+    def test_partitions(self):
+        cache = self.room1.contents_cache
+        self.assertEqual(cache.get_partition("exits"), (self.exit,))
+        self.assertEqual(cache.get_partition("characters"), (self.char1,))
+        self.assertEqual(cache.get_partition("things"), (self.obj1, self.obj2, self.char2))
+        self.assertTrue(cache.get_partition() is cache.get_partition())
+        self.assertEqual(self.room1.exits, (self.exit,))
+        self.assertEqual(cache.get(exclude=self.obj1, role="things"), [self.obj2, self.char2])
+
+    def test_updates(self):
+        cache = self.room1.contents_cache
+        self.obj1.destination = self.room2
+        self.assertEqual(cache.get_partition("exits"), (self.exit, self.obj1))
+        self.char2.db_sessid = "2"
+        self.char2.save(update_fields=["db_sessid"])
+        self.assertEqual(cache.get_partition("characters"), (self.char1, self.char2))
+        self.char2.move_to(self.room2, quiet=True)
+        self.assertEqual(cache.get_partition("characters"), (self.char1,))
+        self.assertEqual(self.room2.contents_cache.get_partition("characters"), (self.char2,))
+
+    def test_flush(self):
+        cache = self.room1.contents_cache
+        cache.get_partition()
+        self.obj1.flush_from_cache(force=True)
+        obj1 = ObjectDB.objects.get(id=self.obj1.id)
+        self.assertTrue(obj1 is not self.obj1)
+        self.assertTrue(obj1 in cache.get_partition("things"))
+        self.assertFalse(any(obj is self.obj1 for obj in cache.get_partition()))
+
+
+class TestAppearanceCache(EvenniaTest):
+    "Test caching the rendered appearance of rooms"
+    def test_cache(self):
+        appearance = self.room1.return_appearance(self.char1)
+        with patch.object(self.room1.__class__, "render_appearance") as render:
+            self.assertEqual(self.room1.return_appearance(self.char1), appearance)
+            self.assertFalse(render.called)
+        self.assertFalse("{cChar" in appearance)
+        self.assertTrue("{cChar" in self.room1.return_appearance(self.char2))
+
+    def test_invalidation(self):
+        look = lambda: self.room1.return_appearance(self.char1)
+        version = self.room1.appearance_version
+        self.room1.db.desc = "A dusty room."
+        self.assertTrue("A dusty room." in look())
+        self.obj1.key = "Lantern"
+        self.assertTrue("Lantern" in look())
+        self.obj2.move_to(self.room2, quiet=True)
+        self.assertFalse("Obj2" in look())
+        self.obj1.locks.add("view:false()")
+        self.assertFalse("Lantern" in look())
+        self.assertTrue(self.room1.appearance_version > version)
+
+    def test_uncached(self):
+        self.obj1.locks.add("view:id(%i)" % self.char1.id)
+        self.assertEqual(self.room1.get_appearance_cache_key(self.char1), None)
+        self.assertTrue("Obj(" in self.room1.return_appearance(self.char1))
+        self.assertFalse("Obj(" in self.room1.return_appearance(self.char2))
+
+
+class TestMoveObjects(EvenniaTest):
+    "Test moving groups of objects together"
+    def test_move(self):
+        with patch.object(self.char2, "msg") as msg:
+            moved = ObjectDB.objects.move_objects([self.obj1, self.obj2, self.char1], self.exit)
+            self.assertEqual(moved, [self.obj1, self.obj2, self.char1])
+            self.assertEqual(msg.call_count, 1)
+            self.assertTrue("Obj, Obj2 and Char are leaving" in msg.call_args[0][0])
+        for obj in moved:
+            self.assertEqual(obj.location, self.room2)
+            self.assertEqual(ObjectDB.objects.get(id=obj.id).db_location_id, self.room2.id)
+        self.assertEqual(self.room1.contents, [self.exit, self.char2])
+        self.assertEqual(self.room2.contents, [self.obj1, self.obj2, self.char1])
+
+    def test_hooks(self):
+        self.obj2.at_before_move = lambda destination: False
+        with patch.object(self.char1, "at_object_receive") as receive:
+            moved = ObjectDB.objects.move_objects([self.obj1, self.obj2, self.char1], self.char1,
+                                                  quiet=True)
+            self.assertEqual(moved, [self.obj1])
+            receive.assert_called_once_with(self.obj1, self.room1)
+        # obj2 refused to move and char1 can't be moved into itself
+        self.assertEqual(self.obj2.location, self.room1)
+        self.assertEqual(self.char1.location, self.room1)
+        self.assertEqual(self.char1.contents, [self.obj1])
+
+
+class TestMsgContents(EvenniaTest):
+    "Test sending grouped messages to the contents of a room"
+    def test_mapping(self):
+        from evennia.server.sessionhandler import SESSIONS
+        with patch.object(SESSIONS, "data_out") as data_out, patch.object(self.char2, "msg") as msg:
+            self.room1.msg_contents("{attacker} kicks {defender}{punct}", exclude=self.obj1,
+                                    mapping=dict(attacker=self.obj1, defender=self.obj2, punct="!"))
+            data_out.assert_called_once_with([self.session], options=None,
+                                             text="Obj(#%i) kicks Obj2(#%i)!" % (self.obj1.id, self.obj2.id))
+            msg.assert_called_once_with("Obj kicks Obj2!", from_obj=None, options=None)
+
+
+class TestBatchCreate(EvenniaTest):
+    "Test creating many objects with bulk queries"
+    def test_create(self):
+        from evennia.utils import create
+        objs = create.create_object(self.object_typeclass, key=["goblin", "goblin", "orc"],
+                                    location=self.room1, home=self.room1, aliases=["monster"],
+                                    tags=["evil"], locks="get:false()", batch=True)
+        self.assertEqual([obj.key for obj in objs], ["goblin", "goblin", "orc"])
+        self.assertEqual(len(set(obj.id for obj in objs)), 3)
+        self.assertEqual(self.room1.contents[-3:], objs)
+        for obj in objs:
+            dbobj = ObjectDB.objects.get(id=obj.id)
+            self.assertTrue(dbobj is obj)
+            self.assertEqual(dbobj.db_location_id, self.room1.id)
+            self.assertEqual(obj.aliases.all(), ["monster"])
+            self.assertEqual(obj.tags.all(), ["evil"])
+            self.assertFalse(obj.access(self.char2, "get"))
+        self.assertEqual(ObjectDB.objects.get_by_tag("evil"), objs)
+        self.assertEqual(ObjectDB.objects.object_search("goblin"), objs[:2])
+
+    def test_rollback(self):
+        manager = ObjectDB.objects
+        with patch.object(manager, "batch_add_attributes", side_effect=RuntimeError("fail")):
+            self.assertRaises(RuntimeError, manager.batch_create_objects,
+                              [{"key": "goblin", "location": self.room2, "tags": ["mob"],
+                                "attributes": {"health": 20}}])
+        self.assertFalse(ObjectDB.objects.filter(db_key="goblin").exists())
+        self.assertFalse(ObjectDB.objects.filter(db_lock_storage__startswith="_bulk_").exists())
+        self.assertEqual(self.room2.contents, [])
+        self.assertEqual(ObjectDB.objects.object_search("goblin"), [])
+
+    def test_spawn(self):
+        from evennia.utils.spawner import spawn
+        goblin = {"key": "goblin", "location": self.room2, "health": 20, "tags": ["mob"]}
+        objs = spawn(goblin, dict(goblin, key="goblin chief", health=40), batch=True)
+        self.assertEqual([obj.key for obj in objs], ["goblin", "goblin chief"])
+        self.assertEqual([obj.db.health for obj in objs], [20, 40])
+        objs[0].flush_from_cache(force=True)
+        self.assertEqual(ObjectDB.objects.get(id=objs[0].id).attributes.get("health"), 20)
+        self.assertEqual(self.room2.contents, objs)
+        self.assertEqual([obj.tags.all() for obj in objs], [["mob"], ["mob"]])
+
+
+class TestDeleteObjects(EvenniaTest):
+    "Test deleting trees of objects in bulk"
+    def setUp(self):
+        super(TestDeleteObjects, self).setUp()
+        self.obj2.move_to(self.obj1, quiet=True)
+        self.obj1.move_to(self.room2, quiet=True)
+
+    def test_delete_tree(self):
+        from django.core.exceptions import ObjectDoesNotExist
+        from evennia.typeclasses.models import Attribute
+        from evennia.scripts.models import ScriptDB
+        self.char2.move_to(self.room2, quiet=True)
+        self.obj2.db.weight = 3
+        self.obj2.tags.add("loot")
+        attrid = self.obj2.attributes.get("weight", return_obj=True).id
+        self.obj1.scripts.add(self.script_typeclass)
+        ids = [obj.id for obj in (self.room2, self.exit, self.obj1, self.obj2)]
+        deleted = ObjectDB.objects.delete_objects([self.room2])
+        self.assertEqual(deleted, [self.room2, self.exit, self.obj1, self.obj2])
+        self.assertFalse(ObjectDB.objects.filter(id__in=ids).exists())
+        self.assertFalse(Attribute.objects.filter(id=attrid).exists())
+        self.assertFalse(ScriptDB.objects.filter(db_obj_id=ids[2]).exists())
+        self.assertEqual(ObjectDB.objects.object_search("Obj2"), [])
+        self.assertRaises(ObjectDoesNotExist, self.obj1.delete)
+        # the character of a player was moved home
+        self.assertEqual(ObjectDB.objects.get(id=self.char2.id).location, self.room1)
+        self.assertEqual(self.room1.exits, ())
+        self.assertEqual(self.room1.contents, [self.char1, self.char2])
+
+    def test_rollback(self):
+        manager = ObjectDB.objects
+        objs = [self.room2, self.exit, self.obj1, self.obj2]
+        ids = [obj.id for obj in objs]
+        with patch.object(manager, "_rescue_objects", side_effect=[None, RuntimeError("fail")]):
+            self.assertRaises(RuntimeError, manager.delete_objects, [self.room2], chunk_size=1)
+        # nothing was deleted
+        self.assertEqual(ObjectDB.objects.filter(id__in=ids).count(), 4)
+        self.assertEqual([obj.id for obj in objs], ids)
+        self.assertTrue(ObjectDB.objects.get(id=ids[0]) is self.room2)
+        self.assertEqual(self.room2.contents, [self.obj1])
+        self.assertEqual([obj.delete_iter for obj in objs], [0, 0, 0, 0])
+        self.assertEqual(sorted(map(id, manager.delete_objects([self.room2]))),
+                         sorted(map(id, objs)))
+
+    def test_failed_chunk(self):
+        # the cooperative mode commits each chunk on its own
+        manager = ObjectDB.objects
+        room2id = self.room2.id
+        deleted = []
+        with patch.object(manager, "_rescue_objects", side_effect=[None, RuntimeError("fail")]):
+            steps = manager._delete_objects_iter([self.room2], 1, deleted)
+            self.assertRaises(RuntimeError, list, steps)
+        self.assertEqual(deleted, [self.room2])
+        self.assertFalse(ObjectDB.objects.filter(id=room2id).exists())
+        # the failed chunks are left as they were and can be deleted again
+        rest = [self.exit, self.obj1, self.obj2]
+        self.assertEqual(ObjectDB.objects.filter(id__in=[obj.id for obj in rest]).count(), 3)
+        self.assertEqual([obj.delete_iter for obj in rest], [0, 0, 0])
+        self.assertEqual(sorted(map(id, manager.delete_objects([self.exit, self.obj1]))),
+                         sorted(map(id, rest)))
+
+    def test_access(self):
+        self.room2.locks.add("delete:all()")
+        self.exit.locks.add("delete:all()")
+        deleted = ObjectDB.objects.delete_objects(self.room2, accessing_obj=self.char2)
+        self.assertEqual(deleted, [self.room2, self.exit])
+        self.assertEqual(self.obj1.location, self.room1)
+        self.assertEqual(self.obj2.location, self.obj1)
+
+    def test_veto(self):
+        self.obj1.at_object_delete = lambda: False
+        deleted = ObjectDB.objects.delete_objects(self.room2)
+        self.assertEqual(deleted, [self.room2, self.exit])
+        self.assertEqual(self.obj1.location, self.room1)
+        self.assertEqual(self.obj2.location, self.obj1)
+
+
+class TestCopyObjects(EvenniaTest):
+    "Test copying objects with their Attributes and Tags"
+    def setUp(self):
+        super(TestCopyObjects, self).setUp()
+        self.obj1.db.desc = "A sword."
+        self.obj1.attributes.add("weight", 3, category="stats")
+        self.obj1.tags.add("loot")
+        self.obj1.aliases.add("blade")
+
+    def test_copy(self):
+        with patch("evennia.utils.picklefield.dbsafe_decode") as decode:
+            copy = ObjectDB.objects.copy_object(self.obj1, new_key="Sword")
+            self.assertFalse(decode.called)
+        self.assertEqual(copy.key, "Sword")
+        self.assertEqual(copy.location, self.room1)
+        self.assertEqual(copy.db.desc, "A sword.")
+        self.assertEqual(copy.attributes.get("weight", category="stats"), 3)
+        self.assertEqual(copy.tags.all(), ["loot"])
+        self.assertEqual(copy.aliases.all(), ["blade"])
+        self.assertEqual(self.obj1.attributes.get("weight", category="stats"), 3)
+
+    def test_copy_objects(self):
+        self.obj2.move_to(self.obj1, quiet=True)
+        copies = ObjectDB.objects.copy_objects([self.room1, self.room2, self.exit, self.obj1, self.obj2])
+        room1, room2, exit, obj1, obj2 = copies
+        self.assertEqual([obj.key for obj in copies], ["Room", "Room2", "out", "Obj", "Obj2"])
+        self.assertEqual(set(room1.contents), set([exit, obj1]))
+        self.assertEqual(exit.destination, room2)
+        self.assertEqual(room2.home, room1)
+        self.assertEqual(obj2.location, obj1)
+        self.assertEqual(room1.db.desc, "room_desc")
+        self.assertEqual(obj1.aliases.all(), ["blade"])
+        self.assertEqual(self.room1.contents, [self.exit, self.obj1, self.char1, self.char2])
+
+    def test_copy_location_loop(self):
+        # move_to refuses this, so break the tree in memory only
+        self.obj1.db_location_id = self.obj2.id
+        self.obj2.db_location_id = self.obj1.id
+        count = ObjectDB.objects.count()
+        with patch("evennia.objects.manager.log_err") as log_err:
+            self.assertEqual(ObjectDB.objects.copy_objects([self.room1, self.obj1, self.obj2]), [])
+            self.assertTrue(log_err.called)
+        self.assertEqual(ObjectDB.objects.count(), count)
+
+    def test_copy_rollback(self):
+        manager = ObjectDB.objects
+        count = manager.count()
+        contents = self.room1.contents
+        with patch.object(manager, "batch_copy_tags", side_effect=RuntimeError("fail")):
+            self.assertRaises(RuntimeError, manager.copy_objects,
+                              [self.room2, self.obj1], new_location=self.room1)
+        self.assertEqual(manager.count(), count)
+        self.assertEqual(self.room1.contents, contents)
+
+    def test_copy_reference_loop(self):
+        self.room1.home = self.room2
+        self.room2.home = self.room1
+        room1, room2, exit, obj1 = ObjectDB.objects.copy_objects(
+            [self.room1, self.room2, self.exit, self.obj1])
+        self.assertEqual(obj1.location, room1)
+        self.assertEqual(exit.location, room1)
+        self.assertEqual(exit.destination, room2)
+        self.assertEqual(room1.home, room2)
+        self.assertEqual(room2.home, room1)
+        room1.flush_from_cache(force=True)
+        exit.flush_from_cache(force=True)
+        self.assertEqual(ObjectDB.objects.get(id=room1.id).db_home_id, room2.id)
+        self.assertEqual(ObjectDB.objects.get(id=exit.id).db_destination_id, room2.id)
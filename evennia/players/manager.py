@@ -3,14 +3,18 @@ The managers for the custom Player object and permissions.
 """
 
 import datetime
+from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth.models import UserManager
 #from functools import update_wrapper
 from evennia.typeclasses.managers import (returns_typeclass_list, returns_typeclass,
                                       TypedObjectManager, TypeclassManager)
+from evennia.typeclasses.searchindex import get_search_index
 from evennia.utils.utils import make_iter
 __all__ = ("PlayerManager",)
 
+_AGGRESSIVE_CACHE = settings.TYPECLASS_AGGRESSIVE_CACHE
+
 
 #
 # Player Manager
@@ -178,10 +182,14 @@ class PlayerDBManager(TypedObjectManager, UserManager):
             else:
                 typeclass = u"%s" % typeclass
             query["db_typeclass_path"] = typeclass
-        if exact:
-            return self.filter(**query)
-        else:
-            return self.filter(**query)
+        if exact and _AGGRESSIVE_CACHE and isinstance(ostring, basestring):
+            # look up the name in the search index. This also holds
+            # aliases, which we don't match here.
+            ostring = ostring.lower()
+            dbids = get_search_index(self.model).exact(ostring)
+            return [player for player in self.get_by_ids(dbids, typeclasses=typeclass)
+                    if player.username.lower() == ostring]
+        return self.filter(**query)
 
 
 class PlayerManager(PlayerDBManager, TypeclassManager):
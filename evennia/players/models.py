@@ -167,6 +167,19 @@ class PlayerDB(TypedObject, AbstractUser):
     name = property(__username_get, __username_set, __username_del)
     key = property(__username_get, __username_set, __username_del)
 
+    # the search index uses the username as key
+    _search_key_field = "username"
+
+    def at_username_postsave(self, new):
+        """
+        Called after the username was saved. Updates the search index.
+
+        Args:
+            new (bool): Set if this player was saved for the first time.
+
+        """
+        self.at_db_key_postsave(new)
+
     #@property
     def __uid_get(self):
         "Getter. Retrieves the user id"
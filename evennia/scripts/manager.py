@@ -2,14 +2,22 @@
 The custom manager for Scripts.
 """
 
+from django.db import transaction
 from django.db.models import Q
+from twisted.internet.task import cooperate
 from evennia.typeclasses.managers import TypedObjectManager, TypeclassManager
 from evennia.typeclasses.managers import returns_typeclass_list
+from evennia.typeclasses.searchindex import get_search_index
 from evennia.utils.utils import make_iter
+from evennia.utils.logger import log_trace
 __all__ = ("ScriptManager",)
 _GA = object.__getattribute__
 
 VALIDATE_ITERATION = 0
+# number of scripts to load and validate at a time
+_VALIDATE_CHUNK_SIZE = 500
+_DEFAULT_IS_VALID = None
+_ATTR = None
 
 
 class ScriptDBManager(TypedObjectManager):
@@ -31,6 +39,7 @@ class ScriptDBManager(TypedObjectManager):
     delete_script
     remove_non_persistent
     validate
+    validate_cooperatively
     script_search (equivalent to evennia.search_script)
     copy_script
 
@@ -125,12 +134,33 @@ class ScriptDBManager(TypedObjectManager):
             to_stop = self.filter(db_persistent=False, db_is_active=True)
             to_delete = self.filter(db_persistent=False, db_is_active=False)
         nr_deleted = to_stop.count() + to_delete.count()
-        for script in to_stop:
-            script.stop()
-        for script in to_delete:
-            script.delete()
+        with transaction.atomic():
+            for script in to_stop:
+                script.stop()
+            for script in to_delete:
+                script.delete()
         return nr_deleted
 
+    def _iter_chunks(self, chunk_size=_VALIDATE_CHUNK_SIZE):
+        """
+        Load all scripts from the database, a chunk at a time.
+
+        Args:
+            chunk_size (int, optional): Max number of scripts per chunk.
+
+        Yields:
+            chunk (list): A list of scripts, ordered by id.
+
+        """
+        last_id = 0
+        while True:
+            chunk = list(self.filter(id__gt=last_id).order_by("id").select_related(
+                "db_obj", "db_player")[:chunk_size])
+            if not chunk:
+                return
+            last_id = chunk[-1].id
+            yield chunk
+
     def validate(self, scripts=None, obj=None, key=None, dbref=None,
                  init_mode=False):
         """
@@ -187,34 +217,124 @@ class ScriptDBManager(TypedObjectManager):
                 # special mode when server starts or object logs in.
                 # This deletes all non-persistent scripts from database
                 nr_stopped += self.remove_non_persistent(obj=obj)
-            # turn off the activity flag for all remaining scripts
-            scripts = self.get_all_scripts()
-            for script in scripts:
-                script.is_active = False
-
-        elif not scripts:
-            # normal operation
+            # turn off the activity flag for all remaining scripts, in
+            # the database and in the cache
+            self.filter(db_is_active=True).update(db_is_active=False)
+            for script in self.model.get_all_cached_instances():
+                script.db_is_active = False
+            chunks = self._iter_chunks()
+
+        elif scripts or not (dbref or obj or key):
+            # given scripts, or normal operation on all scripts
+            chunks = [make_iter(scripts)] if scripts else self._iter_chunks()
+        else:
             if dbref and self.dbref(dbref, reqhash=False):
                 scripts = self.get_id(dbref)
             elif obj:
                 scripts = self.get_all_scripts_on_obj(obj, key=key)
             else:
-                scripts = self.get_all_scripts(key=key) #self.model.get_all_cached_instances()
+                scripts = self.get_all_scripts(key=key)
+            chunks = [make_iter(scripts)] if scripts else []
+
+        global _DEFAULT_IS_VALID
+        if not _DEFAULT_IS_VALID:
+            from evennia.scripts.scripts import DefaultScript
+            _DEFAULT_IS_VALID = DefaultScript.is_valid.__func__
+
+        found = False
+        for chunk in chunks:
+            invalid = []
+            for script in chunk:
+                found = True
+                if (not init_mode and script.db_is_active and
+                        getattr(script.is_valid, "__func__", None) is _DEFAULT_IS_VALID and
+                        not script._is_deleted):
+                    # a running script that can't become invalid;
+                    # starting it would do nothing.
+                    continue
+                if script.is_valid():
+                    nr_started += script.start(force_restart=init_mode)
+                else:
+                    # like script.stop(), but deleted together with the rest
+                    try:
+                        script.at_stop()
+                    except Exception:
+                        log_trace()
+                    script._stop_task()
+                    if not script._is_deleted:
+                        invalid.append(script)
+            nr_stopped += self._delete_stopped(invalid)
 
-        if not scripts:
+        VALIDATE_ITERATION -= 1
+        if not found:
             # no scripts available to validate
-            VALIDATE_ITERATION -= 1
             return None, None
-
-        for script in scripts:
-            if script.is_valid():
-                nr_started += script.start(force_restart=init_mode)
-            else:
-                script.stop()
-                nr_stopped += 1
-        VALIDATE_ITERATION -= 1
         return nr_started, nr_stopped
 
+    def _delete_stopped(self, scripts):
+        """
+        Delete stopped scripts and their Attributes with one bulk
+        query per table, like `DefaultScript.stop` does for one.
+
+        Args:
+            scripts (list): The scripts to delete. Their hooks must
+                already have been called.
+
+        Returns:
+            nr_deleted (int): The number of deleted scripts.
+
+        """
+        global _ATTR
+        if not _ATTR:
+            from evennia.typeclasses.models import Attribute as _ATTR
+        if not scripts:
+            return 0
+        dbmodel = self.model.__dbclass__
+        dbids = [script.id for script in scripts]
+        attr_through = dbmodel.db_attributes.through
+        with transaction.atomic():
+            attrids = list(attr_through.objects.filter(**{
+                "%s_id__in" % dbmodel.__name__.lower(): dbids}).values_list("attribute_id", flat=True))
+            for iattr in range(0, len(attrids), _VALIDATE_CHUNK_SIZE):
+                _ATTR.objects.filter(id__in=attrids[iattr:iattr + _VALIDATE_CHUNK_SIZE]).delete()
+            for iscript in range(0, len(dbids), _VALIDATE_CHUNK_SIZE):
+                # this also removes the Tag links and flushes the idmapper cache
+                dbmodel.objects.filter(id__in=dbids[iscript:iscript + _VALIDATE_CHUNK_SIZE]).delete()
+        index = get_search_index(dbmodel, build=False)
+        for script, dbid in zip(scripts, dbids):
+            # scrambling properties, like TypedObject.delete
+            script.delete = script._deleted
+            script._is_deleted = True
+            if index is not None:
+                index.remove(dbid)
+        return len(scripts)
+
+    def validate_cooperatively(self, chunk_size=_VALIDATE_CHUNK_SIZE):
+        """
+        Validate all scripts in the database without blocking the
+        server. Scripts are loaded and validated a chunk at a time,
+        giving the reactor a chance to do other work in between.
+
+        Args:
+            chunk_size (int, optional): Number of scripts to validate
+                in one go.
+
+        Returns:
+            deferred (Deferred): Fires with `(nr_started, nr_stopped)`
+                when all scripts have been validated.
+
+        """
+        counts = [0, 0]
+
+        def _validate_chunks():
+            for chunk in self._iter_chunks(chunk_size):
+                nr_started, nr_stopped = self.validate(scripts=chunk)
+                counts[0] += nr_started or 0
+                counts[1] += nr_stopped or 0
+                yield
+
+        return cooperate(_validate_chunks()).whenDone().addCallback(lambda _: tuple(counts))
+
     @returns_typeclass_list
     def script_search(self, ostring, obj=None, only_timed=False):
         """
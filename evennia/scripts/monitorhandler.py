@@ -97,7 +97,7 @@ class MonitorHandler(object):
                     logger.log_trace("Monitor callback was removed.")
         # we cleanup non-found monitors (has to be done after loop)
         for (obj, fieldname, idstring) in to_delete:
-            del self.monitors[obj][fieldname][idstring]
+            self.remove(obj, fieldname, idstring)
 
     def add(self, obj, fieldname, callback, idstring="", persistent=False, **kwargs):
         """
@@ -148,9 +148,14 @@ class MonitorHandler(object):
                 return
             fieldname = "db_value"
 
-        idstring_dict = self.monitors[obj][fieldname]
-        if idstring in idstring_dict:
-            del self.monitors[obj][fieldname][idstring]
+        if obj in self.monitors and fieldname in self.monitors[obj]:
+            idstring_dict = self.monitors[obj][fieldname]
+            idstring_dict.pop(idstring, None)
+            # clean up, so saving an unmonitored object is quick
+            if not idstring_dict:
+                del self.monitors[obj][fieldname]
+                if not self.monitors[obj]:
+                    del self.monitors[obj]
 
     def clear(self):
         """
@@ -5,6 +5,7 @@ ability to run timers.
 
 """
 
+from twisted.internet import reactor
 from twisted.internet.defer import Deferred, maybeDeferred
 from twisted.internet.task import LoopingCall
 from django.core.exceptions import ObjectDoesNotExist
@@ -137,6 +138,212 @@ class ExtendedLoopingCall(LoopingCall):
         return None
 
 
+class ScriptTimer(object):
+    """
+    A timer shared by all Script tasks with the same interval that are
+    due at the same time (to within a second).
+
+    """
+    def __init__(self, pool, key, interval, start_delay):
+        """
+        Start the timer.
+
+        Args:
+            pool (ScriptTimerPool): The pool this timer belongs to.
+            key (tuple): The `(interval, phase)` of the timer in the pool.
+            interval (int): Repeat interval in seconds.
+            start_delay (float): Seconds until the first call.
+
+        """
+        self.key = key
+        self.tasks = set()
+        self.task = ExtendedLoopingCall(self._callback)
+        self.task.clock = pool.clock
+        self.task.start(interval, now=False, start_delay=start_delay)
+
+    def _callback(self):
+        """
+        Step all tasks subscribing to this timer.
+
+        """
+        # tasks may be stopped or moved by the callbacks of others
+        for task in list(self.tasks):
+            if task.timer is self:
+                try:
+                    task()
+                except Exception:
+                    logger.log_trace()
+
+
+class ScriptTimerPool(object):
+    """
+    Groups the timers of all Scripts so that Scripts with the same
+    interval and phase share a single reactor timer, much like the
+    `TickerPool` of the TickerHandler. Phases are rounded to whole
+    seconds, so the number of timers is bounded by the intervals in
+    use rather than by the number of Scripts.
+
+    """
+    def __init__(self, clock=reactor):
+        """
+        Initialize the pool.
+
+        Args:
+            clock (IReactorTime, optional): The reactor to schedule on.
+                Mainly useful for testing.
+
+        """
+        self.clock = clock
+        # (interval, phase): ScriptTimer
+        self.timers = {}
+
+    def add(self, task, first_call):
+        """
+        Add a task to the timer matching its interval and phase.
+
+        Args:
+            task (ScriptTask): The task to add.
+            first_call (float): The time the task should first be called.
+
+        """
+        interval = task.interval
+        first_call = int(round(first_call))
+        key = (interval, first_call % interval)
+        timer = self.timers.get(key)
+        if not timer:
+            timer = self.timers[key] = ScriptTimer(
+                self, key, interval, max(0, first_call - self.clock.seconds()))
+        timer.tasks.add(task)
+        task.timer = timer
+
+    def remove(self, task):
+        """
+        Remove a task from its timer, stopping the timer if it is not
+        used anymore.
+
+        Args:
+            task (ScriptTask): The task to remove.
+
+        """
+        timer, task.timer = task.timer, None
+        if timer:
+            timer.tasks.discard(task)
+            if not timer.tasks:
+                if timer.task.running:
+                    timer.task.stop()
+                del self.timers[timer.key]
+
+
+class ScriptTask(object):
+    """
+    The timer of a single Script. It works like an
+    `ExtendedLoopingCall` (with `start`, `stop`, `force_repeat`,
+    `next_call_time` and `callcount`) but is stepped by a shared
+    timer in a `ScriptTimerPool`.
+
+    """
+    __slots__ = ("pool", "callback", "interval", "callcount", "running", "timer")
+
+    def __init__(self, callback, pool=None):
+        """
+        Initialize the task.
+
+        Args:
+            callback (callable): Called without arguments every
+                `interval` seconds.
+            pool (ScriptTimerPool, optional): The pool to schedule in.
+                Uses the global pool if not given.
+
+        """
+        self.pool = pool or SCRIPT_TIMER_POOL
+        self.callback = callback
+        self.interval = None
+        self.callcount = 0
+        self.running = False
+        self.timer = None
+
+    def __call__(self):
+        """
+        Tick one step.
+
+        """
+        self.callcount += 1
+        self.callback()
+
+    def start(self, interval, now=True, start_delay=None, count_start=0):
+        """
+        Start running the callback every interval seconds.
+
+        Args:
+            interval (int): Repeat interval in seconds.
+            now (bool, optional): Whether to start immediately or after
+                `start_delay` seconds.
+            start_delay (int): The number of seconds before starting.
+                If None, wait interval seconds. Only valid if `now` is `False`.
+            count_start (int): Number of repeats to start at.
+
+        Raises:
+            AssertError: if trying to start a task which is already running.
+            ValueError: If interval is set to an invalid value <= 0.
+
+        """
+        assert not self.running, "Tried to start an already running ScriptTask."
+        if interval <= 0:
+            raise ValueError("interval must be > 0")
+        self.running = True
+        self.interval = interval
+        self.callcount = max(0, count_start)
+        now_time = self.pool.clock.seconds()
+        if not now and start_delay is None:
+            start_delay = interval
+        if now or start_delay < 1:
+            # too soon to wait for a shared timer
+            self()
+            start_delay = interval
+        if self.running:
+            self.pool.add(self, now_time + start_delay)
+
+    def stop(self):
+        """
+        Stop calling the callback.
+
+        """
+        self.running = False
+        self.pool.remove(self)
+
+    def force_repeat(self):
+        """
+        Force-fire the callback and restart the timer from now.
+
+        Raises:
+            AssertionError: When trying to force a task that is not
+                running.
+
+        """
+        assert self.running, "Tried to fire a ScriptTask that was not running."
+        self.pool.remove(self)
+        self()
+        if self.running:
+            self.pool.add(self, self.pool.clock.seconds() + self.interval)
+
+    def next_call_time(self):
+        """
+        Get the next call time.
+
+        Returns:
+            next (float or None): The time in seconds until the next call,
+                or `None` if the task is not running.
+
+        """
+        if self.running and self.timer:
+            return self.timer.task.next_call_time()
+        return None
+
+
+# the pool shared by all Scripts
+SCRIPT_TIMER_POOL = ScriptTimerPool()
+
+
 class ScriptBase(with_metaclass(TypeclassBase, ScriptDB)):
     """
     Base class for scripts. Don't inherit from this, inherit from the
@@ -173,7 +380,7 @@ class DefaultScript(ScriptBase):
 
         """
 
-        self.ndb._task = ExtendedLoopingCall(self._step_task)
+        self.ndb._task = ScriptTask(self._step_task)
 
         if self.db._paused_time:
             # the script was paused; restarting
@@ -0,0 +1,340 @@
+"""
+TaskHandler
+
+This implements the scheduler behind `evennia.utils.utils.delay`. It
+is used for one-shot delayed tasks, like a slow exit moving its
+traverser after a few seconds or a light source burning out.
+
+Giving every delayed task its own reactor timer means Twisted must keep
+them all sorted in its own heap. The TaskHandler instead works like a
+calendar queue: tasks are sorted into buckets by their deadline,
+rounded up to the handler's resolution. Only the buckets themselves
+are kept sorted and a single reactor timer is used, waiting for the
+earliest bucket. When a bucket is due, all its tasks fire in the same
+reactor callback. Adding a task to an existing bucket is O(1) and a
+task costs no more memory than its handle.
+
+```python
+    from evennia.utils.utils import delay
+
+    # call obj.reset() in 45 seconds
+    task = delay(45, obj.reset)
+    # changed our mind
+    task.cancel()
+```
+
+Tasks are normally lost on a server reload. A task created with
+`persistent=True` is also stored in the database and will be
+re-scheduled when the server restarts. Its callback must then be a
+stand-alone function in a module or a method on a typeclassed entity,
+and all arguments must be possible to pickle - just like for the
+TickerHandler.
+
+"""
+import inspect
+from math import ceil
+from heapq import heappush, heappop
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from twisted.internet import reactor
+from evennia.utils.logger import log_trace
+
+# seconds per bucket; tasks fire at most this much too late
+_RESOLUTION = 0.1
+_SAVE_NAME = "delayed_task"
+
+# delayed imports, these are not needed in the Portal
+_SERVERCONFIG = None
+_DBSERIALIZE = None
+
+
+def _init_db():
+    "Import database resources on first use"
+    global _SERVERCONFIG, _DBSERIALIZE
+    if not _SERVERCONFIG:
+        from evennia.server.models import ServerConfig as _SERVERCONFIG
+        from evennia.utils import dbserialize as _DBSERIALIZE
+
+
+class TaskHandle(object):
+    """
+    A delayed task. This is returned by `TaskHandler.add` and can be
+    used to cancel the task. It is similar to Twisted's `DelayedCall`.
+
+    """
+    __slots__ = ("handler", "deadline", "callback", "args", "kwargs",
+                 "taskid", "called", "cancelled")
+
+    def __init__(self, handler, deadline, callback, args, kwargs):
+        """
+        Initialize the task.
+
+        Args:
+            handler (TaskHandler): The handler scheduling this task.
+            deadline (float): The time to fire, in seconds since epoch.
+            callback (callable): The callable to call.
+            args (tuple): Arguments to the callback.
+            kwargs (dict): Keyword arguments to the callback.
+
+        """
+        self.handler = handler
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        # set for persistent tasks only
+        self.taskid = None
+        self.called = False
+        self.cancelled = False
+
+    def active(self):
+        """
+        Check if the task is still waiting to fire.
+
+        Returns:
+            active (bool): If the task has neither fired nor been cancelled.
+
+        """
+        return not (self.called or self.cancelled)
+
+    def getTime(self):
+        """
+        Get the time the task is scheduled to fire.
+
+        Returns:
+            deadline (float): The time, in seconds since epoch.
+
+        """
+        return self.deadline
+
+    def cancel(self):
+        """
+        Cancel the task. Unlike `DelayedCall.cancel`, this does
+        nothing if the task has already fired or been cancelled.
+
+        """
+        if self.active():
+            self.cancelled = True
+            self.handler._cancel(self)
+
+
+class TaskHandler(object):
+    """
+    A calendar queue of delayed tasks, driven by a single reactor timer.
+
+    """
+    def __init__(self, resolution=_RESOLUTION, save_name=_SAVE_NAME, clock=reactor):
+        """
+        Initialize the handler.
+
+        Args:
+            resolution (float, optional): The width of each bucket, in
+                seconds.
+            save_name (str, optional): Prefix for the `ServerConfig` keys
+                used to store persistent tasks.
+            clock (IReactorTime, optional): The reactor to schedule on.
+                Mainly useful for testing.
+
+        """
+        self.resolution = resolution
+        self.save_name = save_name
+        self.clock = clock
+        # bucket index: [task, task, ...]
+        self.buckets = {}
+        # sorted bucket indexes
+        self.bucket_heap = []
+        self.ntasks = 0
+        # the reactor timer waiting for the earliest bucket
+        self.next_call = None
+        self.next_bucket = None
+        self.last_taskid = 0
+
+    def __len__(self):
+        return self.ntasks
+
+    def add(self, delay, callback, *args, **kwargs):
+        """
+        Schedule a task.
+
+        Args:
+            delay (int or float): Seconds until the task fires.
+            callback (callable): Will be called as `callback(*args, **kwargs)`.
+            args (any, optional): Arguments to the callback.
+
+        Kwargs:
+            persistent (bool): Store the task in the database so it
+                survives a server reload.
+            any (any): Keyword arguments to the callback.
+
+        Returns:
+            task (TaskHandle): The scheduled task.
+
+        Raises:
+            ValueError: If a persistent task has a callback that cannot
+                be stored.
+
+        """
+        persistent = kwargs.pop("persistent", False)
+        task = TaskHandle(self, self.clock.seconds() + max(0, delay), callback, args, kwargs)
+        if persistent:
+            self._save(task)
+        self._schedule(task)
+        return task
+
+    def _schedule(self, task):
+        """
+        Put a task in its bucket.
+
+        Args:
+            task (TaskHandle): The task to schedule.
+
+        """
+        index = int(ceil(task.deadline / self.resolution))
+        bucket = self.buckets.get(index)
+        if bucket is None:
+            bucket = self.buckets[index] = []
+            heappush(self.bucket_heap, index)
+            if self.next_bucket is None or index < self.next_bucket:
+                self._reschedule()
+        bucket.append(task)
+        self.ntasks += 1
+
+    def _reschedule(self):
+        """
+        Set up the reactor timer to wait for the earliest bucket.
+
+        """
+        if self.next_call and self.next_call.active():
+            self.next_call.cancel()
+        self.next_call = self.next_bucket = None
+        if self.bucket_heap:
+            index = self.next_bucket = self.bucket_heap[0]
+            delay = max(0, index * self.resolution - self.clock.seconds())
+            self.next_call = self.clock.callLater(delay, self._fire)
+
+    def _fire(self):
+        """
+        Fire all tasks in all buckets that are due.
+
+        """
+        self.next_call = None
+        # the timer was set for next_bucket, so it is due even if float
+        # rounding puts the current time just before its start
+        armed = self.next_bucket
+        now = self.clock.seconds()
+        resolution = self.resolution
+        buckets = self.buckets
+        heap = self.bucket_heap
+        due = []
+        while heap and (heap[0] <= armed or heap[0] * resolution <= now):
+            due.extend(buckets.pop(heappop(heap)))
+        # tasks added by the callbacks wait for the next pass, even if
+        # they end up in a bucket that is already due
+        for task in due:
+            if task.cancelled:
+                continue
+            self.ntasks -= 1
+            task.called = True
+            try:
+                if task.taskid is not None:
+                    self._delete(task)
+                task.callback(*task.args, **task.kwargs)
+            except Exception:
+                log_trace()
+        self._reschedule()
+
+    def _cancel(self, task):
+        """
+        Remove a cancelled task. It is left in its bucket and skipped
+        when the bucket fires.
+
+        Args:
+            task (TaskHandle): The cancelled task.
+
+        """
+        self.ntasks -= 1
+        if task.taskid is not None:
+            self._delete(task)
+
+    def _save(self, task):
+        """
+        Store a persistent task in the database.
+
+        Args:
+            task (TaskHandle): The task to store.
+
+        Raises:
+            ValueError: If the callback is neither a function in a module
+                nor a method on a database entity.
+
+        """
+        _init_db()
+        callback = task.callback
+        obj, methodname, path = None, None, None
+        if inspect.ismethod(callback):
+            obj, methodname = callback.im_self, callback.im_func.func_name
+            if _DBSERIALIZE.pack_dbobj(obj) is obj:
+                raise ValueError("%s is not a method on a database entity." % callback)
+        elif inspect.isfunction(callback):
+            path = "%s.%s" % (callback.__module__, callback.func_name)
+        else:
+            raise ValueError("%s is not a function or method." % callback)
+        self.last_taskid += 1
+        task.taskid = self.last_taskid
+        data = (obj, methodname, path, task.args, task.kwargs, task.deadline)
+        _SERVERCONFIG.objects.create(db_key="%s:%i" % (self.save_name, task.taskid),
+                                     db_value=pickle.dumps(_DBSERIALIZE.dbserialize(data)))
+
+    def _delete(self, task):
+        """
+        Remove a persistent task from the database.
+
+        Args:
+            task (TaskHandle): The task to remove.
+
+        """
+        _SERVERCONFIG.objects.filter(db_key="%s:%i" % (self.save_name, task.taskid)).delete()
+
+    def restore(self):
+        """
+        Re-schedule all persistent tasks stored in the database. This
+        is called by the server at startup. Tasks that should have
+        fired while the server was down will fire right away.
+
+        """
+        from evennia.utils.utils import variable_from_module
+        _init_db()
+        rows = _SERVERCONFIG.objects.filter(
+            db_key__startswith="%s:" % self.save_name).values_list("db_key", "db_value")
+        obsolete = []
+        for row_key, value in rows.iterator():
+            try:
+                taskid = int(row_key.rsplit(":", 1)[1])
+                obj, methodname, path, args, kwargs, deadline = \
+                    _DBSERIALIZE.dbunserialize(pickle.loads(str(value)))
+                if methodname:
+                    if not obj:
+                        # the object was deleted
+                        obsolete.append(row_key)
+                        continue
+                    callback = getattr(obj, methodname)
+                else:
+                    modname, varname = path.rsplit(".", 1)
+                    callback = variable_from_module(modname, varname)
+            except Exception:
+                log_trace("TaskHandler: Removing malformed task %s." % row_key)
+                obsolete.append(row_key)
+                continue
+            task = TaskHandle(self, deadline, callback, args, kwargs)
+            task.taskid = taskid
+            self.last_taskid = max(self.last_taskid, taskid)
+            self._schedule(task)
+        if obsolete:
+            _SERVERCONFIG.objects.filter(db_key__in=obsolete).delete()
+
+
+# main task handler
+TASK_HANDLER = TaskHandler()
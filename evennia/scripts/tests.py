@@ -1,8 +1,19 @@
 # this is an optimized version only available in later Django versions
 from unittest import TestCase
+from mock import patch
+from twisted.internet.task import Clock
 from evennia.scripts.models import ScriptDB, ObjectDoesNotExist
 from evennia.utils.create import create_script
-from evennia.scripts.scripts import DoNothing
+from evennia.scripts.scripts import DoNothing, ScriptTask, ScriptTimerPool
+from evennia.scripts.tickerhandler import Ticker, TickerHandler
+from evennia.scripts.taskhandler import TaskHandler
+from evennia.server.models import ServerConfig
+from evennia.utils.dbserialize import dbserialize
+
+
+def _ticker_callback(*args, **kwargs):
+    "Stand-alone callback for ticker and task tests"
+    pass
 
 
 class TestScriptDB(TestCase):
@@ -40,3 +51,252 @@ class TestScriptDB(TestCase):
         "Can deleted scripts be said to be valid?"
         self.scr.delete()
         self.assertFalse(self.scr.is_valid())  # assertRaises? See issue #509
+
+
+class TestValidate(TestCase):
+    "Check validation of scripts in chunks"
+    def setUp(self):
+        self.scripts = [create_script(DoNothing, key="validate%i" % i) for i in range(3)]
+
+    def tearDown(self):
+        for script in self.scripts:
+            try:
+                script.delete()
+            except ObjectDoesNotExist:
+                pass
+
+    def test_validate(self):
+        nr_scripts = ScriptDB.objects.count()
+        self.assertEqual(ScriptDB.objects.validate(), (0, 0))
+        self.assertEqual(len(list(ScriptDB.objects._iter_chunks(2))), (nr_scripts + 1) // 2)
+        nr_started, nr_stopped = ScriptDB.objects.validate(init_mode="reload")
+        self.assertEqual(nr_started, nr_scripts)
+        self.assertTrue(all(script.is_active for script in self.scripts))
+
+    def test_validate_stop(self):
+        self.scripts[0].is_valid = lambda: False
+        self.assertEqual(ScriptDB.objects.validate(scripts=self.scripts), (0, 1))
+        self.assertFalse(ScriptDB.objects.filter(db_key="validate0").exists())
+        self.assertEqual(ScriptDB.objects.validate(key="nonexistent"), (None, None))
+
+    def test_validate_stop_bulk(self):
+        from evennia.typeclasses.models import Attribute
+        self.scripts[0].db.state = "on"
+        attrid = self.scripts[0].attributes.get("state", return_obj=True).id
+        stopped = []
+        for script in self.scripts[:2]:
+            script.is_valid = lambda: False
+            script.at_stop = lambda script=script: stopped.append(script.key)
+        # a failing hook does not keep the others from being deleted
+        self.scripts[2].is_valid = lambda: False
+        self.scripts[2].at_stop = lambda: 1 / 0
+        with patch("evennia.scripts.manager.log_trace") as log_trace:
+            self.assertEqual(ScriptDB.objects.validate(scripts=self.scripts), (0, 3))
+            self.assertTrue(log_trace.called)
+        self.assertEqual(stopped, ["validate0", "validate1"])
+        self.assertFalse(ScriptDB.objects.filter(db_key__startswith="validate").exists())
+        self.assertFalse(Attribute.objects.filter(id=attrid).exists())
+        self.assertRaises(ObjectDoesNotExist, self.scripts[0].delete)
+
+
+class TestTicker(TestCase):
+    "Check that sharded tickers spread subscribers over the interval"
+    def _make_ticker(self, interval, nsubs):
+        ticker = Ticker(interval)
+        ticker.task.clock = self.clock = Clock()
+        self.called = []
+        for i in range(nsubs):
+            ticker.add(("key", i), i, _callback=self.called.append, _obj=None)
+        return ticker
+
+    def test_unsharded(self):
+        ticker = self._make_ticker(5, 20)
+        self.assertEqual(ticker.nshards, 1)
+        self.clock.advance(5)
+        self.assertEqual(sorted(self.called), range(20))
+        self.assertEqual(ticker.stats["ticks"], 1)
+        ticker.stop()
+
+    def test_sharded(self):
+        with patch("evennia.scripts.tickerhandler._TICKER_SHARDS", 4):
+            ticker = self._make_ticker(5, 20)
+        self.assertEqual(ticker.nshards, 4)
+        self.assertEqual(sum(len(shard) for shard in ticker.shards), 20)
+        # each step ticks one shard
+        self.clock.advance(1.25)
+        self.assertEqual(len(self.called), len(ticker.shards[0]))
+        self.clock.pump([1.25, 1.25, 1.25])
+        self.assertEqual(sorted(self.called), range(20))
+        self.assertEqual(ticker.stats["ticks"], 4)
+        self.assertEqual(ticker.stats["overruns"], 0)
+        ticker.remove(("key", 0))
+        self.assertEqual(sum(len(shard) for shard in ticker.shards), 19)
+        ticker.stop()
+        self.assertFalse(ticker.task.running)
+
+
+class TestTickerHandler(TestCase):
+    "Check that ticker subscriptions are stored one per row"
+    def setUp(self):
+        self.handler = TickerHandler(save_name="test_tickers")
+
+    def tearDown(self):
+        self.handler.clear()
+        ServerConfig.objects.filter(db_key__startswith="test_tickers").delete()
+
+    def _rows(self):
+        return ServerConfig.objects.filter(db_key__startswith="test_tickers:").count()
+
+    def test_batched_save(self):
+        for i in range(10):
+            self.handler.add(10, _ticker_callback, idstring=str(i))
+        # nothing is written until the save is flushed
+        self.assertEqual(self._rows(), 0)
+        self.assertTrue(self.handler._save_task)
+        self.handler._flush()
+        self.assertEqual(self._rows(), 10)
+        self.handler.remove(10, _ticker_callback, idstring="0")
+        self.handler._flush()
+        self.assertEqual(self._rows(), 9)
+
+    def test_restore(self):
+        for i in range(5):
+            self.handler.add(10, _ticker_callback, idstring=str(i))
+        self.handler.add(20, _ticker_callback, persistent=False)
+        self.handler.save()
+        self.handler.ticker_pool.stop()
+        handler = TickerHandler(save_name="test_tickers")
+        handler.restore(server_reload=False)
+        # the non-persistent ticker is gone, also from the database
+        self.assertEqual(len(handler.ticker_storage), 5)
+        self.assertEqual(self._rows(), 5)
+        handler.ticker_pool.stop()
+
+    def test_restore_legacy(self):
+        # subscriptions saved as a single blob are moved to separate rows
+        self.handler.add(10, _ticker_callback)
+        store_key, data = self.handler.ticker_storage.items()[0]
+        self.handler.ticker_pool.stop()
+        ServerConfig.objects.conf(key="test_tickers", value=dbserialize({store_key: data}))
+        handler = TickerHandler(save_name="test_tickers")
+        handler.restore()
+        self.assertEqual(handler.ticker_storage.keys(), [store_key])
+        self.assertEqual(self._rows(), 1)
+        self.assertFalse(ServerConfig.objects.conf(key="test_tickers"))
+        handler.ticker_pool.stop()
+
+
+class TestTaskHandler(TestCase):
+    "Check the scheduling of delayed tasks"
+    def setUp(self):
+        self.clock = Clock()
+        self.handler = TaskHandler(save_name="test_tasks", clock=self.clock)
+        self.called = []
+
+    def tearDown(self):
+        ServerConfig.objects.filter(db_key__startswith="test_tasks").delete()
+
+    def test_fire(self):
+        for delay in (1, 1, 2.5, 0.01):
+            self.handler.add(delay, self.called.append, delay)
+        self.assertEqual(len(self.handler), 4)
+        self.clock.advance(1)
+        self.assertEqual(sorted(self.called), [0.01, 1, 1])
+        self.clock.advance(1.5)
+        self.assertEqual(len(self.called), 4)
+        self.assertEqual(len(self.handler), 0)
+        self.assertFalse(self.handler.next_call)
+
+    def test_float_rounding(self):
+        # 4.3 / 0.1 is just below 43, but the task goes in bucket 43
+        handler = TaskHandler(resolution=0.1, save_name="test_tasks", clock=self.clock)
+        handler.add(4.3, self.called.append, 4.3)
+        self.clock.advance(4.3)
+        self.assertEqual(self.called, [4.3])
+        self.assertFalse(handler.next_call)
+
+    def test_redelay(self):
+        handler = self.handler
+        passes = []
+        fire = handler._fire
+        handler._fire = lambda: (passes.append(True), fire())
+
+        def _callback():
+            self.called.append(len(passes))
+            if len(self.called) < 3:
+                handler.add(0, _callback)
+        handler.add(1, _callback)
+        self.clock.advance(1)
+        # each re-delayed call runs in a pass of its own
+        self.assertEqual(self.called, [1, 2, 3])
+
+    def test_cancel(self):
+        task = self.handler.add(1, self.called.append, 1)
+        self.handler.add(1, self.called.append, 2)
+        task.cancel()
+        self.assertFalse(task.active())
+        self.assertEqual(len(self.handler), 1)
+        self.clock.advance(1)
+        self.assertEqual(self.called, [2])
+        # cancelling a fired task does nothing
+        task.cancel()
+
+    def test_persistent(self):
+        self.handler.add(5, _ticker_callback, 1, persistent=True)
+        task = self.handler.add(5, _ticker_callback, 2, persistent=True)
+        self.assertRaises(ValueError, self.handler.add, 5, self.called.append, persistent=True)
+        task.cancel()
+        handler = TaskHandler(save_name="test_tasks", clock=self.clock)
+        handler.restore()
+        self.assertEqual(len(handler), 1)
+        self.clock.advance(5)
+        self.assertEqual(len(handler), 0)
+        self.assertFalse(ServerConfig.objects.filter(db_key__startswith="test_tasks:").exists())
+
+
+class TestScriptTimerPool(TestCase):
+    "Check that script tasks with the same interval share timers"
+    def setUp(self):
+        self.clock = Clock()
+        self.pool = ScriptTimerPool(clock=self.clock)
+        self.called = []
+
+    def _make_task(self, name):
+        return ScriptTask(lambda: self.called.append(name), pool=self.pool)
+
+    def test_shared_timer(self):
+        tasks = [self._make_task(i) for i in range(10)]
+        for task in tasks:
+            task.start(10, now=False)
+        self.assertEqual(len(self.pool.timers), 1)
+        self.clock.advance(5)
+        late = self._make_task("late")
+        late.start(10, now=False)
+        self.assertEqual(len(self.pool.timers), 2)
+        self.assertEqual(tasks[0].next_call_time(), 5)
+        self.clock.advance(5)
+        self.assertEqual(len(self.called), 10)
+        self.assertEqual(tasks[0].callcount, 1)
+        self.clock.advance(5)
+        self.assertEqual(self.called[-1], "late")
+        for task in tasks:
+            task.stop()
+        self.assertEqual(len(self.pool.timers), 1)
+        late.stop()
+        self.assertFalse(self.pool.timers)
+
+    def test_force_repeat(self):
+        task = self._make_task("task")
+        other = self._make_task("other")
+        task.start(10, now=True)
+        other.start(10, now=True)
+        self.assertEqual(task.callcount, 1)
+        self.clock.advance(3)
+        task.force_repeat()
+        self.assertEqual(task.callcount, 2)
+        self.assertEqual(task.next_call_time(), 10)
+        self.assertEqual(other.next_call_time(), 7)
+        self.assertEqual(len(self.pool.timers), 2)
+        task.stop()
+        other.stop()
+        self.assertFalse(self.pool.timers)
@@ -64,11 +64,32 @@ If one wants to duplicate TICKER_HANDLER's auto-saving feature in
 a  custom handler one can make a custom `AT_STARTSTOP_MODULE` entry to
 call the handler's `save()` and `restore()` methods when the server reboots.
 
+Each subscription is stored in its own `ServerConfig` row. Adding or
+removing a subscription only marks it as changed; all changes are
+written to the database together shortly afterwards.
+
+If very many objects subscribe to the same interval, calling them all
+at once will stall the server for the duration of the tick. Setting
+`settings.TICKER_SHARDS` to a value > 1 splits the subscribers of each
+interval into that many shards ("phases") that tick one after another,
+spread evenly over the interval. Each subscriber is still called once
+per interval. Every ticker keeps track of how long its ticks take in
+`ticker.stats`.
+
 """
 import inspect
 from builtins import object
-
+from hashlib import md5
+from time import time
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from twisted.internet import reactor
 from twisted.internet.defer import inlineCallbacks
+from django.conf import settings
+from django.db import transaction
 from django.core.exceptions import ObjectDoesNotExist
 from evennia.scripts.scripts import ExtendedLoopingCall
 from evennia.server.models import ServerConfig
@@ -79,6 +100,14 @@ from evennia.utils import variable_from_module
 _GA = object.__getattribute__
 _SA = object.__setattr__
 
+_TICKER_SHARDS = max(1, settings.TICKER_SHARDS)
+# the shortest time between two shards of the same ticker, in seconds
+_MIN_SHARD_INTERVAL = 0.1
+# changes to subscriptions are saved this many seconds after the first
+# change, so that a burst of changes is written in one go
+_SAVE_DELAY = 1.0
+# max number of database rows to write or delete per query
+_SAVE_CHUNK_SIZE = 500
 
 _ERROR_ADD_TICKER = \
 """TickerHandler: Tried to add an invalid ticker:
@@ -95,7 +124,9 @@ class Ticker(object):
     @inlineCallbacks
     def _callback(self):
         """
-        This will be called repeatedly every `self.interval` seconds.
+        This will be called repeatedly every `self.interval` seconds,
+        or every `self.interval / self.nshards` seconds if the ticker
+        is sharded, in which case only one shard is ticked per call.
         `self.subscriptions` contain tuples of (obj, args, kwargs) for
         each subscribing object.
 
@@ -112,7 +143,15 @@ class Ticker(object):
         self._to_add = []
         self._to_remove = []
         self._is_ticking = True
-        for store_key, (args, kwargs) in self.subscriptions.iteritems():
+        starttime = time()
+        subscriptions = self.subscriptions
+        if self.nshards > 1:
+            store_keys = self.shards[self._phase]
+            self._phase = (self._phase + 1) % self.nshards
+        else:
+            store_keys = subscriptions
+        for store_key in store_keys:
+            args, kwargs = subscriptions[store_key]
             callback = yield kwargs.pop("_callback", "at_tick")
             obj = yield kwargs.pop("_obj", None)
             try:
@@ -138,6 +177,7 @@ class Ticker(object):
                 kwargs["_obj"] = obj
         # cleanup - we do this here to avoid changing the subscription dict while it loops
         self._is_ticking = False
+        self._update_stats(time() - starttime)
         for store_key in self._to_remove:
             self.remove(store_key)
         for store_key, (args, kwargs) in self._to_add:
@@ -156,12 +196,51 @@ class Ticker(object):
         """
         self.interval = interval
         self.subscriptions = {}
+        # never tick shards closer together than _MIN_SHARD_INTERVAL
+        self.nshards = max(1, min(_TICKER_SHARDS, int(interval / _MIN_SHARD_INTERVAL)))
+        self.shards = [set() for _ in range(self.nshards)]
+        self._phase = 0
         self._is_ticking = False
         self._to_remove = []
         self._to_add = []
+        self.stats = {"ticks": 0,
+                      "last_duration": 0.0,
+                      "max_duration": 0.0,
+                      "overruns": 0}
         # set up a twisted asynchronous repeat call
         self.task = ExtendedLoopingCall(self._callback)
 
+    def _get_shard(self, store_key):
+        """
+        Get the shard a subscription belongs to.
+
+        Args:
+            store_key (tuple): Unique store key.
+
+        Returns:
+            shard (set): The set of store keys ticked together with
+                this one.
+
+        """
+        return self.shards[hash(store_key) % self.nshards]
+
+    def _update_stats(self, duration):
+        """
+        Record the time it took to tick.
+
+        Args:
+            duration (float): The duration of the tick, in seconds. If
+                this is longer than the time until the next tick, it is
+                counted as an overrun.
+
+        """
+        stats = self.stats
+        stats["ticks"] += 1
+        stats["last_duration"] = duration
+        stats["max_duration"] = max(stats["max_duration"], duration)
+        if duration > float(self.interval) / self.nshards:
+            stats["overruns"] += 1
+
     def validate(self, start_delay=None):
         """
         Start/stop the task depending on how many subscribers we have
@@ -176,7 +255,8 @@ class Ticker(object):
             if not subs:
                 self.task.stop()
         elif subs:
-            self.task.start(self.interval, now=False, start_delay=start_delay)
+            self.task.start(float(self.interval) / self.nshards,
+                            now=False, start_delay=start_delay)
 
     def add(self, store_key, *args, **kwargs):
         """
@@ -198,6 +278,8 @@ class Ticker(object):
         else:
             start_delay = kwargs.pop("_start_delay", None)
             self.subscriptions[store_key] = (args, kwargs)
+            if self.nshards > 1:
+                self._get_shard(store_key).add(store_key)
             self.validate(start_delay=start_delay)
 
     def remove(self, store_key):
@@ -214,6 +296,8 @@ class Ticker(object):
             self._to_remove.append(store_key)
         else:
             self.subscriptions.pop(store_key, False)
+            if self.nshards > 1:
+                self._get_shard(store_key).discard(store_key)
             self.validate()
 
     def stop(self):
@@ -222,6 +306,7 @@ class Ticker(object):
 
         """
         self.subscriptions = {}
+        self.shards = [set() for _ in range(self.nshards)]
         self.validate()
 
 
@@ -310,6 +395,11 @@ class TickerHandler(object):
         self.ticker_storage = {}
         self.save_name = save_name
         self.ticker_pool = self.ticker_pool_class()
+        # store_key: ServerConfig key of stored subscriptions
+        self._row_keys = {}
+        # subscriptions changed since the last save
+        self._dirty = set()
+        self._save_task = None
 
     def _get_callback(self, callback):
         """
@@ -375,34 +465,141 @@ class TickerHandler(object):
         outpath = path if path and isinstance(path, basestring) else None
         return (packed_obj, methodname, outpath, interval, idstring, persistent)
 
+    def _get_row_key(self, store_key):
+        """
+        Get the key of the database row storing a subscription.
+
+        Args:
+            store_key (tuple): Unique storage hash.
+
+        Returns:
+            row_key (str): The `ServerConfig` key for this subscription.
+
+        """
+        try:
+            return self._row_keys[store_key]
+        except KeyError:
+            row_key = "%s:%s" % (self.save_name, md5(repr(store_key)).hexdigest())
+            self._row_keys[store_key] = row_key
+            return row_key
+
+    def _schedule_save(self, store_key):
+        """
+        Mark a subscription as changed. Changes are written to the
+        database shortly afterwards, all at once.
+
+        Args:
+            store_key (tuple): Unique storage hash of a subscription
+                that was added, changed or removed.
+
+        """
+        self._dirty.add(store_key)
+        if not self._save_task:
+            self._save_task = reactor.callLater(_SAVE_DELAY, self._flush)
+
+    def _flush(self):
+        """
+        Write all changed subscriptions to the database. Each
+        subscription is stored as a separate `ServerConfig` row.
+
+        """
+        if self._save_task and self._save_task.active():
+            self._save_task.cancel()
+        self._save_task = None
+        dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return
+        row_keys, to_save = [], []
+        for store_key in dirty:
+            row_key = self._get_row_key(store_key)
+            row_keys.append(row_key)
+            data = self.ticker_storage.get(store_key)
+            if data:
+                args, kwargs = data
+                obj = kwargs.get("_obj")
+                if ((store_key[1] and obj and obj.pk and hasattr(obj, store_key[1])) or
+                        store_key[2]):
+                    # a valid method with existing obj, or a path given
+                    to_save.append(ServerConfig(
+                        db_key=row_key,
+                        db_value=pickle.dumps(dbserialize((store_key, args, kwargs)))))
+                    continue
+            # removed, or lost its object in the interim
+            del self._row_keys[store_key]
+        with transaction.atomic():
+            for ichunk in range(0, len(row_keys), _SAVE_CHUNK_SIZE):
+                ServerConfig.objects.filter(
+                    db_key__in=row_keys[ichunk:ichunk + _SAVE_CHUNK_SIZE]).delete()
+            ServerConfig.objects.bulk_create(to_save, batch_size=_SAVE_CHUNK_SIZE)
+
     def save(self):
         """
-        Save ticker_storage as a serialized string into a temporary
-        ServerConf field. Whereas saving is done on the fly, if called
-        by server when it shuts down, the current timer of each ticker
-        will be saved so it can start over from that point.
-
-        """
-        if self.ticker_storage:
-            # get the current times so the tickers can be restarted with a delay later
-            start_delays = dict((interval, ticker.task.next_call_time())
-                                 for interval, ticker in self.ticker_pool.tickers.items())
-
-            # remove any subscriptions that lost its object in the interim
-            to_save = {store_key: (args, kwargs) for store_key, (args, kwargs) in self.ticker_storage.items()
-                        if ((store_key[1] and ("_obj" in kwargs and kwargs["_obj"].pk) and
-                             hasattr(kwargs["_obj"], store_key[1])) or    # a valid method with existing obj
-                           store_key[2])}  # a path given
-
-            # update the timers for the tickers
-            for store_key, (args, kwargs) in to_save.items():
-                interval = store_key[1]
-                # this is a mutable, so it's updated in-place in ticker_storage
-                kwargs["_start_delay"] = start_delays.get(interval, None)
-            ServerConfig.objects.conf(key=self.save_name, value=dbserialize(to_save))
-        else:
-            # make sure we have nothing lingering in the database
-            ServerConfig.objects.conf(key=self.save_name, delete=True)
+        Save all subscriptions to the database right away. Changes
+        made with `add` and `remove` are saved automatically; this
+        is called by the server when it shuts down, so the current
+        timer of each ticker is saved and it can start over from that
+        point.
+
+        """
+        # get the current times so the tickers can be restarted with a delay later
+        start_delays = dict((interval, ticker.task.next_call_time())
+                            for interval, ticker in self.ticker_pool.tickers.items())
+        for store_key, (args, kwargs) in self.ticker_storage.items():
+            # this is a mutable, so it's updated in-place in ticker_storage
+            kwargs["_start_delay"] = start_delays.get(store_key[3], None)
+            self._dirty.add(store_key)
+        self._flush()
+
+    def _restore_ticker(self, store_key, args, kwargs, server_reload):
+        """
+        Re-add a single subscription loaded from the database.
+
+        Args:
+            store_key (tuple): The stored key, with the object unpacked.
+            args (tuple): Arguments for the callback.
+            kwargs (dict): Keyword arguments for the callback.
+            server_reload (bool): If False, non-persistent tickers
+                are not restored.
+
+        Returns:
+            store_key (tuple or None): The rebuilt store key, or `None`
+                if the subscription was discarded.
+
+        """
+        try:
+            # at this point obj is the actual object (or None) due to how
+            # the dbunserialize works
+            obj, callfunc, path, interval, idstring, persistent = store_key
+            if not persistent and not server_reload:
+                # this ticker will not be restarted
+                return None
+            if isinstance(callfunc, basestring) and not obj:
+                # methods must have an existing object
+                return None
+            # we must rebuild the store_key here since obj must not be
+            # stored as the object itself for the store_key to be hashable.
+            store_key = self._store_key(obj, path, interval, callfunc, idstring, persistent)
+
+            if obj and callfunc:
+                kwargs["_callback"] = callfunc
+                kwargs["_obj"] = obj
+            elif path:
+                modname, varname = path.rsplit(".", 1)
+                callback = variable_from_module(modname, varname)
+                kwargs["_callback"] = callback
+                kwargs["_obj"] = None
+            else:
+                # Neither object nor path - discard this ticker
+                log_err("Tickerhandler: Removing malformed ticker: %s" % str(store_key))
+                return None
+        except Exception:
+            # this suggests a malformed save or missing objects
+            log_trace("Tickerhandler: Removing malformed ticker: %s" % str(store_key))
+            return None
+        # if we get here we should create a new ticker
+        self.ticker_storage[store_key] = (args, kwargs)
+        self.ticker_pool.add(store_key, *args, **kwargs)
+        return store_key
 
     def restore(self, server_reload=True):
         """
@@ -416,47 +613,40 @@ class TickerHandler(object):
                 non-persistent tickers must be killed.
 
         """
-        # load stored command instructions and use them to re-initialize handler
+        self.ticker_storage = {}
+        self._row_keys = {}
+        obsolete = []
+
+        # tickers stored as one big blob by older versions are moved
+        # to per-subscription storage
         restored_tickers = ServerConfig.objects.conf(key=self.save_name)
         if restored_tickers:
-            # the dbunserialize will convert all serialized dbobjs to real objects
-
-            restored_tickers = dbunserialize(restored_tickers)
-            self.ticker_storage = {}
-            for store_key, (args, kwargs) in restored_tickers.iteritems():
-                try:
-                    # at this point obj is the actual object (or None) due to how
-                    # the dbunserialize works
-                    obj, callfunc, path, interval, idstring, persistent = store_key
-                    if not persistent and not server_reload:
-                        # this ticker will not be restarted
-                        continue
-                    if isinstance(callfunc, basestring) and not obj:
-                        # methods must have an existing object
-                        continue
-                    # we must rebuild the store_key here since obj must not be
-                    # stored as the object itself for the store_key to be hashable.
-                    store_key = self._store_key(obj, path, interval, callfunc, idstring, persistent)
-
-                    if obj and callfunc:
-                        kwargs["_callback"] = callfunc
-                        kwargs["_obj"] = obj
-                    elif path:
-                        modname, varname = path.rsplit(".", 1)
-                        callback = variable_from_module(modname, varname)
-                        kwargs["_callback"] = callback
-                        kwargs["_obj"] = None
-                    else:
-                        # Neither object nor path - discard this ticker
-                        log_err("Tickerhandler: Removing malformed ticker: %s" % str(store_key))
-                        continue
-                except Exception:
-                    # this suggests a malformed save or missing objects
-                    log_trace("Tickerhandler: Removing malformed ticker: %s" % str(store_key))
-                    continue
-                # if we get here we should create a new ticker
-                self.ticker_storage[store_key] = (args, kwargs)
-                self.ticker_pool.add(store_key, *args, **kwargs)
+            for store_key, (args, kwargs) in dbunserialize(restored_tickers).iteritems():
+                store_key = self._restore_ticker(store_key, args, kwargs, server_reload)
+                if store_key:
+                    self._dirty.add(store_key)
+            obsolete.append(self.save_name)
+
+        # stream the subscriptions from the database, one row at a time
+        rows = ServerConfig.objects.filter(
+            db_key__startswith="%s:" % self.save_name).values_list("db_key", "db_value")
+        for row_key, value in rows.iterator():
+            try:
+                store_key, args, kwargs = dbunserialize(pickle.loads(str(value)))
+            except Exception:
+                log_trace("Tickerhandler: Removing unreadable ticker: %s" % row_key)
+                obsolete.append(row_key)
+                continue
+            store_key = self._restore_ticker(store_key, args, kwargs, server_reload)
+            if store_key:
+                self._row_keys[store_key] = row_key
+            else:
+                obsolete.append(row_key)
+
+        for ichunk in range(0, len(obsolete), _SAVE_CHUNK_SIZE):
+            ServerConfig.objects.filter(
+                db_key__in=obsolete[ichunk:ichunk + _SAVE_CHUNK_SIZE]).delete()
+        self._flush()
 
     def add(self, interval=60, callback=None, idstring="", persistent=True, *args, **kwargs):
         """
@@ -499,7 +689,7 @@ class TickerHandler(object):
         kwargs["_callback"] = callfunc # either method-name or callable
         self.ticker_storage[store_key] = (args, kwargs)
         self.ticker_pool.add(store_key, *args, **kwargs)
-        self.save()
+        self._schedule_save(store_key)
 
     def remove(self, interval=60, callback=None, idstring="", persistent=True):
         """
@@ -522,7 +712,7 @@ class TickerHandler(object):
         to_remove = self.ticker_storage.pop(store_key, None)
         if to_remove:
             self.ticker_pool.remove(store_key)
-            self.save()
+            self._schedule_save(store_key)
 
     def clear(self, interval=None):
         """
@@ -538,12 +728,15 @@ class TickerHandler(object):
         """
         self.ticker_pool.stop(interval)
         if interval:
-            self.ticker_storage = dict((store_key, store_key)
-                                        for store_key in self.ticker_storage
-                                        if store_key[1] != interval)
+            self._dirty.update(store_key for store_key in self.ticker_storage
+                               if store_key[3] == interval)
+            self.ticker_storage = dict((store_key, data)
+                                       for store_key, data in self.ticker_storage.iteritems()
+                                       if store_key[3] != interval)
         else:
+            self._dirty.update(self.ticker_storage)
             self.ticker_storage = {}
-        self.save()
+        self._flush()
 
     def all(self, interval=None):
         """
@@ -363,10 +363,7 @@ class AMPProtocol(amp.AMP):
         if hasattr(self.factory, "portal"):
             # only the portal has the 'portal' property, so we know we are
             # on the portal side and can initialize the connection.
-            sessdata = self.factory.portal.sessions.get_all_sync_data()
-            self.send_AdminPortal2Server(DUMMYSESSION,
-                                         PSYNC,
-                                         sessiondata=sessdata)
+            self.factory.portal.sessions.server_resync()
             self.factory.portal.sessions.at_server_connection()
             if hasattr(self.factory, "server_restart_mode"):
                 del self.factory.server_restart_mode
@@ -400,13 +397,16 @@ class AMPProtocol(amp.AMP):
         logger.log_err("AMP Error for %(info)s: %(e)s" % {'info': info,
                                                           'e': e.getErrorMessage()})
 
-    def send_data(self, command, sessid, **kwargs):
+    def send_data(self, command, sessid, trap_errors=True, **kwargs):
         """
         Send data across the wire.
 
         Args:
             command (AMP Command): A protocol send command.
             sessid (int): A unique Session id.
+            trap_errors (bool, optional): Log and swallow errors. If
+                unset, the returned deferred fails if the sending does,
+                for callers that must react to it.
 
         Returns:
             deferred (deferred or None): A deferred with an errback.
@@ -416,9 +416,10 @@ class AMPProtocol(amp.AMP):
             (sessid, kwargs).
 
         """
-        return self.callRemote(command,
-                               packed_data=dumps((sessid, kwargs))
-                               ).addErrback(self.errback, command.key)
+        deferred = self.callRemote(command, packed_data=dumps((sessid, kwargs)))
+        if trap_errors:
+            deferred.addErrback(self.errback, command.key)
+        return deferred
 
     # Message definition + helper methods to call/create each message type
 
@@ -466,9 +467,17 @@ class AMPProtocol(amp.AMP):
             packed_data (str): Pickled data (sessid, kwargs) coming over the wire.
         """
         sessid, kwargs = loads(packed_data)
-        session = self.factory.portal.sessions.get(sessid, None)
-        if session:
-            self.factory.portal.sessions.data_out(session, **kwargs)
+        sessions = self.factory.portal.sessions
+        if isinstance(sessid, list):
+            # the same data multicast to many sessions
+            for sessid in sessid:
+                session = sessions.get(sessid, None)
+                if session:
+                    sessions.data_out(session, **kwargs)
+        else:
+            session = sessions.get(sessid, None)
+            if session:
+                sessions.data_out(session, **kwargs)
         return {}
 
 
@@ -478,10 +487,13 @@ class AMPProtocol(amp.AMP):
             to Portal.
 
         Args:
-            session (Session): Unique Session.
+            session (Session or list): Unique Session, or a list of
+                Sessions to all send the same data to.
             kwargs (any, optiona): Extra data.
 
         """
+        if isinstance(session, list):
+            return self.send_data(MsgServer2Portal, [sess.sessid for sess in session], **kwargs)
         return self.send_data(MsgServer2Portal, session.sessid, **kwargs)
 
     # Server administration from the Portal side
@@ -521,13 +533,16 @@ class AMPProtocol(amp.AMP):
             # server (e.g. after a server reboot) the data kwarg
             # contains a dict {sessid: {arg1:val1,...}}
             # representing the attributes to sync for each
-            # session.
-            server_sessionhandler.portal_sessions_sync(kwargs.get("sessiondata"))
+            # session. The portal may split this into several
+            # chunks, marked by the first/final kwargs.
+            server_sessionhandler.portal_sessions_sync(kwargs.get("sessiondata"),
+                                                       first=kwargs.get("first", True),
+                                                       final=kwargs.get("final", True))
         else:
             raise Exception("operation %(op)s not recognized." % {'op': operation})
         return {}
 
-    def send_AdminPortal2Server(self, session, operation="", **kwargs):
+    def send_AdminPortal2Server(self, session, operation="", trap_errors=True, **kwargs):
         """
         Send Admin instructions from the Portal to the Server.
         Executed
@@ -537,10 +552,13 @@ class AMPProtocol(amp.AMP):
             session (Session): Session.
             operation (char, optional): Identifier for the server operation, as defined by the
                 global variables in `evennia/server/amp.py`.
+            trap_errors (bool, optional): If unset, errors are passed
+                on to the returned deferred instead of only logged.
             data (str or dict, optional): Data used in the administrative operation.
 
         """
-        return self.send_data(AdminPortal2Server, session.sessid, operation=operation, **kwargs)
+        return self.send_data(AdminPortal2Server, session.sessid, trap_errors=trap_errors,
+                              operation=operation, **kwargs)
 
     # Portal administraton from the Server side
 
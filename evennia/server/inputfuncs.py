@@ -24,6 +24,7 @@ import importlib
 from django.conf import settings
 from evennia.commands.cmdhandler import cmdhandler
 from evennia.players.models import PlayerDB
+from evennia.server.oobreports import OOB_REPORTER
 from evennia.utils.logger import log_err
 from evennia.utils.utils import to_str, to_unicode
 
@@ -355,7 +356,8 @@ def _on_monitor_change(**kwargs):
     obj = kwargs["obj"]
     name = kwargs["name"]
     session = kwargs["session"]
-    session.msg(monitor={"name": name, "value": _GA(obj, fieldname)})
+    # rapid changes are coalesced before being sent
+    OOB_REPORTER.report(session, name, _GA(obj, fieldname))
 
 
 def monitor(session, *args, **kwargs):
@@ -377,6 +379,7 @@ def monitor(session, *args, **kwargs):
         obj = session.puppet
         if kwargs.get("stop", False):
             MONITOR_HANDLER.remove(obj, field_name, idstring=session.sessid)
+            OOB_REPORTER.forget(session.sessid, name)
         else:
             # the handler will add fieldname and obj to the kwargs automatically
             MONITOR_HANDLER.add(obj, field_name, _on_monitor_change, idstring=session.sessid,
@@ -0,0 +1,161 @@
+"""
+OOB report coalescing
+
+Clients can ask to be told whenever a value on their character changes
+(see the `monitor` inputfunc), for example to keep a GMCP/MSDP status
+bar or a webclient widget up to date. Some values, like health during
+combat, may change many times a second; sending every change means
+one OOB message (and one AMP call) per change and client.
+
+The `OOBReporter` instead collects the reports for each Session and
+value name and only sends the latest value. How often depends on
+`settings.OOB_REPORT_MODE`:
+
+- `"throttle"` - the first change is sent right away, later changes
+  at most once every `settings.OOB_REPORT_INTERVAL` seconds.
+- `"debounce"` - a change is sent once the value has stayed the same
+  for at least `settings.OOB_REPORT_INTERVAL` seconds.
+- `None` - every change is sent right away.
+
+If `settings.OOB_REPORT_DELTA_ONLY` is set, a value is not sent again
+if it is the same as the last value sent.
+
+"""
+from django.conf import settings
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+from evennia.utils.logger import log_trace
+
+_MODE = settings.OOB_REPORT_MODE
+_INTERVAL = settings.OOB_REPORT_INTERVAL
+_DELTA_ONLY = settings.OOB_REPORT_DELTA_ONLY
+
+
+class OOBReporter(object):
+    """
+    Coalesces OOB `monitor` reports per Session and value name.
+    Pending reports are sent by a single timer, which only runs
+    while there is something to send.
+
+    """
+    def __init__(self, mode=_MODE, interval=_INTERVAL, delta_only=_DELTA_ONLY, clock=reactor):
+        """
+        Initialize the reporter.
+
+        Args:
+            mode (str or None, optional): One of `"throttle"`,
+                `"debounce"` or `None`.
+            interval (float, optional): The time window of the mode, in
+                seconds. If <= 0, all reports are sent right away.
+            delta_only (bool, optional): Don't re-send unchanged values.
+            clock (IReactorTime, optional): The reactor to schedule on.
+                Mainly useful for testing.
+
+        """
+        self.mode = mode if interval > 0 else None
+        self.interval = interval
+        self.delta_only = delta_only
+        self.clock = clock
+        # (sessid, name): (session, value, time of report)
+        self.pending = {}
+        # (sessid, name): last value sent
+        self.last_sent = {}
+        # keys sent during the current throttle window
+        self.recent = set()
+        self.task = None
+        self.stats = {"reported": 0, "sent": 0}
+
+    def _send(self, key, session, value):
+        """
+        Send a report to the session.
+
+        Args:
+            key (tuple): The `(sessid, name)` of the report.
+            session (Session): The session to send to.
+            value (any): The value to report.
+
+        """
+        if self.delta_only:
+            if key in self.last_sent and self.last_sent[key] == value:
+                return
+            self.last_sent[key] = value
+        self.stats["sent"] += 1
+        try:
+            session.msg(monitor={"name": key[1], "value": value})
+        except Exception:
+            log_trace()
+
+    def _start(self):
+        """
+        Start the timer if it is not already running.
+
+        """
+        if not self.task:
+            self.task = LoopingCall(self._flush)
+            self.task.clock = self.clock
+            self.task.start(self.interval / 2.0 if self.mode == "debounce" else self.interval,
+                            now=False)
+
+    def _flush(self):
+        """
+        Send all reports that are due.
+
+        """
+        if self.mode == "debounce":
+            # only send values that have stayed unchanged long enough
+            threshold = self.clock.seconds() - self.interval
+            due = [key for key, (_, _, reported) in self.pending.iteritems()
+                   if reported <= threshold]
+        else:
+            due = self.pending.keys()
+        self.recent = set(due)
+        for key in due:
+            session, value, _ = self.pending.pop(key)
+            self._send(key, session, value)
+        if not self.pending and not self.recent:
+            self.task.stop()
+            self.task = None
+
+    def report(self, session, name, value):
+        """
+        Report a changed value to a session.
+
+        Args:
+            session (Session): The session monitoring the value.
+            name (str): The name the session knows the value by.
+            value (any): The new value.
+
+        """
+        self.stats["reported"] += 1
+        key = (session.sessid, name)
+        if not self.mode:
+            self._send(key, session, value)
+            return
+        if self.mode == "throttle" and key not in self.recent and key not in self.pending:
+            # first change in this window; send right away
+            self.recent.add(key)
+            self._send(key, session, value)
+        else:
+            self.pending[key] = (session, value, self.clock.seconds())
+        self._start()
+
+    def forget(self, sessid, name=None):
+        """
+        Drop pending reports and delta-tracking for a session, for
+        example when it stops monitoring or disconnects.
+
+        Args:
+            sessid (int): The id of the session.
+            name (str, optional): Only forget this value name.
+
+        """
+        for store in (self.pending, self.last_sent):
+            for key in [key for key in store
+                        if key[0] == sessid and (name is None or key[1] == name)]:
+                del store[key]
+        self.recent = set(key for key in self.recent
+                          if not (key[0] == sessid and (name is None or key[1] == name)))
+
+
+# the singleton used by the monitor inputfunc
+OOB_REPORTER = OOBReporter()
@@ -9,21 +9,31 @@ from collections import deque
 from twisted.internet import reactor
 from django.conf import settings
 from evennia.server.sessionhandler import SessionHandler, PCONN, PDISCONN, \
-                                          PCONNSYNC, PDISCONNALL
-from evennia.utils.logger import log_trace
+                                          PCONNSYNC, PDISCONNALL, PSYNC
+from evennia.server.portal.throttle import CommandThrottle
+from evennia.server.portal.timerwheel import TIMER_WHEEL
+from evennia.utils.logger import log_trace, log_err
 
 # module import
 _MOD_IMPORT = None
 
 # throttles
 _MAX_CONNECTION_RATE = float(settings.MAX_CONNECTION_RATE)
-_MAX_COMMAND_RATE = float(settings.MAX_COMMAND_RATE)
+_COMMAND_QUEUE_SIZE = settings.COMMAND_THROTTLE_QUEUE_SIZE
 
 _MIN_TIME_BETWEEN_CONNECTS = 1.0 / float(settings.MAX_CONNECTION_RATE)
 _ERROR_COMMAND_OVERFLOW = settings.COMMAND_RATE_WARNING
+_IDLE_TIMEOUT = settings.IDLE_TIMEOUT
 
 _CONNECTION_QUEUE = deque()
 
+# number of sessions to send per message when re-syncing with the server
+_SYNC_CHUNK_SIZE = 100
+
+# the session properties the portal may update on the server after connecting
+_PORTAL_SYNC_ATTRS = ("protocol_key", "address", "sessid", "csessid",
+                      "conn_time", "protocol_flags", "server_data")
+
 class DummySession(object):
     sessid = 0
 DUMMYSESSION = DummySession()
@@ -56,9 +66,15 @@ class PortalSessionHandler(SessionHandler):
 
         self.connection_last = time()
         self.connection_task = None
-        self.command_counter = 0
-        self.command_counter_reset = time()
-        self.command_overflow = False
+        self.throttle = CommandThrottle()
+        # sessid:deque of throttled input waiting to be relayed
+        self.input_queues = {}
+        self.input_task = None
+        # sessids not yet restored by the Server after it reconnected,
+        # and the input held back for them
+        self.unsynced = set()
+        self.held_input = {}
+        self.sync_chunks = None
 
     def at_server_connection(self):
         """
@@ -68,6 +84,87 @@ class PortalSessionHandler(SessionHandler):
         """
         self.connection_time = time()
 
+    def server_resync(self):
+        """
+        Sync all sessions with the Server, for example after it has
+        reloaded. The sessions are sent in chunks and each chunk is
+        only sent once the Server has restored the one before. Input
+        from a session is held back until the Server has restored it,
+        so players can continue as soon as their own session is back
+        rather than once all sessions are.
+
+        """
+        sessids = sorted(self.keys())
+        chunks = [sessids[ichunk:ichunk + _SYNC_CHUNK_SIZE]
+                  for ichunk in range(0, len(sessids), _SYNC_CHUNK_SIZE)] or [[]]
+        self.unsynced = set(sessids)
+        self.sync_chunks = chunks
+        self._send_sync_chunk(None, chunks, 0)
+
+    def _send_sync_chunk(self, _, chunks, index):
+        """
+        Release the input of the previously synced chunk and send the
+        next one. Called again when the Server answers.
+
+        Args:
+            _ (any): The Server's answer to the previous chunk.
+            chunks (list): All chunks of sessids of this sync.
+            index (int): The chunk to send.
+
+        """
+        if chunks is not self.sync_chunks:
+            # a newer sync has started
+            return
+        if index > 0:
+            for sessid in chunks[index - 1]:
+                self._release_held_input(sessid)
+        if index >= len(chunks):
+            self.sync_chunks = None
+            return
+        sessdata = dict((sessid, self[sessid].get_sync_data())
+                        for sessid in chunks[index] if sessid in self)
+        deferred = self.portal.amp_protocol.send_AdminPortal2Server(
+            DUMMYSESSION, operation=PSYNC, trap_errors=False, sessiondata=sessdata,
+            first=index == 0, final=index == len(chunks) - 1)
+        deferred.addCallbacks(self._send_sync_chunk, self._sync_failed,
+                              callbackArgs=(chunks, index + 1), errbackArgs=(chunks, index))
+
+    def _sync_failed(self, failure, chunks, index):
+        """
+        Give up a sync when the Server fails to answer a chunk. The
+        input held for the remaining sessions is released rather than
+        freezing those players.
+
+        Args:
+            failure (Failure): The error.
+            chunks (list): All chunks of sessids of this sync.
+            index (int): The chunk that failed.
+
+        """
+        if chunks is not self.sync_chunks:
+            return
+        log_err("Portal: session sync with the Server failed: %s" % failure.getErrorMessage())
+        self.sync_chunks = None
+        for chunk in chunks[index:]:
+            for sessid in chunk:
+                self._release_held_input(sessid)
+
+    def _release_held_input(self, sessid):
+        """
+        Mark a session as restored on the Server and relay any input
+        that was held back for it.
+
+        Args:
+            sessid (int): The session id.
+
+        """
+        self.unsynced.discard(sessid)
+        held = self.held_input.pop(sessid, None)
+        session = self.get(sessid)
+        if held and session:
+            for kwargs in held:
+                self.data_in(session, **kwargs)
+
     def connect(self, session):
         """
         Called by protocol at first connect. This adds a not-yet
@@ -117,10 +214,33 @@ class PortalSessionHandler(SessionHandler):
 
             self[session.sessid] = session
             session.server_connected = True
+            if _IDLE_TIMEOUT > 0:
+                TIMER_WHEEL.schedule(("idle", session.sessid), _IDLE_TIMEOUT,
+                                     self._check_idle, session)
             self.portal.amp_protocol.send_AdminPortal2Server(session,
                                                              operation=PCONN,
                                                              sessiondata=sessdata)
 
+    def _check_idle(self, session):
+        """
+        Called by the timer wheel when a session may have been idle
+        for longer than `settings.IDLE_TIMEOUT`. If it was active since
+        the timer was set, the check is rescheduled instead.
+
+        Args:
+            session (PortalSession): The session to check.
+
+        """
+        if self.get(session.sessid) is not session:
+            return
+        idle = time() - session.cmd_last
+        if idle > _IDLE_TIMEOUT:
+            session.disconnect(reason="Idle timeout exceeded, disconnecting.")
+            self.disconnect(session)
+        else:
+            TIMER_WHEEL.schedule(("idle", session.sessid), _IDLE_TIMEOUT - idle,
+                                 self._check_idle, session)
+
     def sync(self, session):
         """
         Called by the protocol of an already connected session. This
@@ -135,17 +255,14 @@ class PortalSessionHandler(SessionHandler):
             # only use if session already has sessid and has already connected
             # once to the server - if so we must re-sync woth the server, otherwise
             # we skip this step.
-            sessdata = session.get_sync_data()
             if self.portal.amp_protocol:
                 # we only send sessdata that should not have changed
-                # at the server level at this point
-                sessdata = dict((key, val) for key, val in sessdata.items() if key in ("protocol_key",
-                                                                                       "address",
-                                                                                       "sessid",
-                                                                                       "csessid",
-                                                                                       "conn_time",
-                                                                                       "protocol_flags",
-                                                                                       "server_data",))
+                # at the server level at this point, and only if it
+                # changed since the last sync
+                sessdata = session.get_sync_data(delta=True, attrs=_PORTAL_SYNC_ATTRS)
+                if len(sessdata) < 2:
+                    # only the sessid; nothing changed
+                    return
                 self.portal.amp_protocol.send_AdminPortal2Server(session,
                                                                  operation=PCONNSYNC,
                                                                  sessiondata=sessdata)
@@ -170,6 +287,10 @@ class PortalSessionHandler(SessionHandler):
             _CONNECTION_QUEUE.remove(session)
             return
 
+        self.throttle.forget(session)
+        self.input_queues.pop(session.sessid, None)
+        TIMER_WHEEL.cancel(("idle", session.sessid))
+
         if session.sessid in self and not hasattr(self, "_disconnect_all"):
             # if this was called directly from the protocol, the
             # connection is already dead and we just need to cleanup
@@ -268,6 +389,7 @@ class PortalSessionHandler(SessionHandler):
 
         """
         session.load_sync_data(data)
+        self.update_index(session)
 
     def server_session_sync(self, serversessions, clean=True):
         """
@@ -287,6 +409,7 @@ class PortalSessionHandler(SessionHandler):
         # save protocols
         for sessid in to_save:
             self[sessid].load_sync_data(serversessions[sessid])
+            self.update_index(self[sessid])
         if clean:
             # disconnect out-of-sync missing protocols
             to_delete = [sessid for sessid in self if sessid not in to_save]
@@ -319,7 +442,7 @@ class PortalSessionHandler(SessionHandler):
             session (list): The matching session, if found.
 
         """
-        return [sess for sess in self.get_sessions(include_unloggedin=True)
+        return [sess for sess in self._sessions_from_index(self.csessid_index, csessid)
                 if hasattr(sess, 'csessid') and sess.csessid and sess.csessid == csessid]
 
     def announce_all(self, message):
@@ -349,38 +472,84 @@ class PortalSessionHandler(SessionHandler):
             kwargs (any): Other data from protocol.
 
         Notes:
-            Data is serialized before passed on.
+            Data is serialized before passed on. Input arriving faster
+            than the throttle allows is queued and relayed later; if
+            the session's queue is full, the input is dropped with a
+            warning. Input from a session the Server has not yet
+            restored after a reload is held back until it has.
 
         """
         #from evennia.server.profiling.timetrace import timetrace
         #text = timetrace(text, "portalsessionhandler.data_in")
 
         if session:
-            now = time()
-            if self.command_counter > _MAX_COMMAND_RATE:
-                # data throttle (anti DoS measure)
-                dT = now - self.command_counter_reset
-                self.command_counter = 0
-                self.command_counter_reset = now
-                self.command_overflow = dT < 1.0
-                if self.command_overflow:
-                    reactor.callLater(1.0, self.data_in, None)
-            if self.command_overflow:
-                self.data_out(session, text=[[_ERROR_COMMAND_OVERFLOW],{}])
+            if session.sessid in self.unsynced:
+                # the Server has not restored this session yet
+                held = self.held_input.setdefault(session.sessid, deque())
+                if len(held) < _COMMAND_QUEUE_SIZE:
+                    held.append(kwargs)
                 return
-            # scrub data
-            kwargs = self.clean_senddata(session, kwargs)
-
-            # relay data to Server
-            self.command_counter += 1
-            session.cmd_last = now
-            self.portal.amp_protocol.send_MsgPortal2Server(session,
-                                                           **kwargs)
-        else:
-           # called by the callLater callback
-            if self.command_overflow:
-                self.command_overflow = False
-                reactor.callLater(1.0, self.data_in, None)
+            throttle = self.throttle
+            if throttle.enabled:
+                # data throttle (anti DoS measure)
+                queue = self.input_queues.get(session.sessid)
+                if queue is not None:
+                    # keep the order; wait behind the earlier input
+                    throttle.count_overflow(session)
+                if queue is not None or not throttle.consume(session):
+                    if queue is None:
+                        queue = self.input_queues[session.sessid] = deque()
+                    if len(queue) >= _COMMAND_QUEUE_SIZE:
+                        throttle.stats["dropped"] += 1
+                        self.data_out(session, text=[[_ERROR_COMMAND_OVERFLOW], {}])
+                    else:
+                        throttle.stats["queued"] += 1
+                        queue.append(kwargs)
+                        if not self.input_task:
+                            self.input_task = reactor.callLater(max(throttle.wait_time(session), 0.01),
+                                                                self._relay_queued_input)
+                    return
+            self._relay_input(session, kwargs)
+
+    def _relay_input(self, session, kwargs):
+        """
+        Scrub the data and send it to the Server.
+
+        Args:
+            session (PortalSession): Session receiving data.
+            kwargs (dict): The data from the protocol.
+
+        """
+        kwargs = self.clean_senddata(session, kwargs)
+        session.cmd_last = time()
+        self.portal.amp_protocol.send_MsgPortal2Server(session,
+                                                       **kwargs)
+
+    def _relay_queued_input(self):
+        """
+        Relay as much throttled input as the throttle allows. If any
+        input remains, this re-schedules itself for when the next
+        session is allowed to send again.
+
+        """
+        self.input_task = None
+        throttle = self.throttle
+        delay = None
+        for sessid, queue in self.input_queues.items():
+            session = self.get(sessid)
+            if not session:
+                del self.input_queues[sessid]
+                continue
+            # these commands were already counted as overflows when queued
+            while queue and throttle.consume(session, count=False):
+                self._relay_input(session, queue.popleft())
+            if queue:
+                wait = throttle.wait_time(session)
+                delay = wait if delay is None else min(delay, wait)
+            else:
+                del self.input_queues[sessid]
+        if delay is not None:
+            self.input_task = reactor.callLater(max(delay, 0.01), self._relay_queued_input)
 
     def data_out(self, session, **kwargs):
         """
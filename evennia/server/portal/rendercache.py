@@ -0,0 +1,128 @@
+"""
+Portal render cache
+
+When the Server broadcasts a message (like a channel message or a
+`msg_contents` to a crowded room), every receiving Portal session
+converts the same text to its own wire-format - ANSI for telnet/ssh,
+html for the webclients. This conversion is comparatively expensive
+and is identical for all sessions sharing the same render flags.
+
+This module offers a bounded LRU cache for such renderings. It is
+keyed on the render function, the text and the render flags
+(xterm256, mxp, nomarkup, screenreader etc), so a message going to
+hundreds of webclients will only be converted to html once.
+
+The size of the cache is set by `settings.PORTAL_RENDER_CACHE_SIZE`.
+Setting this to 0 turns off caching completely.
+
+"""
+import re
+from collections import OrderedDict
+from django.conf import settings
+from evennia.utils.ansi import parse_ansi
+
+_CACHE_SIZE = settings.PORTAL_RENDER_CACHE_SIZE
+_RE_SCREENREADER_REGEX = re.compile(r"%s" % settings.SCREENREADER_REGEX_STRIP, re.DOTALL + re.MULTILINE)
+# don't cache texts bigger than this; they are unlikely to be repeated
+_MAX_TEXT_LENGTH = 32768
+
+
+class RenderCache(object):
+    """
+    A size-limited Least-Recently-Used cache of rendered texts. It
+    keeps track of its own hit rate.
+
+    """
+    def __init__(self, maxsize=_CACHE_SIZE):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize (int, optional): Max number of renderings to store.
+                If <= 0, no caching will be done.
+
+        """
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, renderer, text, *flags):
+        """
+        Render a text, using a cached result if one is available.
+
+        Args:
+            renderer (callable): The render function. This will be
+                called as `renderer(text, *flags)` and must always return
+                the same result for the same input.
+            text (str): The text to render.
+            *flags (any): Hashable render flags, such as xterm256, mxp
+                and nomarkup. These are passed on to `renderer`.
+
+        Returns:
+            rendered (str): The rendered text.
+
+        """
+        if self.maxsize <= 0 or len(text) > _MAX_TEXT_LENGTH:
+            return renderer(text, *flags)
+        cache = self.cache
+        key = (renderer, text, flags)
+        try:
+            rendered = cache.pop(key)
+            self.hits += 1
+        except KeyError:
+            rendered = renderer(text, *flags)
+            self.misses += 1
+            if len(cache) >= self.maxsize:
+                # evict the least recently used rendering
+                cache.popitem(last=False)
+        # (re-)insert as the most recently used
+        cache[key] = rendered
+        return rendered
+
+    def stats(self):
+        """
+        Get statistics on cache usage.
+
+        Returns:
+            stats (dict): Contains `size`, `maxsize`, `hits`, `misses`
+                and `hitrate` (the fraction of renders served from the
+                cache, between 0 and 1).
+
+        """
+        total = self.hits + self.misses
+        return {"size": len(self.cache),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitrate": float(self.hits) / total if total else 0.0}
+
+    def clear(self):
+        """
+        Empty the cache and reset its statistics.
+
+        """
+        self.cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# the singleton used by all portal protocols
+RENDER_CACHE = RenderCache()
+
+
+def render_screenreader(text):
+    """
+    Clean up text for use with screen readers. This is shared by all
+    protocols supporting the SCREENREADER option.
+
+    Args:
+        text (str): Text to clean.
+
+    Returns:
+        text (str): Text stripped of ANSI markup and of decorations
+            matching `settings.SCREENREADER_REGEX_STRIP`.
+
+    """
+    text = parse_ansi(text, strip_ansi=True, xterm256=False, mxp=False)
+    return _RE_SCREENREADER_REGEX.sub("", text)
@@ -36,14 +36,34 @@ from twisted.python import components
 from django.conf import settings
 
 from evennia.server import session
+from evennia.server.portal.rendercache import RENDER_CACHE, render_screenreader
 from evennia.players.models import PlayerDB
 from evennia.utils import ansi
 from evennia.utils.utils import to_str
 
 _RE_N = re.compile(r"\{n$")
-_RE_SCREENREADER_REGEX = re.compile(r"%s" % settings.SCREENREADER_REGEX_STRIP, re.DOTALL + re.MULTILINE)
 _GAME_DIR = settings.GAME_DIR
 
+
+def _render_line(text, nomarkup, xterm256):
+    """
+    Convert text to its ssh form. This is cached by the Portal
+    render cache.
+
+    Args:
+        text (str): Text to convert.
+        nomarkup (bool): Strip all ANSI markup.
+        xterm256 (bool): Use xterm256 colors.
+
+    Returns:
+        text (str): The converted text.
+
+    """
+    # we need to make sure to kill the color at the end in order
+    # to match the webclient output.
+    return ansi.parse_ansi(_RE_N.sub("", text) + "{n", strip_ansi=nomarkup, xterm256=xterm256, mxp=False)
+
+
 CTRL_C = '\x03'
 CTRL_D = '\x04'
 CTRL_BACKSLASH = '\x1c'
@@ -265,18 +285,14 @@ class SshProtocol(Manhole, session.Session):
 
         if screenreader:
             # screenreader mode cleans up output
-            text = ansi.parse_ansi(text, strip_ansi=True, xterm256=False, mxp=False)
-            text = _RE_SCREENREADER_REGEX.sub("", text)
+            text = RENDER_CACHE.render(render_screenreader, text)
 
         if raw:
             # no processing
             self.sendLine(text)
             return
         else:
-            # we need to make sure to kill the color at the end in order
-            # to match the webclient output.
-            linetosend = ansi.parse_ansi(_RE_N.sub("", text) + "{n", strip_ansi=nomarkup, xterm256=xterm256, mxp=False)
-            self.sendLine(linetosend)
+            self.sendLine(RENDER_CACHE.render(_render_line, text, nomarkup, xterm256))
 
     def send_prompt(self, *args, **kwargs):
         self.send_text(*args, **kwargs)
@@ -8,20 +8,57 @@ sessions etc.
 """
 
 import re
-from twisted.internet.task import LoopingCall
 from twisted.conch.telnet import Telnet, StatefulTelnetProtocol, IAC, NOP, LINEMODE, GA, WILL, WONT, ECHO, NULL
 from django.conf import settings
 from evennia.server.session import Session
 from evennia.server.portal import ttype, mssp, telnet_oob, naws
 from evennia.server.portal.mccp import Mccp, mccp_compress, MCCP
 from evennia.server.portal.mxp import Mxp, mxp_parse
+from evennia.server.portal.rendercache import RENDER_CACHE, render_screenreader
+from evennia.server.portal.timerwheel import TIMER_WHEEL
 from evennia.utils import ansi, logger
 from evennia.utils.utils import to_str
 
 _RE_N = re.compile(r"\{n$")
 _RE_LEND = re.compile(r"\n$|\r$|\r\n$|\r\x00$|", re.MULTILINE)
-_RE_SCREENREADER_REGEX = re.compile(r"%s" % settings.SCREENREADER_REGEX_STRIP, re.DOTALL + re.MULTILINE)
 _IDLE_COMMAND = settings.IDLE_COMMAND + "\n"
+_NOP_KEEPALIVE_INTERVAL = 30
+
+
+def _render_line(text, nomarkup, xterm256, mxp):
+    """
+    Convert text to its telnet form. This is cached by the Portal
+    render cache so it must only depend on its arguments.
+
+    Args:
+        text (str): Text to convert.
+        nomarkup (bool): Strip all ANSI markup.
+        xterm256 (bool): Use xterm256 colors.
+        mxp (bool): Convert MXP links.
+
+    Returns:
+        text (str): The converted text.
+
+    """
+    # we need to make sure to kill the color at the end in order
+    # to match the webclient output.
+    text = ansi.parse_ansi(_RE_N.sub("", text) + "{n", strip_ansi=nomarkup, xterm256=xterm256, mxp=mxp)
+    if mxp:
+        text = mxp_parse(text)
+    return text
+
+
+def _render_prompt(text, nomarkup, xterm256, mxp):
+    """
+    Convert text to a telnet prompt. See `_render_line` for the
+    arguments.
+
+    """
+    prompt = ansi.parse_ansi(_RE_N.sub("", text) + "{n", strip_ansi=nomarkup, xterm256=xterm256)
+    if mxp:
+        prompt = mxp_parse(prompt)
+    return prompt
+
 
 class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
     """
@@ -82,6 +119,7 @@ class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
         "Send NOP keepalive unless flag is set"
         if self.protocol_flags.get("NOPKEEPALIVE"):
             self._write(IAC + NOP)
+        TIMER_WHEEL.schedule(self.nop_keep_alive, _NOP_KEEPALIVE_INTERVAL, self._send_nop_keepalive)
 
     def toggle_nop_keepalive(self):
         """
@@ -90,11 +128,12 @@ class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
         protocol_flag NOPKEEPALIVE (settable e.g. by the default
         `@option` command).
         """
-        if self.nop_keep_alive and self.nop_keep_alive.running:
-            self.nop_keep_alive.stop()
+        if self.nop_keep_alive and self.nop_keep_alive in TIMER_WHEEL:
+            TIMER_WHEEL.cancel(self.nop_keep_alive)
         else:
-            self.nop_keep_alive = LoopingCall(self._send_nop_keepalive)
-            self.nop_keep_alive.start(30, now=False)
+            # the key of our timer in the Portal's shared timer wheel
+            self.nop_keep_alive = ("nop_keepalive", self)
+            TIMER_WHEEL.schedule(self.nop_keep_alive, _NOP_KEEPALIVE_INTERVAL, self._send_nop_keepalive)
 
     def handshake_done(self, force=False):
         """
@@ -168,6 +207,8 @@ class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
             reason (str): Motivation for losing connection.
 
         """
+        if self.nop_keep_alive:
+            TIMER_WHEEL.cancel(self.nop_keep_alive)
         self.sessionhandler.disconnect(self)
         self.transport.loseConnection()
 
@@ -340,16 +381,14 @@ class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
 
         if screenreader:
             # screenreader mode cleans up output
-            text = ansi.parse_ansi(text, strip_ansi=True, xterm256=False, mxp=False)
-            text = _RE_SCREENREADER_REGEX.sub("", text)
+            text = RENDER_CACHE.render(render_screenreader, text)
 
         if options.get("send_prompt"):
             # send a prompt instead.
+            prompt = text
             if not raw:
                 # processing
-                prompt = ansi.parse_ansi(_RE_N.sub("", text) + "{n", strip_ansi=nomarkup, xterm256=xterm256)
-                if mxp:
-                    prompt = mxp_parse(prompt)
+                prompt = RENDER_CACHE.render(_render_prompt, text, nomarkup, xterm256, mxp)
             prompt = prompt.replace(IAC, IAC + IAC).replace('\n', '\r\n')
             prompt += IAC + GA
             self.transport.write(mccp_compress(self, prompt))
@@ -372,12 +411,7 @@ class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
                 self.sendLine(text)
                 return
             else:
-                # we need to make sure to kill the color at the end in order
-                # to match the webclient output.
-                linetosend = ansi.parse_ansi(_RE_N.sub("", text) + "{n", strip_ansi=nomarkup, xterm256=xterm256, mxp=mxp)
-                if mxp:
-                    linetosend = mxp_parse(linetosend)
-                self.sendLine(linetosend)
+                self.sendLine(RENDER_CACHE.render(_render_line, text, nomarkup, xterm256, mxp))
 
     def send_prompt(self, *args, **kwargs):
         """
@@ -0,0 +1,272 @@
+"""
+Input throttling
+
+This implements the anti-flooding measures of the Portal. Incoming
+commands are metered by token buckets - one per Session, one per client
+IP address and one shared by everyone. A bucket holds a maximum
+number of tokens (the burst size) and is refilled at a steady rate.
+Each command consumes one token from each of the buckets concerned and
+is only let through if all of them have a token to spare.
+
+This means that a single client flooding the game will only throttle
+itself (and possibly others connecting from the same IP) while other
+players stay responsive. The global bucket is a last line of defense
+against many clients flooding at the same time.
+
+The limits are set with `settings.COMMAND_THROTTLE_SESSION`,
+`settings.COMMAND_THROTTLE_IP` and `settings.MAX_COMMAND_RATE`.
+
+"""
+from time import time
+from django.conf import settings
+
+_SESSION_RATE, _SESSION_BURST = settings.COMMAND_THROTTLE_SESSION
+_IP_RATE, _IP_BURST = settings.COMMAND_THROTTLE_IP
+_GLOBAL_RATE = float(settings.MAX_COMMAND_RATE)
+_GLOBAL_BURST = _GLOBAL_RATE * 2
+
+
+class TokenBucket(object):
+    """
+    A token bucket, refilling at a fixed rate up to a max size.
+
+    """
+    __slots__ = ("rate", "burst", "tokens", "last")
+
+    def __init__(self, rate, burst, now=None):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate (float): Tokens added per second. If <= 0, the bucket
+                is never depleted.
+            burst (float): The max number of tokens in the bucket.
+            now (float, optional): The current time. If not given,
+                the system time is used.
+
+        """
+        self.rate = float(rate)
+        self.burst = float(max(burst, 1))
+        self.tokens = self.burst
+        self.last = time() if now is None else now
+
+    def _refill(self, now):
+        """
+        Top up the bucket based on the time since last refill.
+
+        Args:
+            now (float): The current time.
+
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def peek(self, now):
+        """
+        Check if the bucket has a token to spare, without consuming it.
+
+        Args:
+            now (float): The current time.
+
+        Returns:
+            available (bool): If there is a token available.
+
+        """
+        if self.rate <= 0:
+            return True
+        self._refill(now)
+        return self.tokens >= 1.0
+
+    def consume(self, now):
+        """
+        Remove one token from the bucket, if possible.
+
+        Args:
+            now (float): The current time.
+
+        Returns:
+            consumed (bool): If a token could be consumed.
+
+        """
+        if self.rate <= 0:
+            return True
+        self._refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def wait_time(self, now):
+        """
+        Get the time until a token becomes available.
+
+        Args:
+            now (float): The current time.
+
+        Returns:
+            delay (float): Seconds until a token can be consumed.
+
+        """
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        return max(0.0, (1.0 - self.tokens) / self.rate)
+
+
+class CommandThrottle(object):
+    """
+    Meters incoming commands against per-session, per-IP and global
+    token buckets. Overflow events are counted in `self.stats`.
+
+    """
+    def __init__(self, session_limits=(_SESSION_RATE, _SESSION_BURST),
+                 ip_limits=(_IP_RATE, _IP_BURST),
+                 global_limits=(_GLOBAL_RATE, _GLOBAL_BURST)):
+        """
+        Initialize the throttle.
+
+        Args:
+            session_limits (tuple): `(rate, burst)` for each Session.
+            ip_limits (tuple): `(rate, burst)` for each client address.
+            global_limits (tuple): `(rate, burst)` shared by all.
+
+        Notes:
+            Setting a rate <= 0 turns off that part of the throttle.
+
+        """
+        self.session_limits = session_limits
+        self.ip_limits = ip_limits
+        self.global_bucket = TokenBucket(*global_limits)
+        self.session_buckets = {}
+        self.ip_buckets = {}
+        # how many sessions share each ip bucket
+        self.ip_counts = {}
+        self.stats = {"session_overflow": 0,
+                      "ip_overflow": 0,
+                      "global_overflow": 0,
+                      "queued": 0,
+                      "dropped": 0}
+
+    @property
+    def enabled(self):
+        """
+        If any part of the throttle is active.
+
+        """
+        return (self.session_limits[0] > 0 or self.ip_limits[0] > 0 or
+                self.global_bucket.rate > 0)
+
+    def _get_buckets(self, session, now):
+        """
+        Get (and create, if needed) the buckets of a session.
+
+        Args:
+            session (Session): The session to check.
+            now (float): The current time.
+
+        Returns:
+            buckets (tuple): The `(session_bucket, ip_bucket, address)`.
+
+        """
+        sessid = session.sessid
+        try:
+            return self.session_buckets[sessid]
+        except KeyError:
+            address = session.address
+            ip_bucket = self.ip_buckets.get(address)
+            if not ip_bucket:
+                ip_bucket = self.ip_buckets[address] = TokenBucket(*self.ip_limits, now=now)
+                self.ip_counts[address] = 0
+            self.ip_counts[address] += 1
+            buckets = (TokenBucket(*self.session_limits, now=now), ip_bucket, address)
+            self.session_buckets[sessid] = buckets
+            return buckets
+
+    def consume(self, session, now=None, count=True):
+        """
+        Check if a session may send a command. If so, the command is
+        counted against all its buckets.
+
+        Args:
+            session (Session): The session sending the command.
+            now (float, optional): The current time. If not given, the
+                system time is used.
+            count (bool, optional): Add a refused command to the
+                overflow stats. Unset this when retrying a command that
+                was already counted.
+
+        Returns:
+            allowed (bool): If the command may be passed on.
+
+        """
+        now = time() if now is None else now
+        session_bucket, ip_bucket, _ = self._get_buckets(session, now)
+        # we must only consume if all buckets have room
+        if not session_bucket.peek(now):
+            overflow = "session_overflow"
+        elif not ip_bucket.peek(now):
+            overflow = "ip_overflow"
+        elif not self.global_bucket.consume(now):
+            overflow = "global_overflow"
+        else:
+            session_bucket.consume(now)
+            ip_bucket.consume(now)
+            return True
+        if count:
+            self.stats[overflow] += 1
+        return False
+
+    def count_overflow(self, session, now=None):
+        """
+        Count a command that must wait behind earlier throttled
+        commands of its session, without checking it against the
+        buckets.
+
+        Args:
+            session (Session): The session sending the command.
+            now (float, optional): The current time.
+
+        """
+        now = time() if now is None else now
+        session_bucket, ip_bucket, _ = self._get_buckets(session, now)
+        if session_bucket.peek(now) and not ip_bucket.peek(now):
+            self.stats["ip_overflow"] += 1
+        elif (session_bucket.peek(now) and ip_bucket.peek(now) and
+                not self.global_bucket.peek(now)):
+            self.stats["global_overflow"] += 1
+        else:
+            # the session bucket is full, or only the session's queue is
+            self.stats["session_overflow"] += 1
+
+    def wait_time(self, session, now=None):
+        """
+        Get the time until a session may send its next command.
+
+        Args:
+            session (Session): The session to check.
+            now (float, optional): The current time.
+
+        Returns:
+            delay (float): The time to wait, in seconds.
+
+        """
+        now = time() if now is None else now
+        session_bucket, ip_bucket, _ = self._get_buckets(session, now)
+        return max(session_bucket.wait_time(now), ip_bucket.wait_time(now),
+                   self.global_bucket.wait_time(now))
+
+    def forget(self, session):
+        """
+        Clean up the buckets of a session, for example on disconnect.
+
+        Args:
+            session (Session): The session to remove.
+
+        """
+        buckets = self.session_buckets.pop(session.sessid, None)
+        if buckets:
+            address = buckets[2]
+            self.ip_counts[address] -= 1
+            if self.ip_counts[address] <= 0:
+                del self.ip_counts[address]
+                del self.ip_buckets[address]
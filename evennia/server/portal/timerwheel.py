@@ -0,0 +1,210 @@
+"""
+Timer wheel
+
+The Portal needs to keep a lot of long-running, frequently reset
+timers - one or more per connection for keepalives and idle timeouts.
+Giving each its own reactor timer (or scanning all sessions at regular
+intervals) scales badly with thousands of connections.
+
+The `TimerWheel` instead sorts all timers into buckets based on their
+deadline. Buckets are arranged in a hierarchy of "wheels" with
+increasingly coarse resolution; timers far in the future sit in the
+coarse wheels and are moved ("cascaded") into finer wheels as their
+deadline draws near. A single reactor timer drives the whole thing
+and each tick only needs to look at the timers that actually expire.
+Adding, resetting and cancelling a timer is O(1).
+
+Timers are identified by a unique, hashable key. Scheduling a timer
+with an existing key replaces the old one.
+
+```python
+from evennia.server.portal.timerwheel import TIMER_WHEEL
+
+TIMER_WHEEL.schedule(("keepalive", session.sessid), 30, callback, session)
+TIMER_WHEEL.cancel(("keepalive", session.sessid))
+```
+
+"""
+from time import time
+from twisted.internet.task import LoopingCall
+from evennia.utils.logger import log_trace
+
+# seconds per tick
+_RESOLUTION = 1.0
+# slots per wheel (must be a power of two) and number of wheels. This
+# allows timers up to 64**3 ticks (about 3 days) ahead; longer timers
+# are kept in the outermost wheel until they come in range.
+_SLOT_BITS = 6
+_NUM_SLOTS = 1 << _SLOT_BITS
+_SLOT_MASK = _NUM_SLOTS - 1
+_NUM_WHEELS = 3
+
+
+class TimerWheel(object):
+    """
+    A hierarchical timer wheel, driven by a single LoopingCall.
+
+    """
+    def __init__(self, resolution=_RESOLUTION, clock=time):
+        """
+        Initialize the wheel.
+
+        Args:
+            resolution (float, optional): The time between ticks, in
+                seconds. Timers fire at most this much too late.
+            clock (callable, optional): Function returning the current
+                time. Mainly useful for testing.
+
+        """
+        self.resolution = resolution
+        self.clock = clock
+        self.start_time = clock()
+        # the last tick processed
+        self.current = 0
+        self.wheels = [[set() for _ in range(_NUM_SLOTS)] for _ in range(_NUM_WHEELS)]
+        # key: (deadline_tick, slot, callback, args)
+        self.timers = {}
+        self.task = None
+
+    def __len__(self):
+        return len(self.timers)
+
+    def __contains__(self, key):
+        return key in self.timers
+
+    def _get_slot(self, deadline):
+        """
+        Find the slot to place a timer in.
+
+        Args:
+            deadline (int): The tick the timer should fire on. This must be
+                after the current tick.
+
+        Returns:
+            slot (set): The bucket for the timer.
+
+        """
+        current = self.current
+        for level in range(_NUM_WHEELS):
+            shift = _SLOT_BITS * (level + 1)
+            if deadline >> shift == current >> shift or level == _NUM_WHEELS - 1:
+                return self.wheels[level][(deadline >> (_SLOT_BITS * level)) & _SLOT_MASK]
+
+    def schedule(self, key, delay, callback, *args):
+        """
+        Add a timer, replacing any timer with the same key.
+
+        Args:
+            key (hashable): Unique identifier for the timer.
+            delay (float): Seconds until the timer fires.
+            callback (callable): Called as `callback(*args)` when the
+                timer fires.
+            *args (any): Arguments to the callback.
+
+        """
+        self.cancel(key)
+        # the time since start may have moved past self.current if the
+        # reactor is lagging; count from the actual time
+        now_tick = max(self.current, int((self.clock() - self.start_time) / self.resolution))
+        if not self.timers:
+            # the wheel is empty, so we can skip ahead to the present
+            self.current = now_tick
+        deadline = max(self.current + 1, now_tick + int(round(delay / self.resolution)))
+        slot = self._get_slot(deadline)
+        slot.add(key)
+        self.timers[key] = (deadline, slot, callback, args)
+        if not self.task:
+            self.task = LoopingCall(self._tick)
+            self.task.start(self.resolution, now=False)
+
+    def cancel(self, key):
+        """
+        Remove a timer, if it exists.
+
+        Args:
+            key (hashable): The timer identifier.
+
+        """
+        timer = self.timers.pop(key, None)
+        if timer:
+            timer[1].discard(key)
+
+    def time_until(self, key):
+        """
+        Get the time until a timer fires.
+
+        Args:
+            key (hashable): The timer identifier.
+
+        Returns:
+            remaining (float or None): Seconds until the timer fires,
+                or None if there is no such timer.
+
+        """
+        timer = self.timers.get(key)
+        if timer:
+            return max(0.0, timer[0] * self.resolution - (self.clock() - self.start_time))
+        return None
+
+    def _cascade(self, level):
+        """
+        Move the timers of the current slot of a wheel into finer wheels.
+
+        Args:
+            level (int): The wheel to cascade from.
+
+        """
+        index = (self.current >> (_SLOT_BITS * level)) & _SLOT_MASK
+        keys = self.wheels[level][index]
+        self.wheels[level][index] = set()
+        timers = self.timers
+        for key in keys:
+            deadline, _, callback, args = timers[key]
+            slot = self._get_slot(deadline)
+            slot.add(key)
+            timers[key] = (deadline, slot, callback, args)
+
+    def _advance(self):
+        """
+        Move to the next tick and fire all timers due.
+
+        """
+        self.current += 1
+        current = self.current
+        for level in range(_NUM_WHEELS - 1, 0, -1):
+            if not current & ((1 << (_SLOT_BITS * level)) - 1):
+                # we entered a new span of this wheel
+                self._cascade(level)
+        index = current & _SLOT_MASK
+        expired = self.wheels[0][index]
+        self.wheels[0][index] = set()
+        timers = self.timers
+        for key in list(expired):
+            timer = timers.get(key)
+            if not timer or timer[1] is not expired:
+                # cancelled or re-scheduled by an earlier callback
+                continue
+            del timers[key]
+            _, _, callback, args = timer
+            try:
+                callback(*args)
+            except Exception:
+                log_trace()
+
+    def _tick(self):
+        """
+        Called by the LoopingCall. Catches up with the clock, so no
+        timers are lost if the reactor lags.
+
+        """
+        target = int((self.clock() - self.start_time) / self.resolution)
+        while self.current < target:
+            self._advance()
+        if not self.timers and self.task:
+            # nothing left to do; the task is restarted by schedule()
+            self.task.stop()
+            self.task = None
+
+
+# the singleton used by the Portal
+TIMER_WHEEL = TimerWheel()
@@ -14,16 +14,14 @@ The most common inputfunc is "text", which takes just the text input
 from the command line and interprets it as an Evennia Command: `["text", ["look"], {}]`
 
 """
-import re
 import json
 from twisted.internet.protocol import Protocol
 from django.conf import settings
 from evennia.server.session import Session
 from evennia.utils.utils import to_str, mod_import
-from evennia.utils.ansi import parse_ansi
 from evennia.utils.text2html import parse_html
+from evennia.server.portal.rendercache import RENDER_CACHE, render_screenreader
 
-_RE_SCREENREADER_REGEX = re.compile(r"%s" % settings.SCREENREADER_REGEX_STRIP, re.DOTALL + re.MULTILINE)
 _CLIENT_SESSIONS = mod_import(settings.SESSION_ENGINE).SessionStore
 
 
@@ -188,13 +186,12 @@ class WebSocketClient(Protocol, Session):
 
         if screenreader:
             # screenreader mode cleans up output
-            text = parse_ansi(text, strip_ansi=True, xterm256=False, mxp=False)
-            text = _RE_SCREENREADER_REGEX.sub("", text)
+            text = RENDER_CACHE.render(render_screenreader, text)
         cmd = "prompt" if prompt else "text"
         if raw:
             args[0] = text
         else:
-            args[0] = parse_html(text, strip_ansi=nomarkup)
+            args[0] = RENDER_CACHE.render(parse_html, text, nomarkup)
 
         # send to client on required form [cmdname, args, kwargs]
         self.sendLine(json.dumps([cmd, args, kwargs]))
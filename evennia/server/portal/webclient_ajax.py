@@ -17,23 +17,25 @@ http://localhost:8000/webclient.)
                  to sessions connected over the webclient.
 """
 import json
-import re
 
-from time import time
+from collections import deque
 from twisted.web import server, resource
-from twisted.internet.task import LoopingCall
+from twisted.internet import reactor
 from django.utils.functional import Promise
 from django.utils.encoding import force_unicode
 from django.conf import settings
-from evennia.utils.ansi import parse_ansi
 from evennia.utils import utils
 from evennia.utils.text2html import parse_html
+from evennia.server.portal.rendercache import RENDER_CACHE, render_screenreader
+from evennia.server.portal.timerwheel import TIMER_WHEEL
 from evennia.server import session
 
 _CLIENT_SESSIONS = utils.mod_import(settings.SESSION_ENGINE).SessionStore
-_RE_SCREENREADER_REGEX = re.compile(r"%s" % settings.SCREENREADER_REGEX_STRIP, re.DOTALL + re.MULTILINE)
 _SERVERNAME = settings.SERVERNAME
-_KEEPALIVE = 30 # how often to check keepalive
+_KEEPALIVE = 30 # how long to wait for a client before sending a keepalive
+_BATCH_SIZE = settings.WEBCLIENT_AJAX_BATCH_SIZE
+_HOLD_TIME = settings.WEBCLIENT_AJAX_HOLD_TIME
+_BUFFER_SIZE = settings.WEBCLIENT_AJAX_BUFFER_SIZE
 
 # defining a simple json encoder for returning
 # django data to the client. Might need to
@@ -58,7 +60,9 @@ def jsonify(obj):
 
 class WebClient(resource.Resource):
     """
-    An ajax/comet long-polling transport
+    An ajax/comet long-polling transport. Each poll returns all
+    data buffered for the client (up to a max size) as a JSON list of
+    `[cmdname, [args], {kwargs}]` entries.
 
     """
     isLeaf = True
@@ -67,9 +71,7 @@ class WebClient(resource.Resource):
     def __init__(self):
         self.requests = {}
         self.databuffer = {}
-
-        self.last_alive = {}
-        self.keep_alive = None
+        self.flush_tasks = {}
 
     def _responseFailed(self, failure, csessid, request):
         "callback if a request is lost/timed out"
@@ -78,54 +80,96 @@ class WebClient(resource.Resource):
         except KeyError:
             pass
 
-    def _keepalive(self):
+    def _keepalive(self, csessid, remove):
         """
-        Callback for checking the connection is still alive.
+        Called by the timer wheel when we have not heard from a client
+        for a while.
+
+        Args:
+            csessid (int): Session id.
+            remove (bool): If we already sent a keepalive that went
+                unanswered. If so, the client is disconnected.
+
         """
-        now = time()
-        to_remove = []
-        keep_alives = ((csessid, remove) for csessid, (t, remove)
-                        in self.last_alive.iteritems() if now - t > _KEEPALIVE)
-        for csessid, remove in keep_alives:
-            if remove:
-                # keepalive timeout. Line is dead.
-                to_remove.append(csessid)
-            else:
-                # normal timeout - send keepalive
-                self.last_alive[csessid] = (now, True)
-                self.lineSend(csessid, ["ajax_keepalive", [], {}])
-        # remove timed-out sessions
-        for csessid in to_remove:
-            sessions = self.sessionhandler.sessions_from_csessid(csessid)
-            for sess in sessions:
+        if remove:
+            # keepalive timeout. Line is dead.
+            for sess in self.sessionhandler.sessions_from_csessid(csessid):
                 sess.disconnect()
-            self.last_alive.pop(csessid, None)
-            if not self.last_alive:
-                # no more ajax clients. Stop the keepalive
-                self.keep_alive.stop()
-                self.keep_alive = None
+        else:
+            # normal timeout - send keepalive
+            TIMER_WHEEL.schedule(("ajax_keepalive", csessid), _KEEPALIVE,
+                                 self._keepalive, csessid, True)
+            self.lineSend(csessid, ["ajax_keepalive", [], {}])
 
-    def lineSend(self, csessid, data):
+    def _alive(self, csessid):
         """
-        This adds the data to the buffer and/or sends it to the client
-        as soon as possible.
+        Mark the client as alive, resetting its keepalive timer.
 
         Args:
             csessid (int): Session id.
-            data (list): A send structure [cmdname, [args], {kwargs}].
 
         """
-        request = self.requests.get(csessid)
+        TIMER_WHEEL.schedule(("ajax_keepalive", csessid), _KEEPALIVE,
+                             self._keepalive, csessid, False)
+
+    def _get_batch(self, csessid):
+        """
+        Pop buffered data for a client, up to the max batch size.
+
+        Args:
+            csessid (int): Session id.
+
+        Returns:
+            batch (str): A JSON list of send structures. This is
+                always at least one entry if any data is buffered.
+
+        """
+        dataentries = self.databuffer.get(csessid)
+        batch = []
+        nbytes = 0
+        while dataentries:
+            nbytes += len(dataentries[0])
+            if batch and nbytes > _BATCH_SIZE:
+                break
+            batch.append(dataentries.popleft())
+        return "[%s]" % ",".join(batch)
+
+    def _flush(self, csessid):
+        """
+        Send buffered data to the client's waiting request, if any.
+
+        Args:
+            csessid (int): Session id.
+
+        """
+        self.flush_tasks.pop(csessid, None)
+        request = self.requests.pop(csessid, None)
         if request:
-            # we have a request waiting. Return immediately.
-            request.write(jsonify(data))
+            request.write(self._get_batch(csessid))
             request.finish()
-            del self.requests[csessid]
-        else:
-            # no waiting request. Store data in buffer
-            dataentries = self.databuffer.get(csessid, [])
-            dataentries.append(jsonify(data))
-            self.databuffer[csessid] = dataentries
+
+    def lineSend(self, csessid, data):
+        """
+        This adds the data to the buffer and sends it to the client
+        as soon as possible. If the client is waiting, we hold off
+        sending for a short time so more data can be batched with it.
+
+        Args:
+            csessid (int): Session id.
+            data (list): A send structure [cmdname, [args], {kwargs}].
+
+        """
+        dataentries = self.databuffer.get(csessid)
+        if dataentries is None:
+            # when full, the oldest entries are dropped
+            dataentries = self.databuffer[csessid] = deque(maxlen=_BUFFER_SIZE)
+        dataentries.append(jsonify(data))
+        if csessid in self.requests and csessid not in self.flush_tasks:
+            # we have a request waiting
+            if _HOLD_TIME > 0:
+                self.flush_tasks[csessid] = reactor.callLater(_HOLD_TIME, self._flush, csessid)
+            else:
+                self._flush(csessid)
 
     def client_disconnect(self, csessid):
         """
@@ -135,11 +179,13 @@ class WebClient(resource.Resource):
             csessid (int): Session id.
 
         """
-        if csessid in self.requests:
-            self.requests[csessid].finish()
-            del self.requests[csessid]
-        if csessid in self.databuffer:
-            del self.databuffer[csessid]
+        TIMER_WHEEL.cancel(("ajax_keepalive", csessid))
+        flush_task = self.flush_tasks.get(csessid)
+        if flush_task:
+            flush_task.cancel()
+        # send any remaining data (like the disconnect message)
+        self._flush(csessid)
+        self.databuffer.pop(csessid, None)
 
     def mode_init(self, request):
         """
@@ -169,11 +215,7 @@ class WebClient(resource.Resource):
 
         sess.sessionhandler.connect(sess)
 
-        self.last_alive[csessid] = (time(), False)
-        if not self.keep_alive:
-            # the keepalive is not running; start it.
-            self.keep_alive = LoopingCall(self._keepalive)
-            self.keep_alive.start(_KEEPALIVE, now=False)
+        self._alive(csessid)
 
         return jsonify({'msg': host_string, 'csessid': csessid})
 
@@ -183,7 +225,7 @@ class WebClient(resource.Resource):
         client is replying to the keepalive.
         """
         csessid = request.args.get('csessid')[0]
-        self.last_alive[csessid] = (time(), False)
+        self._alive(csessid)
         return '""'
 
     def mode_input(self, request):
@@ -197,7 +239,7 @@ class WebClient(resource.Resource):
         """
         csessid = request.args.get('csessid')[0]
 
-        self.last_alive[csessid] = (time(), False)
+        self._alive(csessid)
         sess = self.sessionhandler.sessions_from_csessid(csessid)
         if sess:
             sess = sess[0]
@@ -217,11 +259,11 @@ class WebClient(resource.Resource):
 
         """
         csessid = request.args.get('csessid')[0]
-        self.last_alive[csessid] = (time(), False)
+        self._alive(csessid)
 
-        dataentries = self.databuffer.get(csessid, [])
-        if dataentries:
-            return dataentries.pop(0)
+        if self.databuffer.get(csessid):
+            # data is waiting; return it all at once
+            return self._get_batch(csessid)
         request.notifyFinish().addErrback(self._responseFailed, csessid, request)
         if csessid in self.requests:
             self.requests[csessid].finish()  # Clear any stale request.
@@ -349,13 +391,12 @@ class WebClientSession(session.Session):
 
         if screenreader:
             # screenreader mode cleans up output
-            text = parse_ansi(text, strip_ansi=True, xterm256=False, mxp=False)
-            text = _RE_SCREENREADER_REGEX.sub("", text)
+            text = RENDER_CACHE.render(render_screenreader, text)
         cmd = "prompt" if prompt else "text"
         if raw:
             args[0] = text
         else:
-            args[0] = parse_html(text, strip_ansi=nomarkup)
+            args[0] = RENDER_CACHE.render(parse_html, text, nomarkup)
 
         # send to client on required form [cmdname, args, kwargs]
         self.client.lineSend(self.csessid, [cmd, args, kwargs])
@@ -0,0 +1,86 @@
+"""
+Throughput benchmark for the websocket frame codec in `evennia.utils.txws`.
+
+This measures masking, parsing of masked client frames and building of
+complete server frames (header and payload) for payloads of 1 KB, 64 KB and 1 MB. It does not need a
+running server. Run it from the command line:
+
+```
+python -m evennia.server.profiling.websocket_benchmark
+```
+
+"""
+from __future__ import print_function
+from __future__ import division
+
+import os
+from struct import pack
+from timeit import default_timer
+
+# the codec needs no game settings, but importing evennia.utils does
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "evennia.settings_default")
+
+from evennia.utils.txws import mask, make_hybi07_frame, parse_hybi07_buffer
+
+SIZES = ((1024, "1 KB"), (64 * 1024, "64 KB"), (1024 * 1024, "1 MB"))
+# total amount of payload to process for each test
+TOTAL_BYTES = 32 * 1024 * 1024
+
+
+def _make_client_frame(payload, key):
+    """
+    Build a masked text frame, the way a browser sends it.
+
+    """
+    length = len(payload)
+    if length > 0xffff:
+        length = "\xff%s" % pack(">Q", length)
+    elif length > 0x7d:
+        length = "\xfe%s" % pack(">H", length)
+    else:
+        length = chr(0x80 | length)
+    return "\x81%s%s%s" % (length, key, mask(payload, key))
+
+
+def _timeit(func, repeats):
+    """
+    Time a number of calls to func.
+
+    """
+    start = default_timer()
+    for _ in range(repeats):
+        func()
+    return default_timer() - start
+
+
+def run_benchmark():
+    """
+    Run the benchmark and print the throughput for each frame size.
+
+    """
+    key = os.urandom(4)
+    print("%-8s %14s %14s %14s" % ("size", "mask MB/s", "parse MB/s", "build MB/s"))
+    for size, name in SIZES:
+        payload = os.urandom(size)
+        repeats = max(1, TOTAL_BYTES // size)
+        megabytes = repeats * size / (1024.0 * 1024.0)
+        frame = _make_client_frame(payload, key)
+
+        def _parse():
+            buf = bytearray(frame)
+            frames, consumed = parse_hybi07_buffer(buf)
+            del buf[:consumed]
+
+        t_mask = _timeit(lambda: mask(payload, key), repeats)
+        t_parse = _timeit(_parse, repeats)
+        t_build = _timeit(lambda: make_hybi07_frame(payload), repeats)
+        # sanity check
+        assert parse_hybi07_buffer(bytearray(frame))[0][0][1] == payload
+        assert make_hybi07_frame(payload)[-size:] == payload
+        print("%-8s %14.1f %14.1f %14.1f" % (name, megabytes / t_mask,
+                                             megabytes / t_parse,
+                                             megabytes / t_build))
+
+
+if __name__ == "__main__":
+    run_benchmark()
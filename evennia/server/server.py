@@ -118,7 +118,7 @@ def _server_maintenance():
         _FLUSH_CACHE(_IDMAPPER_CACHE_MAXSIZE)
     if _MAINTENANCE_COUNT % 3600 == 0:
         # validate scripts every hour
-        evennia.ScriptDB.objects.validate()
+        evennia.ScriptDB.objects.validate_cooperatively()
     if _MAINTENANCE_COUNT % 3700 == 0:
         # validate channels off-sync with scripts
         evennia.CHANNEL_HANDLER.update()
@@ -288,6 +288,9 @@ class Evennia(object):
         from evennia.scripts.tickerhandler import TICKER_HANDLER
         TICKER_HANDLER.restore(mode in ('True', 'reload'))
 
+        from evennia.scripts.taskhandler import TASK_HANDLER
+        TASK_HANDLER.restore()
+
         # call correct server hook based on start file value
         if mode in ('True', 'reload'):
             # True was the old reload flag, kept for compatibilty
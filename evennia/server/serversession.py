@@ -159,6 +159,8 @@ class ServerSession(Session):
     through their session.
 
     """
+    __slots__ = ("puppet", "player", "cmdset", "__dict__", "__weakref__")
+
     def __init__(self):
         "Initiate to avoid AttributeErrors down the line"
         self.puppet = None
@@ -198,7 +200,7 @@ class ServerSession(Session):
             # back from a server reload). This does all the steps
             # done in the default @ic command but without any
             # hooks, echoes or access checks.
-            obj = _ObjectDB.objects.get(id=self.puid)
+            obj = _ObjectDB.get_cached_instance(self.puid) or _ObjectDB.objects.get(id=self.puid)
             obj.sessions.add(self)
             obj.player = self.player
             self.puid = obj.id
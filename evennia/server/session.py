@@ -6,6 +6,143 @@ This module defines a generic session class. All connection instances
 from builtins import object
 
 import time
+from copy import deepcopy
+
+_MISSING = object()
+
+# protocol flags every session starts out with. These are shared by
+# all sessions; a session only stores the flags it changes.
+_DEFAULT_PROTOCOL_FLAGS = {"ENCODING": "utf-8",
+                           "SCREENREADER": False,
+                           "INPUTDEBUG": False,
+                           "RAW": False,
+                           "NOMARKUP": False}
+
+
+class ProtocolFlags(object):
+    """
+    The `protocol_flags` of a Session. This works like a dict, but
+    flags that were never changed are read from a default shared by
+    all sessions. Only changed flags are stored on the session, so
+    the thousands of sessions of a busy Portal don't each need a
+    copy of the defaults.
+
+    Default flags can be overridden but not removed; deleting such a
+    flag resets it to its default.
+
+    """
+    __slots__ = ("flags",)
+
+    def __init__(self, flags=None):
+        """
+        Initialize the flags.
+
+        Args:
+            flags (dict, optional): Flags to set on top of the defaults.
+
+        """
+        self.flags = None
+        if flags:
+            self.update(flags)
+
+    def __getitem__(self, key):
+        flags = self.flags
+        if flags and key in flags:
+            return flags[key]
+        return _DEFAULT_PROTOCOL_FLAGS[key]
+
+    def __setitem__(self, key, value):
+        default = _DEFAULT_PROTOCOL_FLAGS.get(key, _MISSING)
+        if type(default) is type(value) and default == value:
+            # same as the default; no need to store it
+            if self.flags:
+                self.flags.pop(key, None)
+            return
+        if self.flags is None:
+            self.flags = {}
+        self.flags[key] = value
+
+    def __delitem__(self, key):
+        if self.flags and key in self.flags:
+            del self.flags[key]
+        elif key not in _DEFAULT_PROTOCOL_FLAGS:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in _DEFAULT_PROTOCOL_FLAGS or bool(self.flags and key in self.flags)
+
+    def __iter__(self):
+        for key in _DEFAULT_PROTOCOL_FLAGS:
+            yield key
+        if self.flags:
+            for key in self.flags:
+                if key not in _DEFAULT_PROTOCOL_FLAGS:
+                    yield key
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __eq__(self, other):
+        try:
+            return dict(self) == dict(other)
+        except (TypeError, ValueError):
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(iter(self))
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def iteritems(self):
+        return ((key, self[key]) for key in self)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def copy(self):
+        return dict(self)
+
+    def get_changed(self):
+        """
+        Get the flags that differ from the defaults.
+
+        Returns:
+            changed (dict): The changed flags.
+
+        """
+        return dict(self.flags) if self.flags else {}
 
 
 #------------------------------------------------------------
@@ -33,7 +170,16 @@ class Session(object):
     which means much of the same information must be stored in both places
     e.g. the portal can re-sync with the server when the server reboots.
 
+    The fixed session properties are stored in slots rather than in
+    a per-instance `__dict__`, to keep the many session objects of a
+    busy game small. Subclasses without `__slots__` of their own can
+    still store any other properties as usual.
+
     """
+    __slots__ = ("protocol_key", "address", "suid", "sessid", "csessid", "uid",
+                 "uname", "logged_in", "puid", "conn_time", "cmd_last_visible",
+                 "cmd_last", "cmd_total", "_protocol_flags", "server_data",
+                 "cmdset_storage_string", "datamap", "sessionhandler", "_synced")
 
     # names of attributes that should be affected by syncing.
     _attrs_to_sync = ('protocol_key', 'address', 'suid', 'sessid', 'uid', 'csessid',
@@ -82,11 +228,7 @@ class Session(object):
         self.cmd_last = self.conn_time
         self.cmd_total = 0
 
-        self.protocol_flags = {"ENCODING": "utf-8",
-                               "SCREENREADER":False,
-                               "INPUTDEBUG": False,
-                               "RAW": False,
-                               "NOMARKUP": False}
+        self._protocol_flags = ProtocolFlags()
         self.server_data = {}
 
         # map of input data to session methods
@@ -96,29 +238,86 @@ class Session(object):
         # session is stored in.
         self.sessionhandler = sessionhandler
 
-    def get_sync_data(self):
+        # the sync values last exchanged with the other side
+        self._synced = {}
+
+    def __protocol_flags_get(self):
+        return self._protocol_flags
+
+    def __protocol_flags_set(self, value):
+        if not isinstance(value, ProtocolFlags):
+            value = ProtocolFlags(value)
+        self._protocol_flags = value
+    protocol_flags = property(__protocol_flags_get, __protocol_flags_set)
+
+    def _get_sync_value(self, key):
         """
-        Get all data relevant to sync the session.
+        Get the value of a sync attribute, the way it is sent.
 
         Args:
-            syncdata (dict): All syncdata values, based on
-                the keys given by self._attrs_to_sync.
+            key (str): The attribute name.
+
+        Returns:
+            value (any): The value, or `_MISSING` if it is not set.
+
+        """
+        value = getattr(self, key, _MISSING)
+        if isinstance(value, ProtocolFlags):
+            # the other side has the same defaults
+            value = value.get_changed()
+        return value
+
+    def get_sync_data(self, delta=False, attrs=None):
+        """
+        Get all data relevant to sync the session. The returned
+        values are remembered as being known to the other side.
+
+        Args:
+            delta (bool, optional): Only include the values that have
+                changed since they were last synced. The `sessid` is
+                always included.
+            attrs (iterable, optional): Only consider these attribute
+                names. Defaults to `self._attrs_to_sync`.
+
+        Returns:
+            syncdata (dict): The syncdata values, based on the keys
+                given by self._attrs_to_sync.
 
         """
-        return dict((key, value) for key, value in self.__dict__.items()
-                                                  if key in self._attrs_to_sync)
+        synced = getattr(self, "_synced", None)
+        if synced is None:
+            synced = self._synced = {}
+        syncdata = {}
+        for key in attrs or self._attrs_to_sync:
+            value = self._get_sync_value(key)
+            if value is _MISSING:
+                continue
+            if delta and key != "sessid" and key in synced and synced[key] == value:
+                continue
+            syncdata[key] = value
+            synced[key] = deepcopy(value) if isinstance(value, dict) else value
+        return syncdata
 
     def load_sync_data(self, sessdata):
         """
         Takes a session dictionary, as created by get_sync_data, and
-        loads it into the correct properties of the session.
+        loads it into the correct properties of the session. This may
+        hold only some of the properties, if it was created with
+        `delta=True`.
 
         Args:
             sessdata (dict): Session data dictionary.
 
         """
+        synced = getattr(self, "_synced", None)
+        if synced is None:
+            synced = self._synced = {}
         for propname, value in sessdata.items():
             setattr(self, propname, value)
+            if propname in self._attrs_to_sync:
+                # this is now known to both sides
+                value = self._get_sync_value(propname)
+                synced[propname] = deepcopy(value) if isinstance(value, dict) else value
 
     def at_sync(self):
         """
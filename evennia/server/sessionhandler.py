@@ -24,6 +24,7 @@ from evennia.utils.utils import (variable_from_module, is_iter,
                                  make_iter,
                                  callables_from_module)
 from evennia.utils.inlinefuncs import parse_inlinefunc
+from evennia.server.oobreports import OOB_REPORTER
 
 try:
     import cPickle as pickle
@@ -37,6 +38,7 @@ _PlayerDB = None
 _ServerSession = None
 _ServerConfig = None
 _ScriptDB = None
+_ObjectDB = None
 _OOB_HANDLER = None
 
 class DummySession(object):
@@ -77,7 +79,7 @@ def delayed_import():
     Helper method for delayed import of all needed entities.
 
     """
-    global _ServerSession, _PlayerDB, _ServerConfig, _ScriptDB
+    global _ServerSession, _PlayerDB, _ServerConfig, _ScriptDB, _ObjectDB
     if not _ServerSession:
         # we allow optional arbitrary serversession class for overloading
         modulename, classname = settings.SERVER_SESSION_CLASS.rsplit(".", 1)
@@ -88,8 +90,10 @@ def delayed_import():
         from evennia.server.models import ServerConfig as _ServerConfig
     if not _ScriptDB:
         from evennia.scripts.models import ScriptDB as _ScriptDB
+    if not _ObjectDB:
+        from evennia.objects.models import ObjectDB as _ObjectDB
     # including once to avoid warnings in Python syntax checkers
-    _ServerSession, _PlayerDB, _ServerConfig, _ScriptDB
+    _ServerSession, _PlayerDB, _ServerConfig, _ScriptDB, _ObjectDB
 
 
 #-----------------------------------------------------------
@@ -100,7 +104,87 @@ class SessionHandler(dict):
     """
     This handler holds a stack of sessions.
 
+    Besides the sessid, sessions are indexed by player uid and by
+    client session hash (csessid) for quick lookup. The indexes are
+    kept up to date when sessions are added or removed; whoever
+    changes the `uid`, `csessid` or `logged_in` of a session already
+    in the handler must call `update_index` afterwards. Lookups
+    always re-check the session properties, so an outdated index may
+    hold extra sessions but must never miss one.
+
     """
+    def __init__(self, *args, **kwargs):
+        """
+        Init the handler.
+
+        """
+        super(SessionHandler, self).__init__(*args, **kwargs)
+        # {uid: set(sessid, ...)} and {csessid: set(sessid, ...)}
+        self.uid_index = {}
+        self.csessid_index = {}
+        # {sessid: (uid, csessid)} as currently indexed
+        self._indexed = {}
+
+    def _unindex(self, sessid):
+        """
+        Remove a session from the secondary indexes.
+
+        Args:
+            sessid (int): The id of the session.
+
+        """
+        uid, csessid = self._indexed.pop(sessid, (None, None))
+        for index, key in ((self.uid_index, uid), (self.csessid_index, csessid)):
+            if key is not None:
+                sessids = index.get(key)
+                if sessids:
+                    sessids.discard(sessid)
+                    if not sessids:
+                        del index[key]
+
+    def update_index(self, session):
+        """
+        Re-index a session after its `uid`, `csessid` or `logged_in`
+        property changed.
+
+        Args:
+            session (Session): The session to index.
+
+        """
+        sessid = session.sessid
+        keys = (getattr(session, "uid", None), getattr(session, "csessid", None))
+        if self._indexed.get(sessid) == keys:
+            return
+        self._unindex(sessid)
+        uid, csessid = keys
+        if uid is not None:
+            self.uid_index.setdefault(uid, set()).add(sessid)
+        if csessid:
+            self.csessid_index.setdefault(csessid, set()).add(sessid)
+        self._indexed[sessid] = keys
+
+    def __setitem__(self, sessid, session):
+        super(SessionHandler, self).__setitem__(sessid, session)
+        self.update_index(session)
+
+    def __delitem__(self, sessid):
+        super(SessionHandler, self).__delitem__(sessid)
+        self._unindex(sessid)
+
+    def _sessions_from_index(self, index, key):
+        """
+        Get the sessions stored under a key of an index.
+
+        Args:
+            index (dict): One of the secondary indexes.
+            key (any): The key to look up.
+
+        Returns:
+            sessions (list): The sessions found.
+
+        """
+        return [self[sessid] for sessid in index.get(key, ()) if sessid in self]
+
     def get_sessions(self, include_unloggedin=False):
         """
         Returns the connected session objects.
@@ -118,16 +202,20 @@ class SessionHandler(dict):
         else:
             return [session for session in self.values() if session.logged_in]
 
-    def get_all_sync_data(self):
+    def get_all_sync_data(self, delta=False):
         """
         Create a dictionary of sessdata dicts representing all
         sessions in store.
 
+        Args:
+            delta (bool, optional): Only include the properties of
+                each session that changed since its last sync.
+
         Returns:
             syncdata (dict): A dict of sync data.
 
         """
-        return dict((sessid, sess.get_sync_data()) for sessid, sess in self.items())
+        return dict((sessid, sess.get_sync_data(delta=delta)) for sessid, sess in self.items())
 
     def clean_senddata(self, session, kwargs):
         """
@@ -274,6 +362,7 @@ class ServerSessionHandler(SessionHandler):
             else:
                 sess.logged_in = False
                 sess.uid = None
+                self.update_index(sess)
 
         # show the first login command
         self.data_in(sess, text=[[CMD_LOGINSTART],{}])
@@ -298,35 +387,56 @@ class ServerSessionHandler(SessionHandler):
             # ones which should only be changed from portal (like
             # protocol_flags etc)
             session.load_sync_data(portalsessiondata)
+            self.update_index(session)
 
-    def portal_sessions_sync(self, portalsessionsdata):
+    def portal_sessions_sync(self, portalsessionsdata, first=True, final=True):
         """
         Syncing all session ids of the portal with the ones of the
         server. This is instantiated by the portal when reconnecting.
+        The portal may send the sessions in several chunks; each
+        session can be used as soon as its chunk has been synced.
 
         Args:
             portalsessionsdata (dict): A dictionary
               `{sessid: {property:value},...}` defining each session and
               the properties in it which should be synced.
+            first (bool, optional): If this is the first chunk of the sync.
+            final (bool, optional): If this is the last chunk of the sync.
 
         """
         delayed_import()
-        global _ServerSession, _PlayerDB, _ServerConfig, _ScriptDB
-
-        for sess in self.values():
-            # we delete the old session to make sure to catch eventual
-            # lingering references.
-            del sess
+        global _ServerSession, _PlayerDB, _ServerConfig, _ScriptDB, _ObjectDB
+
+        if first:
+            for sess in self.values():
+                # we delete the old session to make sure to catch eventual
+                # lingering references.
+                del sess
+
+        # fetch all players and puppets of the chunk at once
+        uids = set(sessdict["uid"] for sessdict in portalsessionsdata.values()
+                   if sessdict.get("uid"))
+        puids = set(sessdict["puid"] for sessdict in portalsessionsdata.values()
+                    if sessdict.get("puid"))
+        players = dict((player.id, player)
+                       for player in _PlayerDB.objects.filter(id__in=uids)) if uids else {}
+        if puids:
+            # this loads the puppets into the idmapper cache, where
+            # at_sync will find them
+            list(_ObjectDB.objects.filter(id__in=puids))
 
         for sessid, sessdict in portalsessionsdata.items():
             sess = _ServerSession()
             sess.sessionhandler = self
             sess.load_sync_data(sessdict)
             if sess.uid:
-                sess.player = _PlayerDB.objects.get_player_from_uid(sess.uid)
+                sess.player = players.get(sess.uid)
             self[sessid] = sess
             sess.at_sync()
 
+        if not final:
+            return
+
         # after sync is complete we force-validate all scripts
         # (this also starts them)
         init_mode = _ServerConfig.objects.conf("server_restart_mode", default=None)
@@ -421,6 +531,7 @@ class ServerSessionHandler(SessionHandler):
 
         # sets up and assigns all properties on the session
         session.at_login(player)
+        self.update_index(session)
 
         # player init
         player.at_init()
@@ -474,6 +585,7 @@ class ServerSessionHandler(SessionHandler):
 
         session.at_disconnect()
         sessid = session.sessid
+        OOB_REPORTER.forget(sessid)
         if sessid in self and not hasattr(self, "_disconnect_all"):
             del self[sessid]
         if sync_portal:
@@ -485,10 +597,12 @@ class ServerSessionHandler(SessionHandler):
     def all_sessions_portal_sync(self):
         """
         This is called by the server when it reboots. It syncs all session data
-        to the portal. Returns a deferred!
+        to the portal. Only properties that changed since they were
+        last synced are sent, since the portal already has the rest.
+        Returns a deferred!
 
         """
-        sessdata = self.get_all_sync_data()
+        sessdata = self.get_all_sync_data(delta=True)
         return self.server.amp_protocol.send_AdminServer2Portal(DUMMYSESSION,
                                                          operation=SSYNC,
                                                          sessiondata=sessdata)
@@ -496,10 +610,11 @@ class ServerSessionHandler(SessionHandler):
     def session_portal_sync(self, session):
         """
         This is called by the server when it wants to sync a single session
-        with the Portal for whatever reason. Returns a deferred!
+        with the Portal for whatever reason. Only the properties that
+        changed since the last sync are sent. Returns a deferred!
 
         """
-        sessdata = {session.sessid: session.get_sync_data()}
+        sessdata = {session.sessid: session.get_sync_data(delta=True)}
         return self.server.amp_protocol.send_AdminServer2Portal(DUMMYSESSION,
                                                                 operation=SSYNC,
                                                                 sessiondata=sessdata,
@@ -532,7 +647,7 @@ class ServerSessionHandler(SessionHandler):
 
         """
         uid = curr_session.uid
-        doublet_sessions = [sess for sess in self.values()
+        doublet_sessions = [sess for sess in self._sessions_from_index(self.uid_index, uid)
                             if sess.logged_in
                             and sess.uid == uid
                             and sess != curr_session]
@@ -562,7 +677,9 @@ class ServerSessionHandler(SessionHandler):
             nplayer (int): Number of connected players
 
         """
-        return len(set(session.uid for session in self.values() if session.logged_in))
+        return len([uid for uid in self.uid_index
+                    if any(session.logged_in and session.uid == uid
+                           for session in self._sessions_from_index(self.uid_index, uid))])
 
     def all_connected_players(self):
         """
@@ -573,7 +690,13 @@ class ServerSessionHandler(SessionHandler):
                 amount of Sessions due to multi-playing).
 
         """
-        return list(set(session.player for session in self.values() if session.logged_in and session.player))
+        players = []
+        for uid in self.uid_index:
+            for session in self._sessions_from_index(self.uid_index, uid):
+                if session.logged_in and session.uid == uid and session.player:
+                    players.append(session.player)
+                    break
+        return players
 
     def session_from_sessid(self, sessid):
         """
@@ -620,7 +743,8 @@ class ServerSessionHandler(SessionHandler):
 
         """
         uid = player.uid
-        return [session for session in self.values() if session.logged_in and session.uid == uid]
+        return [session for session in self._sessions_from_index(self.uid_index, uid)
+                if session.logged_in and session.uid == uid]
 
     def sessions_from_puppet(self, puppet):
         """
@@ -647,7 +771,7 @@ class ServerSessionHandler(SessionHandler):
             csessid (str): The session hash
 
         """
-        return [session for session in self.values()
+        return [session for session in self._sessions_from_index(self.csessid_index, csessid)
                 if session.csessid and session.csessid == csessid]
 
     def announce_all(self, message):
@@ -666,13 +790,30 @@ class ServerSessionHandler(SessionHandler):
         Sending data Server -> Portal
 
         Args:
-            session (Session): Session to relay to.
+            session (Session or list): Session to relay to. If a list
+                of Sessions, the same data is sent to all of them. It
+                is then only cleaned and sent across AMP once per
+                encoding, rather than once per Session.
             text (str, optional): text data to return
 
         Notes:
             The outdata will be scrubbed for sending across
             the wire here.
         """
+        if isinstance(session, (list, tuple)):
+            if _INLINEFUNC_ENABLED and not (kwargs.get("options") or {}).get("raw", False):
+                # inlinefuncs may depend on the session; clean for each
+                groups = [[sess] for sess in session]
+            else:
+                groups = {}
+                for sess in session:
+                    groups.setdefault(sess.protocol_flags["ENCODING"], []).append(sess)
+                groups = groups.values()
+            for group in groups:
+                self.server.amp_protocol.send_MsgServer2Portal(
+                        group, **self.clean_senddata(group[0], dict(kwargs)))
+            return
+
         # clean output for sending
         kwargs = self.clean_senddata(session, kwargs)
 
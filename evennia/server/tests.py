@@ -30,6 +30,8 @@ except ImportError:
     import unittest
 
 from django.test.runner import DiscoverRunner
+from mock import Mock, patch
+from evennia.utils.test_resources import EvenniaTest
 
 
 class EvenniaTestSuiteRunner(DiscoverRunner):
@@ -45,3 +47,460 @@ class EvenniaTestSuiteRunner(DiscoverRunner):
         import evennia
         evennia._init()
         return super(EvenniaTestSuiteRunner, self).build_suite(test_labels, extra_tests=extra_tests, **kwargs)
+
+
+class TestRenderCache(TestCase):
+    "Test the Portal render cache"
+    def setUp(self):
+        from evennia.server.portal.rendercache import RenderCache
+        self.cache = RenderCache(maxsize=2)
+        self.calls = []
+
+    def _renderer(self, text, upper):
+        self.calls.append(text)
+        return text.upper() if upper else text
+
+    def test_render(self):
+        self.assertEqual(self.cache.render(self._renderer, "foo", True), "FOO")
+        self.assertEqual(self.cache.render(self._renderer, "foo", True), "FOO")
+        self.assertEqual(self.cache.render(self._renderer, "foo", False), "foo")
+        self.assertEqual(self.calls, ["foo", "foo"])
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 2, 2))
+
+    def test_eviction(self):
+        self.cache.render(self._renderer, "a", True)
+        self.cache.render(self._renderer, "b", True)
+        self.cache.render(self._renderer, "a", True)
+        # b is now the least recently used and should be evicted
+        self.cache.render(self._renderer, "c", True)
+        self.cache.render(self._renderer, "a", True)
+        self.cache.render(self._renderer, "b", True)
+        self.assertEqual(self.calls, ["a", "b", "c", "b"])
+
+
+class TestCommandThrottle(TestCase):
+    "Test the Portal input throttle"
+    def setUp(self):
+        from evennia.server.portal.throttle import CommandThrottle
+
+        class _Session(object):
+            def __init__(self, sessid, address):
+                self.sessid = sessid
+                self.address = address
+        self.throttle = CommandThrottle(session_limits=(1, 2), ip_limits=(10, 3),
+                                        global_limits=(0, 0))
+        self.sess1 = _Session(1, "1.2.3.4")
+        self.sess2 = _Session(2, "1.2.3.4")
+        self.sess3 = _Session(3, "5.6.7.8")
+
+    def test_session_bucket(self):
+        self.assertTrue(self.throttle.consume(self.sess1, now=0))
+        self.assertTrue(self.throttle.consume(self.sess1, now=0))
+        self.assertFalse(self.throttle.consume(self.sess1, now=0))
+        # a flooding session does not affect others
+        self.assertTrue(self.throttle.consume(self.sess3, now=0))
+        self.assertAlmostEqual(self.throttle.wait_time(self.sess1, now=0.5), 0.5)
+        self.assertTrue(self.throttle.consume(self.sess1, now=1.0))
+        self.assertEqual(self.throttle.stats["session_overflow"], 1)
+
+    def test_ip_bucket(self):
+        self.assertTrue(self.throttle.consume(self.sess1, now=0))
+        self.assertTrue(self.throttle.consume(self.sess1, now=0))
+        self.assertTrue(self.throttle.consume(self.sess2, now=0))
+        self.assertFalse(self.throttle.consume(self.sess2, now=0))
+        self.assertEqual(self.throttle.stats["ip_overflow"], 1)
+
+    def test_uncounted_retry(self):
+        self.throttle.consume(self.sess1, now=0)
+        self.throttle.consume(self.sess1, now=0)
+        self.assertFalse(self.throttle.consume(self.sess1, now=0, count=False))
+        self.assertEqual(self.throttle.stats["session_overflow"], 0)
+        self.throttle.count_overflow(self.sess1, now=0)
+        self.assertEqual(self.throttle.stats["session_overflow"], 1)
+
+    def test_forget(self):
+        self.throttle.consume(self.sess1, now=0)
+        self.throttle.consume(self.sess2, now=0)
+        self.throttle.forget(self.sess1)
+        self.assertTrue("1.2.3.4" in self.throttle.ip_buckets)
+        self.throttle.forget(self.sess2)
+        self.assertFalse("1.2.3.4" in self.throttle.ip_buckets)
+        self.assertFalse(self.throttle.session_buckets)
+
+
+class TestTimerWheel(TestCase):
+    "Test the Portal timer wheel"
+    def setUp(self):
+        from evennia.server.portal.timerwheel import TimerWheel
+        self.now = 0.0
+        self.wheel = TimerWheel(clock=lambda: self.now)
+        # don't start a LoopingCall; we tick manually
+        self.wheel.task = Mock()
+        self.fired = []
+
+    def _advance(self, seconds):
+        self.now += seconds
+        self.wheel._tick()
+
+    def _callback(self, name):
+        self.fired.append((name, self.now))
+
+    def test_schedule(self):
+        self.wheel.schedule("a", 3, self._callback, "a")
+        self.wheel.schedule("b", 100, self._callback, "b")
+        self.wheel.schedule("c", 5000, self._callback, "c")
+        for _ in range(6000):
+            self._advance(1)
+        self.assertEqual(self.fired, [("a", 3), ("b", 100), ("c", 5000)])
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_reschedule_and_cancel(self):
+        self.wheel.schedule("a", 10, self._callback, "a")
+        self.wheel.schedule("b", 10, self._callback, "b")
+        self._advance(5)
+        self.wheel.schedule("a", 10, self._callback, "a")
+        self.wheel.cancel("b")
+        self.assertEqual(self.wheel.time_until("a"), 10)
+        self._advance(100)
+        self.assertEqual(self.fired, [("a", 105)])
+
+    def test_lag(self):
+        self.wheel.schedule("a", 70, self._callback, "a")
+        self._advance(200)
+        self.assertEqual(self.fired, [("a", 200)])
+
+
+class TestOOBReporter(TestCase):
+    "Test coalescing of OOB monitor reports"
+    def _make_reporter(self, mode, delta_only=False):
+        from twisted.internet.task import Clock
+        from evennia.server.oobreports import OOBReporter
+        self.clock = Clock()
+        self.session = Mock(sessid=1)
+        return OOBReporter(mode=mode, interval=1.0, delta_only=delta_only, clock=self.clock)
+
+    def _sent(self):
+        return [call[1]["monitor"]["value"] for call in self.session.msg.call_args_list]
+
+    def test_throttle(self):
+        reporter = self._make_reporter("throttle")
+        for hp in range(10):
+            reporter.report(self.session, "hp", hp)
+        # the first right away, the rest coalesced
+        self.assertEqual(self._sent(), [0])
+        self.clock.advance(1)
+        self.assertEqual(self._sent(), [0, 9])
+        self.clock.advance(2)
+        self.assertFalse(reporter.task)
+        reporter.report(self.session, "hp", 10)
+        self.assertEqual(self._sent(), [0, 9, 10])
+
+    def test_debounce(self):
+        reporter = self._make_reporter("debounce")
+        for hp in range(3):
+            reporter.report(self.session, "hp", hp)
+            self.clock.advance(0.5)
+        self.assertEqual(self._sent(), [])
+        self.clock.pump([0.5, 0.5])
+        self.assertEqual(self._sent(), [2])
+
+    def test_delta_only(self):
+        reporter = self._make_reporter(None, delta_only=True)
+        for hp in (5, 5, 6, 6, 5):
+            reporter.report(self.session, "hp", hp)
+        self.assertEqual(self._sent(), [5, 6, 5])
+        reporter.forget(1)
+        reporter.report(self.session, "hp", 5)
+        self.assertEqual(self._sent(), [5, 6, 5, 5])
+
+
+class TestSessionIndex(TestCase):
+    "Test the secondary session indexes of the session handlers"
+    def setUp(self):
+        from evennia.server.sessionhandler import ServerSessionHandler
+
+        class _Session(object):
+            def __init__(self, sessid, uid=None, csessid=None):
+                self.sessid, self.uid, self.csessid = sessid, uid, csessid
+                self.logged_in = uid is not None
+                self.player = uid and Mock(uid=uid)
+
+        self.handler = ServerSessionHandler()
+        for sessid, uid, csessid in ((1, None, "abc"), (2, 10, "abc"), (3, 10, None), (4, 20, None)):
+            self.handler[sessid] = _Session(sessid, uid, csessid)
+
+    def test_lookups(self):
+        handler = self.handler
+        self.assertEqual(set(sess.sessid for sess in handler.sessions_from_csessid("abc")), set([1, 2]))
+        self.assertEqual(set(sess.sessid for sess in handler.sessions_from_player(Mock(uid=10))),
+                         set([2, 3]))
+        self.assertEqual(handler.player_count(), 2)
+        self.assertEqual(len(handler.all_connected_players()), 2)
+
+    def test_update(self):
+        handler = self.handler
+        # logging out is seen right away, also before re-indexing
+        handler[4].logged_in = False
+        self.assertEqual(handler.player_count(), 1)
+        handler[1].uid, handler[1].logged_in = 20, True
+        handler.update_index(handler[1])
+        self.assertEqual([sess.sessid for sess in handler.sessions_from_player(Mock(uid=20))], [1])
+        del handler[2]
+        del handler[1]
+        self.assertEqual(handler.sessions_from_csessid("abc"), [])
+        self.assertFalse("abc" in handler.csessid_index)
+
+
+class TestSessionSync(TestCase):
+    "Test the compact session layout and delta syncing"
+    def setUp(self):
+        from evennia.server.session import Session
+        self.portal_session = Session()
+        self.portal_session.init_session("telnet", ("localhost", 4000), Mock())
+        self.portal_session.sessid = 1
+        self.server_session = Session()
+
+    def test_protocol_flags(self):
+        from evennia.server.session import ProtocolFlags
+        flags = self.portal_session.protocol_flags
+        self.assertEqual(flags["ENCODING"], "utf-8")
+        self.assertEqual(flags.get_changed(), {})
+        flags["ENCODING"] = "latin-1"
+        flags.update({"ANSI": True, "RAW": False})
+        self.assertEqual(flags.get_changed(), {"ENCODING": "latin-1", "ANSI": True})
+        self.assertEqual(dict(flags)["NOMARKUP"], False)
+        del flags["ENCODING"]
+        self.assertEqual(flags["ENCODING"], "utf-8")
+        # other sessions are not affected
+        self.assertEqual(ProtocolFlags().get_changed(), {})
+        self.assertFalse(hasattr(self.portal_session, "__dict__"))
+
+    def test_delta_sync(self):
+        portal, server = self.portal_session, self.server_session
+        server.load_sync_data(portal.get_sync_data())
+        self.assertEqual(server.address, ("localhost", 4000))
+        self.assertEqual(server.protocol_flags["ENCODING"], "utf-8")
+        self.assertEqual(portal.get_sync_data(delta=True), {"sessid": 1})
+        portal.protocol_flags["SCREENWIDTH"] = {0: 80}
+        portal.cmd_total = 5
+        self.assertEqual(portal.get_sync_data(delta=True, attrs=("sessid", "protocol_flags")),
+                         {"sessid": 1, "protocol_flags": {"SCREENWIDTH": {0: 80}}})
+        # changes inside a nested flag are seen too
+        portal.protocol_flags["SCREENWIDTH"][0] = 100
+        server.load_sync_data(portal.get_sync_data(delta=True))
+        self.assertEqual(server.protocol_flags["SCREENWIDTH"], {0: 100})
+        self.assertEqual(server.cmd_total, 5)
+        # what the server was sent is not sent back
+        server.uid = 3
+        self.assertEqual(server.get_sync_data(delta=True), {"sessid": 1, "uid": 3})
+
+
+class TestPortalResync(TestCase):
+    "Test the chunked session sync of the Portal after a Server reload"
+    def setUp(self):
+        from twisted.internet.defer import Deferred
+        from evennia.server.session import Session
+        from evennia.server.portal.portalsessionhandler import PortalSessionHandler
+
+        self.handler = PortalSessionHandler()
+        self.handler.portal = Mock()
+        self.handler.throttle = Mock(enabled=False)
+        self.sent = []
+        self.relayed = []
+
+        def _send(session, operation=None, **kwargs):
+            self.sent.append((kwargs, Deferred()))
+            return self.sent[-1][1]
+        self.handler.portal.amp_protocol.send_AdminPortal2Server = _send
+        self.handler._relay_input = lambda session, kwargs: self.relayed.append(session.sessid)
+        for sessid in (1, 2, 3):
+            sess = Session()
+            sess.init_session("telnet", ("localhost", sessid), self.handler)
+            sess.sessid = sessid
+            self.handler[sessid] = sess
+
+    def test_resync(self):
+        handler, sent = self.handler, self.sent
+        with patch("evennia.server.portal.portalsessionhandler._SYNC_CHUNK_SIZE", 2):
+            handler.server_resync()
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(set(sent[0][0]["sessiondata"]), set([1, 2]))
+        self.assertTrue(sent[0][0]["first"])
+        self.assertFalse(sent[0][0]["final"])
+        # input is held until the session is restored on the server
+        handler.data_in(handler[1], text="look")
+        handler.data_in(handler[3], text="look")
+        self.assertEqual(self.relayed, [])
+        sent[0][1].callback({})
+        self.assertEqual(self.relayed, [1])
+        self.assertEqual(set(sent[1][0]["sessiondata"]), set([3]))
+        self.assertTrue(sent[1][0]["final"])
+        sent[1][1].callback({})
+        self.assertEqual(self.relayed, [1, 3])
+        self.assertFalse(handler.unsynced)
+        handler.data_in(handler[2], text="look")
+        self.assertEqual(self.relayed, [1, 3, 2])
+
+    def test_resync_failure(self):
+        from twisted.internet.defer import Deferred
+        from evennia.server.amp import AMPProtocol
+        handler = self.handler
+        # send through the real AMP protocol, which normally swallows errors
+        calls = []
+        proto = AMPProtocol()
+        proto.callRemote = lambda command, **kwargs: calls.append(Deferred()) or calls[-1]
+        handler.portal.amp_protocol = proto
+        with patch("evennia.server.portal.portalsessionhandler._SYNC_CHUNK_SIZE", 1):
+            handler.server_resync()
+        handler.data_in(handler[2], text="look")
+        handler.data_in(handler[3], text="look")
+        calls[0].callback({})
+        self.assertEqual(len(calls), 2)
+        with patch("evennia.server.portal.portalsessionhandler.log_err") as log_err:
+            calls[1].errback(Exception("timeout"))
+            self.assertTrue(log_err.called)
+        # the remaining sessions are not frozen and no more chunks are sent
+        self.assertEqual(self.relayed, [2, 3])
+        self.assertEqual(len(calls), 2)
+        self.assertFalse(handler.unsynced)
+        self.assertFalse(handler.sync_chunks)
+
+
+class TestPortalThrottle(TestCase):
+    "Test throttling the input of Portal sessions"
+    def setUp(self):
+        from twisted.internet.task import Clock
+        from evennia.server.session import Session
+        from evennia.server.portal.portalsessionhandler import PortalSessionHandler
+        from evennia.server.portal.throttle import CommandThrottle
+
+        self.clock = Clock()
+        self.patcher = patch.multiple("evennia.server.portal.portalsessionhandler",
+                                      reactor=self.clock)
+        self.timepatcher = patch("evennia.server.portal.throttle.time", self.clock.seconds)
+        self.patcher.start()
+        self.timepatcher.start()
+        self.handler = PortalSessionHandler()
+        self.handler.throttle = CommandThrottle(session_limits=(10, 1), ip_limits=(0, 0),
+                                                global_limits=(0, 0))
+        self.relayed = []
+        self.handler._relay_input = lambda session, kwargs: self.relayed.append(kwargs["text"])
+        self.session = Session()
+        self.session.init_session("telnet", ("localhost", 1), self.handler)
+        self.session.sessid = 1
+        self.handler[1] = self.session
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.timepatcher.stop()
+
+    def test_overflow_counted_once(self):
+        handler, stats = self.handler, self.handler.throttle.stats
+        for text in ("a", "b", "c"):
+            handler.data_in(self.session, text=text)
+        self.assertEqual(self.relayed, ["a"])
+        self.assertEqual(stats["session_overflow"], 2)
+        self.assertEqual(stats["queued"], 2)
+        # polling for the queued input does not count it again
+        for _ in range(30):
+            self.clock.advance(0.01)
+        self.assertEqual(self.relayed, ["a", "b", "c"])
+        self.assertEqual(stats["session_overflow"], 2)
+
+
+class TestWebclientAjax(TestCase):
+    "Test the batching and buffering of the ajax webclient"
+    def setUp(self):
+        from twisted.internet.task import Clock
+        from evennia.server.portal.webclient_ajax import WebClient
+        self.clock = Clock()
+        self.patcher = patch.multiple("evennia.server.portal.webclient_ajax", reactor=self.clock,
+                                      TIMER_WHEEL=Mock(), _BATCH_SIZE=1000, _HOLD_TIME=0.02,
+                                      _BUFFER_SIZE=4)
+        self.patcher.start()
+        self.client = WebClient()
+        self.request = Mock()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def _written(self):
+        import json
+        return [json.loads(call[0][0]) for call in self.request.write.call_args_list]
+
+    @patch("evennia.server.portal.webclient_ajax._BATCH_SIZE", 30)
+    def test_batch_size(self):
+        import json
+        client = self.client
+        for ientry in range(3):
+            client.lineSend("csess", ["text", ["line %i" % ientry], {}])
+        # each entry is 24 characters, so only one fits in a batch
+        self.assertEqual(json.loads(client._get_batch("csess")), [["text", ["line 0"], {}]])
+        # an entry larger than the batch size is still sent
+        client.lineSend("csess", ["text", ["a much longer line of text"], {}])
+        self.assertEqual(json.loads(client._get_batch("csess")), [["text", ["line 1"], {}]])
+        self.assertEqual(len(json.loads(client._get_batch("csess"))), 1)
+        self.assertEqual(json.loads(client._get_batch("csess")),
+                         [["text", ["a much longer line of text"], {}]])
+        self.assertEqual(client._get_batch("csess"), "[]")
+
+    def test_hold_time(self):
+        client = self.client
+        client.requests["csess"] = self.request
+        client.lineSend("csess", ["text", ["a"], {}])
+        client.lineSend("csess", ["prompt", ["b"], {}])
+        # held back so they can be sent together
+        self.assertFalse(self.request.write.called)
+        self.assertTrue("csess" in client.flush_tasks)
+        self.clock.advance(0.02)
+        self.assertEqual(self._written(), [[["text", ["a"], {}], ["prompt", ["b"], {}]]])
+        self.assertTrue(self.request.finish.called)
+        self.assertFalse(client.requests)
+        self.assertFalse(client.flush_tasks)
+
+    def test_overflow(self):
+        import json
+        client = self.client
+        for ientry in range(6):
+            client.lineSend("csess", ["text", [str(ientry)], {}])
+        # the oldest entries were dropped
+        self.assertEqual([entry[1][0] for entry in json.loads(client._get_batch("csess"))],
+                         ["2", "3", "4", "5"])
+
+    def test_disconnect(self):
+        client = self.client
+        client.requests["csess"] = self.request
+        client.lineSend("csess", ["text", ["Goodbye."], {}])
+        client.client_disconnect("csess")
+        # sent right away instead of after the hold time
+        self.assertEqual(self._written(), [[["text", ["Goodbye."], {}]]])
+        self.assertFalse(client.flush_tasks)
+        self.assertFalse(client.databuffer)
+        self.assertFalse(self.clock.getDelayedCalls())
+
+
+class TestPortalSessionsSync(EvenniaTest):
+    "Test restoring the Server sessions after a reload"
+    def test_chunked_sync(self):
+        from evennia.server.session import Session
+        from evennia.server.sessionhandler import ServerSessionHandler
+
+        handler = ServerSessionHandler()
+        handler.server = Mock()
+        sessdata = {}
+        for sessid, player, puppet in ((10, self.player, self.char1), (11, self.player2, None)):
+            sess = Session()
+            sess.init_session("telnet", ("localhost", sessid), handler)
+            sess.sessid, sess.uid, sess.logged_in = sessid, player.id, True
+            sess.puid = puppet and puppet.id
+            sessdata[sessid] = sess.get_sync_data()
+
+        handler.portal_sessions_sync({10: sessdata[10]}, first=True, final=False)
+        self.assertEqual(handler[10].player, self.player)
+        self.assertEqual(handler[10].puppet, self.char1)
+        handler.portal_sessions_sync({11: sessdata[11]}, first=False, final=False)
+        self.assertEqual(set(handler), set([10, 11]))
+        self.assertEqual(handler[11].player, self.player2)
+        self.assertEqual(handler[11].puppet, None)
+        self.assertEqual(len(handler.sessions_from_player(self.player)), 1)
@@ -67,6 +67,17 @@ WEBSERVER_THREADPOOL_LIMITS = (1, 20)
 # offers the fallback ajax-based webclient backbone for browsers not supporting
 # the websocket one.
 WEBCLIENT_ENABLED = True
+# The ajax webclient (used when websockets are not available) returns all
+# data buffered for a client in one reply. This is the max size (in bytes)
+# of such a reply.
+WEBCLIENT_AJAX_BATCH_SIZE = 65536
+# When the ajax webclient is waiting for data, hold off replying for this
+# many seconds so that output arriving at the same time is sent in one
+# batch. Set to 0 to reply immediately.
+WEBCLIENT_AJAX_HOLD_TIME = 0.02
+# Max number of messages buffered for an ajax webclient that is not
+# polling. If more arrive, the oldest are dropped.
+WEBCLIENT_AJAX_BUFFER_SIZE = 1000
 # Activate Websocket support for modern browsers. If this is on, the
 # default webclient will use this and only use the ajax version of the browser
 # is too old to support websockets. Requires WEBCLIENT_ENABLED.
@@ -193,14 +204,45 @@ IDMAPPER_CACHE_MAXSIZE = 200      # (MB)
 # connections will be queued to this rate, so none will be lost.
 # Must be set to a value > 0.
 MAX_CONNECTION_RATE = 2
-# Determine how many commands per second a given Session is allowed
-# to send to the Portal via a connected protocol. Too high rate will
-# drop the command and echo a warning. Note that this will also cap
-# OOB messages so don't set it too low if you expect a lot of events
-# from the client! To turn the limiter off, set to <= 0.
+# Incoming commands are throttled with "token buckets": each bucket
+# allows a burst of commands and then refills at a given rate (commands
+# per second). A command must pass the bucket of its Session, of its
+# client's IP address and the global bucket shared by all. Note that this
+# will also cap OOB messages so don't set it too low if you expect a lot
+# of events from the client! Setting a rate to <= 0 turns off that part of
+# the throttle. Each bucket is given as (rate, burst).
+COMMAND_THROTTLE_SESSION = (10, 20)
+COMMAND_THROTTLE_IP = (40, 80)
+# The total number of commands per second the Portal relays to the Server
+# (the global bucket, with a burst of twice this).
 MAX_COMMAND_RATE = 80
+# Commands arriving too fast are queued and relayed as soon as their
+# buckets allow. This is the max number of queued commands per Session;
+# beyond this, commands are dropped with a warning.
+COMMAND_THROTTLE_QUEUE_SIZE = 20
 # The warning to echo back to users if they send commands too fast
 COMMAND_RATE_WARNING ="You entered commands too fast. Wait a moment and try again."
+# The Portal caches the result of converting outgoing text to ANSI/html
+# so that the same text sent to many sessions (like a channel message)
+# only needs to be converted once per combination of render options. This
+# is the max number of renderings to keep in the cache. Set to 0 to turn
+# the cache off.
+PORTAL_RENDER_CACHE_SIZE = 2000
+# The TickerHandler normally calls all subscribers of a given interval
+# at the same time. With many subscribers (like thousands of mobs on the
+# same tick) this stalls the server for the duration of the tick. If this
+# is > 1, the subscribers of each interval are split into this many shards
+# which tick one after another, spread out over the interval.
+TICKER_SHARDS = 1
+# Clients monitoring values over OOB (like a GMCP/MSDP status bar showing
+# health) are not sent every single change. With OOB_REPORT_MODE
+# "throttle", a value is reported at most once every OOB_REPORT_INTERVAL
+# seconds; with "debounce" it is reported once it has not changed for
+# OOB_REPORT_INTERVAL seconds. None sends every change right away. If
+# OOB_REPORT_DELTA_ONLY is set, unchanged values are not sent again.
+OOB_REPORT_MODE = "throttle"
+OOB_REPORT_INTERVAL = 0.5
+OOB_REPORT_DELTA_ONLY = True
 # If this is true, errors and tracebacks from the engine will be
 # echoed as text in-game as well as to the log. This can speed up
 # debugging. Showing full tracebacks to regular users could be a
@@ -325,6 +325,20 @@ class AttributeHandler(object):
         self._catcache.pop(catkey, None)
         self._cache_complete = False
 
+    def _at_change(self):
+        """
+        Called after Attributes were added, changed or removed. The
+        appearance of an Object may depend on its Attributes, so its
+        cached appearance is dropped.
+
+        """
+        if self._attrtype is None:
+            try:
+                self.obj.invalidate_appearance()
+            except AttributeError:
+                # not an Object
+                pass
+
     def reset_cache(self):
         """
         Reset cache from the outside.
@@ -481,6 +495,7 @@ class AttributeHandler(object):
             getattr(self.obj, self._m2m_fieldname).add(new_attr)
             # update cache
             self._setcache(keystr, category, new_attr)
+        self._at_change()
 
 
     def batch_add(self, key, value, category=None, lockstring="",
@@ -551,6 +566,7 @@ class AttributeHandler(object):
         if new_attrobjs:
             # Add new objects to m2m field all at once
             getattr(self.obj, self._m2m_fieldname).add(*new_attrobjs)
+        self._at_change()
 
 
     def remove(self, key, raise_exception=False, category=None,
@@ -589,6 +605,7 @@ class AttributeHandler(object):
                         pass
                     finally:
                         self._delcache(key, category)
+                        self._at_change()
             if not attr_objs and raise_exception:
                 raise AttributeError
 
@@ -614,6 +631,7 @@ class AttributeHandler(object):
         self._cache = {}
         self._catcache = {}
         self._cache_complete = False
+        self._at_change()
 
     def all(self, accessing_obj=None, default_access=True):
         """
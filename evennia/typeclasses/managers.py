@@ -4,7 +4,10 @@ abstract models in dbobjects.py (and which are thus shared by
 all Attributes and TypedObjects).
 
 """
+from uuid import uuid4
+from collections import OrderedDict
 from functools import update_wrapper
+from django.db import connection, transaction
 from django.db.models import Q
 from evennia.utils import idmapper
 from evennia.utils.utils import make_iter, variable_from_module
@@ -12,6 +15,81 @@ from evennia.utils.utils import make_iter, variable_from_module
 __all__ = ("TypedObjectManager", )
 _GA = object.__getattribute__
 _Tag = None
+_Attribute = None
+# max number of ids per id__in query (SQLite allows 999 query variables)
+_ID_CHUNK_SIZE = 500
+# the handler on a typed object managing each type of Tag
+_TAG_HANDLERS = {None: "tags", "alias": "aliases", "permission": "permissions"}
+
+
+def _chunked(dbids):
+    "Split a list of ids into chunks small enough for an id__in query"
+    for ichunk in range(0, len(dbids), _ID_CHUNK_SIZE):
+        yield dbids[ichunk:ichunk + _ID_CHUNK_SIZE]
+
+
+def bulk_create_with_ids(model, instances, marker_field="db_lock_storage", ids_only=False):
+    """
+    Insert many new database rows using as few queries as possible.
+
+    Django's `bulk_create` inserts in chunks sized for the database
+    but does not give the new rows their ids on most databases. Each
+    row is therefore inserted with a unique marker in a text field
+    and re-fetched by that marker, after which the field gets back
+    its original value. This is all done in one transaction, so no
+    marker is left behind if it fails.
+
+    Args:
+        model (class): The database model to create rows of.
+        instances (list): Unsaved instances of `model`.
+        marker_field (str, optional): A text field on `model` that is
+            temporarily used to find the new rows again.
+        ids_only (bool, optional): Only get the ids of the new rows
+            instead of loading them.
+
+    Returns:
+        created (list): The new rows as loaded from the database, in
+            the same order as `instances`. These are the instances
+            used by the idmapper, not those given as input. If
+            `ids_only` is set, this is a list of their ids instead.
+
+    """
+    if not instances:
+        return []
+    marker = "_bulk_%s_" % uuid4().hex
+    originals = {}
+    for ind, instance in enumerate(instances):
+        originals.setdefault(getattr(instance, marker_field) or "", []).append(ind)
+        setattr(instance, marker_field, "%s%i" % (marker, ind))
+    created = [None] * len(instances)
+    try:
+        # the markers must never be committed
+        with transaction.atomic():
+            model.objects.bulk_create(instances)
+            query = model.objects.filter(**{"%s__startswith" % marker_field: marker})
+            if ids_only:
+                for dbid, markerval in query.values_list("id", marker_field):
+                    created[int(markerval[len(marker):])] = dbid
+            else:
+                for row in query:
+                    created[int(getattr(row, marker_field)[len(marker):])] = row
+            for value, inds in originals.items():
+                dbids = [created[ind] if ids_only else created[ind].id for ind in inds]
+                for chunk in _chunked(dbids):
+                    model.objects.filter(id__in=chunk).update(**{marker_field: value})
+    except Exception:
+        if not ids_only:
+            # the rows are rolled back; don't leave them in the idmapper cache
+            for row in created:
+                if row is not None:
+                    row.flush_from_cache(force=True)
+        raise
+    if not ids_only:
+        for value, inds in originals.items():
+            for ind in inds:
+                setattr(created[ind], marker_field, value)
+    return created
+
 
 #
 # Decorators
@@ -349,6 +427,241 @@ class TypedObjectManager(idmapper.manager.SharedMemoryManager):
             tag.save()
         return make_iter(tag)[0]
 
+    def batch_add_tags(self, tagdata):
+        """
+        Add Tags to many entities at once. This is much faster than
+        calling `obj.tags.add` on each entity in turn, since the
+        Tags and their links to the entities are created with a
+        few bulk queries.
+
+        Args:
+            tagdata (list): A list of `(obj, key, category, tagtype)`,
+                where `obj` is an entity of this manager's model and
+                `tagtype` is `None` for normal Tags, `"alias"` or
+                `"permission"`.
+
+        Notes:
+            As with `create_tag`, existing Tags are re-used. Links
+            that already exist are not created again. This does not
+            update the search index for aliases.
+
+        """
+        global _Tag
+        if not _Tag:
+            from evennia.typeclasses.models import Tag as _Tag
+        dbmodel = self.model.__dbclass__
+        modelname = dbmodel.__name__.lower()
+        links = []
+        for obj, key, category, tagtype in tagdata:
+            if not key:
+                continue
+            links.append((obj, key.strip().lower(),
+                          category.strip().lower() if category is not None else None,
+                          tagtype.strip().lower() if tagtype is not None else None))
+        if not links:
+            return
+        # get or create all the Tags
+        keys = list(set(link[1] for link in links))
+
+        def _get_tags():
+            return dict(((tag.db_key, tag.db_category, tag.db_tagtype), tag)
+                        for tag in _Tag.objects.filter(db_key__in=keys))
+        tags = _get_tags()
+        missing = set(link[1:] for link in links) - set(tags)
+        if missing:
+            _Tag.objects.bulk_create([_Tag(db_key=key, db_category=category, db_tagtype=tagtype)
+                                      for key, category, tagtype in missing])
+            tags = _get_tags()
+        # link them to the entities, skipping links that already exist
+        through = dbmodel.db_tags.through
+        objids = list(set(link[0].id for link in links))
+        tagids = list(set(tag.id for tag in tags.values()))
+        existing = set()
+        for chunk in _chunked(objids):
+            existing.update(through.objects.filter(
+                **{"%s_id__in" % modelname: chunk, "tag_id__in": tagids}).values_list(
+                    "%s_id" % modelname, "tag_id"))
+        new_links = []
+        for obj, key, category, tagtype in links:
+            tag = tags[(key, category, tagtype)]
+            if (obj.id, tag.id) not in existing:
+                existing.add((obj.id, tag.id))
+                new_links.append(through(**{"%s_id" % modelname: obj.id, "tag_id": tag.id}))
+            handler = _TAG_HANDLERS.get(tagtype)
+            if handler and hasattr(obj, handler):
+                getattr(obj, handler)._setcache(key, category, tag)
+        through.objects.bulk_create(new_links)
+
+    def batch_add_attributes(self, attrdata):
+        """
+        Add Attributes to many entities at once. New Attributes are
+        created with a few bulk queries instead of one save per
+        Attribute and entity.
+
+        Args:
+            attrdata (list): A list of `(obj, key, value, category)`,
+                where `obj` is an entity of this manager's model.
+
+        Notes:
+            Attributes that already exist on an entity are updated
+            through its AttributeHandler as usual.
+
+        """
+        global _Attribute
+        if not _Attribute:
+            from evennia.typeclasses.attributes import Attribute as _Attribute
+        from evennia.utils.dbserialize import to_pickle
+        dbmodel = self.model.__dbclass__
+        modelname = dbmodel.__name__.lower()
+        through = dbmodel.db_attributes.through
+        # the last value given for the same Attribute wins
+        cleaned = OrderedDict()
+        for obj, key, value, category in attrdata:
+            key = key.strip().lower()
+            category = category.strip().lower() if category is not None else None
+            cleaned[(obj.id, key, category)] = (obj, key, value, category)
+        attrdata = list(cleaned.values())
+        if not attrdata:
+            return
+        # find the Attributes that already exist on the entities
+        objids = list(set(attr[0].id for attr in attrdata))
+        keys = list(set(attr[1] for attr in attrdata))
+        existing = set()
+        for chunk in _chunked(objids):
+            existing.update(through.objects.filter(
+                **{"%s_id__in" % modelname: chunk, "attribute__db_key__in": keys,
+                   "attribute__db_attrtype": None}).values_list(
+                       "%s_id" % modelname, "attribute__db_key", "attribute__db_category"))
+        new_attrs, changed = [], set()
+        for obj, key, value, category in attrdata:
+            if (obj.id, key, category) in existing:
+                obj.attributes.add(key, value, category=category)
+            else:
+                new_attrs.append((obj, key, category,
+                                  _Attribute(db_key=key, db_category=category, db_attrtype=None,
+                                             db_value=to_pickle(value), db_strvalue=None)))
+        attrs = bulk_create_with_ids(_Attribute, [attr[3] for attr in new_attrs])
+        links = []
+        for (obj, key, category, _unsaved), attr in zip(new_attrs, attrs):
+            links.append(through(**{"%s_id" % modelname: obj.id, "attribute_id": attr.id}))
+            obj.attributes._setcache(key, category, attr)
+            changed.add(obj)
+        through.objects.bulk_create(links)
+        for obj in changed:
+            obj.attributes._at_change()
+
+    def batch_copy_tags(self, copies, exclude_tagtypes=()):
+        """
+        Give entities all the Tags of other entities, linking the
+        Tags with a few bulk queries.
+
+        Args:
+            copies (list): A list of `(original, target)` pairs of
+                entities of this manager's model.
+            exclude_tagtypes (tuple, optional): Don't copy Tags of
+                these tagtypes, like `"alias"`.
+
+        """
+        dbmodel = self.model.__dbclass__
+        modelname = dbmodel.__name__.lower()
+        through = dbmodel.db_tags.through
+        tagids = {}
+        originalids = list(set(original.id for original, target in copies))
+        for chunk in _chunked(originalids):
+            for objid, tagid, tagtype in through.objects.filter(
+                    **{"%s_id__in" % modelname: chunk}).values_list(
+                        "%s_id" % modelname, "tag_id", "tag__db_tagtype"):
+                if tagtype not in exclude_tagtypes:
+                    tagids.setdefault(objid, []).append(tagid)
+        if not tagids:
+            return
+        targetids = list(set(target.id for original, target in copies))
+        alltagids = list(set(tagid for ids in tagids.values() for tagid in ids))
+        existing = set()
+        for chunk in _chunked(targetids):
+            existing.update(through.objects.filter(
+                **{"%s_id__in" % modelname: chunk, "tag_id__in": alltagids}).values_list(
+                    "%s_id" % modelname, "tag_id"))
+        links = []
+        for original, target in copies:
+            for tagid in tagids.get(original.id, ()):
+                if (target.id, tagid) not in existing:
+                    existing.add((target.id, tagid))
+                    links.append(through(**{"%s_id" % modelname: target.id, "tag_id": tagid}))
+            for handler in _TAG_HANDLERS.values():
+                if hasattr(target, handler):
+                    getattr(target, handler).reset_cache()
+        through.objects.bulk_create(links)
+
+    def batch_copy_attributes(self, copies):
+        """
+        Give entities copies of all the Attributes of other entities.
+        The Attribute rows are duplicated in the database with their
+        stored (pickled) values as-is, without unpickling and
+        re-pickling them.
+
+        Args:
+            copies (list): A list of `(original, target)` pairs of
+                entities of this manager's model. Attributes with the
+                same key and category already on a target are
+                replaced.
+
+        Notes:
+            Only normal Attributes are copied, not nicks.
+
+        """
+        global _Attribute
+        if not _Attribute:
+            from evennia.typeclasses.attributes import Attribute as _Attribute
+        from evennia.utils.picklefield import PickledObject
+        dbmodel = self.model.__dbclass__
+        modelname = dbmodel.__name__.lower()
+        through = dbmodel.db_attributes.through
+        # the stored values, read without going through the field conversion
+        rawvalue = "%s.%s" % (connection.ops.quote_name(_Attribute._meta.db_table),
+                              connection.ops.quote_name(_Attribute._meta.get_field("db_value").column))
+        attrs = {}
+        originalids = list(set(original.id for original, target in copies))
+        for chunk in _chunked(originalids):
+            for row in _Attribute.objects.filter(
+                    **{"%s__id__in" % modelname: chunk, "db_attrtype": None}).extra(
+                        select={"rawvalue": rawvalue}).values_list(
+                            "%s__id" % modelname, "db_key", "db_category", "rawvalue",
+                            "db_strvalue", "db_lock_storage", "db_model"):
+                attrs.setdefault(row[0], []).append(row[1:])
+        if not attrs:
+            return
+        # replace Attributes the targets already have
+        targets = dict((target.id, target) for original, target in copies)
+        copied = dict(((target.id, attr[0], attr[1]), None)
+                      for original, target in copies for attr in attrs.get(original.id, ()))
+        replaced = []
+        for chunk in _chunked(list(targets)):
+            for objid, attrid, key, category in through.objects.filter(
+                    **{"%s_id__in" % modelname: chunk, "attribute__db_attrtype": None}).values_list(
+                        "%s_id" % modelname, "attribute_id", "attribute__db_key",
+                        "attribute__db_category"):
+                if (objid, key, category) in copied:
+                    replaced.append(attrid)
+                    targets[objid].attributes._delcache(key, category)
+        for chunk in _chunked(replaced):
+            _Attribute.objects.filter(id__in=chunk).delete()
+
+        new_attrs, owners = [], []
+        for original, target in copies:
+            for key, category, value, strvalue, lockstring, model in attrs.get(original.id, ()):
+                new_attrs.append(_Attribute(db_key=key, db_category=category, db_attrtype=None,
+                                            db_value=PickledObject(value) if value is not None else None,
+                                            db_strvalue=strvalue, db_lock_storage=lockstring,
+                                            db_model=model))
+                owners.append(target.id)
+        attrids = bulk_create_with_ids(_Attribute, new_attrs, ids_only=True)
+        through.objects.bulk_create([through(**{"%s_id" % modelname: objid, "attribute_id": attrid})
+                                     for objid, attrid in zip(owners, attrids)])
+        for target in targets.values():
+            target.attributes.reset_cache()
+            target.attributes._at_change()
+
     # object-manager methods
 
     def dbref(self, dbref, reqhash=True):
@@ -411,6 +724,39 @@ class TypedObjectManager(idmapper.manager.SharedMemoryManager):
         """
         return self.get_id(dbref)
 
+    def get_by_ids(self, dbids, typeclasses=None):
+        """
+        Get entities by id. Entities in the idmapper cache are used
+        directly, the rest are fetched in as few queries as possible.
+
+        Args:
+            dbids (iterable): The ids to get.
+            typeclasses (list, optional): Only return entities with
+                one of these typeclass paths.
+
+        Returns:
+            matches (list): The entities found, sorted by id. Only
+                instances of this manager's model are included.
+
+        """
+        model = self.model
+        matches = []
+        missing = []
+        for dbid in sorted(set(dbids)):
+            obj = model.get_cached_instance(dbid)
+            if obj is None:
+                missing.append(dbid)
+            else:
+                matches.append(obj)
+        for ichunk in range(0, len(missing), _ID_CHUNK_SIZE):
+            matches.extend(super(TypedObjectManager, self).filter(
+                id__in=missing[ichunk:ichunk + _ID_CHUNK_SIZE]))
+        if typeclasses:
+            typeclasses = make_iter(typeclasses)
+            matches = [obj for obj in matches if _GA(obj, "db_typeclass_path") in typeclasses]
+        return sorted((obj for obj in matches if isinstance(obj, model)),
+                      key=lambda obj: _GA(obj, "id"))
+
     @returns_typeclass_list
     def get_dbref_range(self, min_dbref=None, max_dbref=None):
         """
@@ -36,6 +36,7 @@ from django.utils.encoding import smart_str
 
 from evennia.typeclasses.attributes import Attribute, AttributeHandler, NAttributeHandler
 from evennia.typeclasses.tags import Tag, TagHandler, AliasHandler, PermissionHandler
+from evennia.typeclasses.searchindex import get_search_index
 
 from evennia.utils.idmapper.models import SharedMemoryModel, SharedMemoryModelBase
 
@@ -602,6 +603,7 @@ class TypedObject(SharedMemoryModel):
 
         """
         global TICKER_HANDLER
+        dbid = self.id
         self.permissions.clear()
         self.attributes.clear()
         self.aliases.clear()
@@ -612,6 +614,23 @@ class TypedObject(SharedMemoryModel):
         self.delete = self._deleted
         super(TypedObject, self).delete()
 
+        index = get_search_index(self, build=False)
+        if index is not None:
+            index.remove(dbid)
+
+    def at_db_key_postsave(self, new):
+        """
+        Called after the key was saved, no matter how. Updates the
+        search index of this model, if one has been built.
+
+        Args:
+            new (bool): Set if this entity was saved for the first time.
+
+        """
+        index = get_search_index(self, build=False)
+        if index is not None:
+            index.update(self.id, key=_GA(self, index.key_field))
+
     #
     # Memory management
     #
@@ -0,0 +1,252 @@
+"""
+Search index
+
+Global searches by name (like `@find`, `@teleport` or `search_object`
+without candidates) would otherwise have to match the name against the
+key of every entity in the database, and against all aliases through
+the tag tables. Without functional indexes on the database this means
+a full table scan for each search.
+
+The `SearchIndex` instead keeps the lower-case keys and aliases of all
+entities of a database model in memory, sorted for fast exact, prefix
+and word-prefix lookups. It only stores the names and ids, not the
+entities themselves. An index is built on first use and then kept
+up to date by the `at_<keyfield>_postsave` hook of the model, by the
+`AliasHandler` and when entities are deleted; if no search was made
+yet, these updates cost nothing.
+
+```python
+from evennia.typeclasses.searchindex import get_search_index
+
+ids = get_search_index(ObjectDB).prefix("sword")
+```
+
+The index can only see changes made in this process through the normal
+entity API. After changing names directly in the database (or with
+`QuerySet.update`), call `rebuild()` on the index.
+
+"""
+from bisect import bisect_left, insort
+
+# model: SearchIndex
+_INDEXES = {}
+
+
+class SearchIndex(object):
+    """
+    An in-memory index of the keys and aliases of all entities of one
+    database model.
+
+    """
+    def __init__(self, model):
+        """
+        Initialize the index. It is not filled until it is first used.
+
+        Args:
+            model (class): The database model (like ObjectDB) to index.
+                If it has a `_search_key_field` property, this is
+                used as the key field instead of `db_key`.
+
+        """
+        self.model = model
+        self.key_field = getattr(model, "_search_key_field", "db_key")
+        # dbid: (key, (alias, alias, ...)), or None if not yet built
+        self.entries = None
+        # name: set(dbid, ...) and sorted list of all names
+        self.name_ids = {}
+        self.sorted_names = []
+        # the same for the single words of all names
+        self.word_ids = {}
+        self.sorted_words = []
+
+    def __len__(self):
+        return len(self.entries) if self.entries is not None else 0
+
+    def _get_names(self, entry):
+        "Get all names of an entry as a set"
+        if not entry:
+            return set()
+        names = set(entry[1])
+        if entry[0]:
+            names.add(entry[0])
+        return names
+
+    def _link(self, mapping, sortedlist, dbid, names):
+        "Add dbid to the given names"
+        for name in names:
+            ids = mapping.get(name)
+            if ids is None:
+                ids = mapping[name] = set()
+                insort(sortedlist, name)
+            ids.add(dbid)
+
+    def _unlink(self, mapping, sortedlist, dbid, names):
+        "Remove dbid from the given names"
+        for name in names:
+            ids = mapping.get(name)
+            if ids is None:
+                continue
+            ids.discard(dbid)
+            if not ids:
+                del mapping[name]
+                del sortedlist[bisect_left(sortedlist, name)]
+
+    def _set_entry(self, dbid, entry):
+        """
+        Store or replace the entry of an entity.
+
+        Args:
+            dbid (int): The id of the entity.
+            entry (tuple or None): The new `(key, aliases)`, or None to
+                remove the entity.
+
+        """
+        old_names = self._get_names(self.entries.get(dbid))
+        new_names = self._get_names(entry)
+        old_words = set(word for name in old_names for word in name.split())
+        new_words = set(word for name in new_names for word in name.split())
+        self._unlink(self.name_ids, self.sorted_names, dbid, old_names - new_names)
+        self._link(self.name_ids, self.sorted_names, dbid, new_names - old_names)
+        self._unlink(self.word_ids, self.sorted_words, dbid, old_words - new_words)
+        self._link(self.word_ids, self.sorted_words, dbid, new_words - old_words)
+        if entry:
+            self.entries[dbid] = entry
+        else:
+            self.entries.pop(dbid, None)
+
+    def rebuild(self):
+        """
+        (Re-)build the index from the database.
+
+        """
+        model = self.model
+        aliases = {}
+        through = model.db_tags.through.objects.filter(tag__db_tagtype="alias")
+        for dbid, alias in through.values_list("%s__id" % model.__name__.lower(),
+                                               "tag__db_key").iterator():
+            if alias:
+                aliases.setdefault(dbid, []).append(alias.lower())
+        self.entries = {}
+        self.name_ids, self.sorted_names = {}, []
+        self.word_ids, self.sorted_words = {}, []
+        for dbid, key in model.objects.values_list("id", self.key_field).iterator():
+            self._set_entry(dbid, ((key or "").lower(), tuple(aliases.get(dbid, ()))))
+
+    def update(self, dbid, key=None, aliases=None):
+        """
+        Update the names of an entity. Does nothing if the index has
+        not been built yet.
+
+        Args:
+            dbid (int): The id of the entity.
+            key (str, optional): The new key, if it changed.
+            aliases (list, optional): All aliases of the entity, if
+                they changed.
+
+        """
+        if self.entries is None or not dbid:
+            return
+        old_key, old_aliases = self.entries.get(dbid, ("", ()))
+        key = key.lower() if key is not None else old_key
+        aliases = tuple(alias.lower() for alias in aliases) if aliases is not None else old_aliases
+        self._set_entry(dbid, (key, aliases))
+
+    def remove(self, dbid):
+        """
+        Remove an entity from the index.
+
+        Args:
+            dbid (int): The id of the entity.
+
+        """
+        if self.entries is not None:
+            self._set_entry(dbid, None)
+
+    def exact(self, string):
+        """
+        Find entities with a key or alias matching exactly (but not
+        case-sensitively).
+
+        Args:
+            string (str): The name to look for.
+
+        Returns:
+            dbids (set): The ids of the matching entities.
+
+        """
+        if self.entries is None:
+            self.rebuild()
+        return set(self.name_ids.get(string.strip().lower(), ()))
+
+    def _get_prefixed(self, mapping, sortedlist, prefix):
+        "Get the ids of all names starting with prefix"
+        dbids = set()
+        for ind in range(bisect_left(sortedlist, prefix), len(sortedlist)):
+            name = sortedlist[ind]
+            if not name.startswith(prefix):
+                break
+            dbids.update(mapping[name])
+        return dbids
+
+    def prefix(self, string):
+        """
+        Find entities with a key or alias starting with the given
+        string (not case-sensitive).
+
+        Args:
+            string (str): The start of the name.
+
+        Returns:
+            dbids (set): The ids of the matching entities.
+
+        """
+        if self.entries is None:
+            self.rebuild()
+        return self._get_prefixed(self.name_ids, self.sorted_names, string.strip().lower())
+
+    def word_prefix(self, string):
+        """
+        Find entities with a key or alias where each word of `string`
+        starts a word of the name, like "bi sw" for "big shiny sword".
+        Word order is not checked; use
+        `evennia.utils.utils.string_partial_matching` on the result
+        for that.
+
+        Args:
+            string (str): Space-separated word starts.
+
+        Returns:
+            dbids (set): The ids of the matching entities.
+
+        """
+        if self.entries is None:
+            self.rebuild()
+        dbids = None
+        for word in string.lower().split():
+            matches = self._get_prefixed(self.word_ids, self.sorted_words, word)
+            dbids = matches if dbids is None else dbids & matches
+            if not dbids:
+                break
+        return dbids or set()
+
+
+def get_search_index(model, build=True):
+    """
+    Get the search index of a database model.
+
+    Args:
+        model (class or instance): The database model or typeclass, or
+            an instance of one.
+        build (bool, optional): Create the index if it does not exist.
+            The index is filled from the database on its first use.
+
+    Returns:
+        index (SearchIndex or None): The index, or None if `build` is
+            unset and there is no index yet.
+
+    """
+    model = model.__dbclass__
+    index = _INDEXES.get(model)
+    if index is None and build:
+        index = _INDEXES[model] = SearchIndex(model)
+    return index
@@ -14,6 +14,7 @@ from builtins import object
 from django.conf import settings
 from django.db import models
 from evennia.utils.utils import to_str, make_iter
+from evennia.typeclasses.searchindex import get_search_index
 
 
 _TYPECLASS_AGGRESSIVE_CACHE = settings.TYPECLASS_AGGRESSIVE_CACHE
@@ -107,9 +108,9 @@ class TagHandler(object):
         query = {"%s__id" % self._model : self._objid,
                  "tag__db_tagtype" : self._tagtype}
         tags = [conn.tag for conn in getattr(self.obj, self._m2m_fieldname).through.objects.filter(**query)]
-        self._cache = dict(("%s-%s" % (to_str(tag.db_key).lower(),
-                                       tag.db_category.lower() if tag.db_category else None),
-                            tag) for tag in tags)
+        self._cache = dict(((to_str(tag.db_key).lower(),
+                             tag.db_category.lower() if tag.db_category else None), tag)
+                           for tag in tags)
         self._cache_complete = True
 
     def _getcache(self, key=None, category=None):
@@ -138,7 +139,7 @@ class TagHandler(object):
         key = key.strip().lower() if key else None
         category = category.strip().lower() if category else None
         if key:
-            cachekey = "%s-%s" % (key, category)
+            cachekey = (key, category)
             tag = _TYPECLASS_AGGRESSIVE_CACHE and self._cache.get(cachekey, None)
             if tag:
                 return [tag]  # return cached entity
@@ -156,9 +157,8 @@ class TagHandler(object):
             # only category given (even if it's None) - we can't
             # assume the cache to be complete unless we have queried
             # for this category before
-            catkey = "-%s" % category
-            if _TYPECLASS_AGGRESSIVE_CACHE and catkey in self._catcache:
-                return [tag for key, tag in self._cache.items() if key.endswith(catkey)]
+            if _TYPECLASS_AGGRESSIVE_CACHE and category in self._catcache:
+                return [tag for cachekey, tag in self._cache.items() if cachekey[1] == category]
             else:
                 # we have to query to make this category up-date in the cache
                 query = {"%s__id" % self._model : self._objid,
@@ -167,10 +167,9 @@ class TagHandler(object):
                 tags = [conn.tag for conn in getattr(self.obj,
                             self._m2m_fieldname).through.objects.filter(**query)]
                 for tag in tags:
-                    cachekey = "%s-%s" % (tag.db_key, category)
-                    self._cache[cachekey] = tag
+                    self._cache[(to_str(tag.db_key).lower(), category)] = tag
                 # mark category cache as up-to-date
-                self._catcache[catkey] = True
+                self._catcache[category] = True
                 return tags
         return []
 
@@ -186,11 +185,9 @@ class TagHandler(object):
         """
         if not key: # don't allow an empty key in cache
             return
-        cachekey = "%s-%s" % (key, category)
-        catkey = "-%s" % category
-        self._cache[cachekey] = tag_obj
+        self._cache[(key, category)] = tag_obj
         # mark that the category cache is no longer up-to-date
-        self._catcache.pop(catkey, None)
+        self._catcache.pop(category, None)
         self._cache_complete = False
 
     def _delcache(self, key, category):
@@ -202,14 +199,13 @@ class TagHandler(object):
             category (str or None): A cleaned category name
 
         """
-        catkey = "-%s" % category
         if key:
-            cachekey = "%s-%s" % (key, category)
-            self._cache.pop(cachekey, None)
+            self._cache.pop((key, category), None)
         else:
-            [self._cache.pop(key, None) for key in self._cache if key.endswith(catkey)]
+            self._cache = dict((cachekey, tag) for cachekey, tag in self._cache.items()
+                               if cachekey[1] != category)
         # mark that the category cache is no longer up-to-date
-        self._catcache.pop(catkey, None)
+        self._catcache.pop(category, None)
         self._cache_complete = False
 
     def reset_cache(self):
@@ -340,7 +336,13 @@ class TagHandler(object):
         """
         if not self._cache_complete:
             self._fullcache()
-        tags = sorted(self._getcache(None, category), key=lambda o:o.id)
+        if _TYPECLASS_AGGRESSIVE_CACHE:
+            # the full cache holds all categories
+            category = category.strip().lower() if category else None
+            tags = [tag for cachekey, tag in self._cache.items() if cachekey[1] == category]
+        else:
+            tags = self._getcache(None, category)
+        tags = sorted(tags, key=lambda o:o.id)
         if return_key_and_category:
                 # return tuple (key, category)
             return [(to_str(tag.db_key), to_str(tag.db_category)) for tag in tags]
@@ -357,11 +359,47 @@ class TagHandler(object):
 
 class AliasHandler(TagHandler):
     """
-    A handler for the Alias Tag type.
+    A handler for the Alias Tag type. This also keeps the search
+    index of the object's model up to date.
 
     """
     _tagtype = "alias"
 
+    def search_names(self):
+        """
+        Get the aliases of every category, as the search index
+        stores them.
+
+        Returns:
+            aliases (list): The alias keys, ordered by creation.
+
+        """
+        if not self._cache_complete:
+            self._fullcache()
+        tags = sorted(self._cache.values(), key=lambda o: o.id)
+        return [to_str(tag.db_key) for tag in tags]
+
+    def _update_search_index(self):
+        "Update the aliases in the search index, if there is one"
+        index = get_search_index(self.obj, build=False)
+        if index is not None:
+            index.update(self._objid, aliases=self.search_names())
+
+    def add(self, tag=None, category=None, data=None):
+        "Add aliases. See `TagHandler.add`."
+        super(AliasHandler, self).add(tag, category=category, data=data)
+        self._update_search_index()
+
+    def remove(self, key, category=None):
+        "Remove aliases. See `TagHandler.remove`."
+        super(AliasHandler, self).remove(key, category=category)
+        self._update_search_index()
+
+    def clear(self, category=None):
+        "Remove all aliases. See `TagHandler.clear`."
+        super(AliasHandler, self).clear(category=category)
+        self._update_search_index()
+
 
 class PermissionHandler(TagHandler):
     """
@@ -28,6 +28,8 @@ _GA = object.__getattribute__
 _SA = object.__setattr__
 _DA = object.__delattr__
 _MONITOR_HANDLER = None
+# class: {fieldname: hookname}
+_POSTSAVE_HOOKS = {}
 
 # References to db-updated objects are stored here so the
 # main process can be informed to re-cache itself.
@@ -82,6 +84,9 @@ class SharedMemoryModelBase(ModelBase):
         if not hasattr(dbmodel, "__instance_cache__"):
             # we store __instance_cache__ only on the dbmodel base
             dbmodel.__instance_cache__ = {}
+            # bumped whenever instances are flushed from the cache, so
+            # caches holding on to instances know to refresh them
+            dbmodel.__flush_count__ = 0
         super(SharedMemoryModelBase, cls)._prepare()
 
     def __new__(cls, name, bases, attrs):
@@ -292,6 +297,7 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
         try:
             if force or cls.at_idmapper_flush():
                 del cls.__dbclass__.__instance_cache__[key]
+                cls.__dbclass__.__flush_count__ += 1
             else:
                 cls._dbclass__.__instance_cache__[key].refresh_from_db()
         except KeyError:
@@ -321,6 +327,7 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
         else:
             cls.__dbclass__.__instance_cache__ = dict((key, obj) for key, obj in cls.__dbclass__.__instance_cache__.items()
                                                       if not obj.at_idmapper_flush())
+        cls.__dbclass__.__flush_count__ += 1
     #flush_instance_cache = classmethod(flush_instance_cache)
 
     # per-instance methods
@@ -346,7 +353,9 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
         pk = self._get_pk_val()
         if pk:
             if force or self.at_idmapper_flush():
-                self.__class__.__dbclass__.__instance_cache__.pop(pk, None)
+                dbclass = self.__class__.__dbclass__
+                if dbclass.__instance_cache__.pop(pk, None) is not None:
+                    dbclass.__flush_count__ += 1
 
     def delete(self, *args, **kwargs):
         """
@@ -357,6 +366,29 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
         self._is_deleted = True
         super(SharedMemoryModel, self).delete(*args, **kwargs)
 
+    @classmethod
+    def get_postsave_hooks(cls):
+        """
+        Get the field-update hooks defined on this class. A hook must be
+        named exactly `at_<fieldname>_postsave`. The result is cached
+        per class.
+
+        Returns:
+            hooks (dict): Maps field names to the names of their hooks.
+                Fields without a hook are not included.
+
+        """
+        try:
+            return _POSTSAVE_HOOKS[cls]
+        except KeyError:
+            hooks = {}
+            for field in cls._meta.fields:
+                hookname = "at_%s_postsave" % field.name
+                if callable(getattr(cls, hookname, None)):
+                    hooks[field.name] = hookname
+            _POSTSAVE_HOOKS[cls] = hooks
+            return hooks
+
     def save(self, *args, **kwargs):
         """
         Central database save operation.
@@ -370,7 +402,7 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
         """
         global _MONITOR_HANDLER
         if not _MONITOR_HANDLER:
-            from evennia.scripts.monitorhandler import MONITOR_HANDLER as _MONITORHANDLER
+            from evennia.scripts.monitorhandler import MONITOR_HANDLER as _MONITOR_HANDLER
 
         if _IS_SUBPROCESS:
             # we keep a store of objects modified in subprocesses so
@@ -388,23 +420,23 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
                 super(SharedMemoryModel, cls).save(*args, **kwargs)
             callFromThread(_save_callback, self, *args, **kwargs)
 
-        # update field-update hooks and eventual OOB watchers
-        new = False
-        if "update_fields" in kwargs and kwargs["update_fields"]:
-            # get field objects from their names
-            update_fields = (self._meta.get_field(fieldname)
-                             for fieldname in kwargs.get("update_fields"))
-        else:
-            # meta.fields are already field objects; get them all
-            new =True
-            update_fields = self._meta.fields
-        for field in update_fields:
-            fieldname = field.name
-            # trigger eventual monitors
-            _MONITORHANDLER.at_update(self, fieldname)
-            # if a hook is defined it must be named exactly on this form
-            hookname = "at_%s_postsave" % fieldname
-            if hasattr(self, hookname) and callable(_GA(self, hookname)):
+        # update field-update hooks and eventual OOB watchers. Most
+        # objects have neither, so we check that first.
+        hooks = self.get_postsave_hooks()
+        monitored = self.pk is not None and self in _MONITOR_HANDLER.monitors
+        if not (hooks or monitored):
+            return
+        update_fields = kwargs.get("update_fields")
+        new = not update_fields
+        if new:
+            # get all field names
+            update_fields = (field.name for field in self._meta.fields)
+        for fieldname in update_fields:
+            if monitored:
+                # trigger eventual monitors
+                _MONITOR_HANDLER.at_update(self, fieldname)
+            hookname = hooks.get(fieldname)
+            if hookname:
                 _GA(self, hookname)(new)
 
 #            # if a trackerhandler is set on this object, update it with the
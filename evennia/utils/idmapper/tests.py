@@ -2,9 +2,12 @@ from __future__ import absolute_import
 from builtins import range
 
 from django.test import TestCase
+from mock import patch
 
 from .models import SharedMemoryModel
 from django.db import models
+from evennia.objects.models import ObjectDB
+from evennia.scripts.monitorhandler import MONITOR_HANDLER
 
 class Category(SharedMemoryModel):
     name = models.CharField(max_length=32)
@@ -72,3 +75,24 @@ class SharedMemorysTest(TestCase):
         self.assertEquals(pk not in Article.__instance_cache__, True)
 
 
+class TestPostsaveDispatch(TestCase):
+    "Check that postsave hooks and monitors are only called when needed"
+    def test_postsave_hooks(self):
+        self.assertEqual(ObjectDB.get_postsave_hooks(), {"db_location": "at_db_location_postsave",
+                                                         "db_destination": "at_db_destination_postsave",
+                                                         "db_sessid": "at_db_sessid_postsave",
+                                                         "db_lock_storage": "at_db_lock_storage_postsave",
+                                                         "db_key": "at_db_key_postsave"})
+        self.assertEqual(Category.get_postsave_hooks(), {})
+
+    def test_monitor_dispatch(self):
+        category = Category.objects.create(name="Monitored")
+        with patch.object(MONITOR_HANDLER, "at_update") as at_update:
+            category.save()
+            self.assertFalse(at_update.called)
+            MONITOR_HANDLER.monitors[category]["name"][""] = (None, False, {})
+            try:
+                category.save(update_fields=["name"])
+            finally:
+                del MONITOR_HANDLER.monitors[category]
+            at_update.assert_called_once_with(category, "name")
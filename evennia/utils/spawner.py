@@ -78,9 +78,15 @@ The *goblin archwizard* will have some different attacks, but will
 otherwise have the same spells as a *goblin wizard* who in turn shares
 many traits with a normal *goblin*.
 
+The prototypes of the prototype modules are loaded into a shared
+`PrototypeRegistry`, which resolves and validates their inheritance
+only once. The modules are re-loaded if they change on disk.
+
 """
 from __future__ import print_function
 
+import os
+import imp
 import copy
 #TODO
 #sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -90,9 +96,14 @@ from django.conf import settings
 from random import randint
 import evennia
 from evennia.objects.models import ObjectDB
-from evennia.utils.utils import make_iter, all_from_module, dbid_to_obj
+from evennia.utils.utils import make_iter, all_from_module, dbid_to_obj, mod_import
 
 _CREATE_OBJECT_KWARGS = ("key", "location", "home", "destination")
+# prototype keys handled by create_object or by the object's handlers
+_SPECIAL_KWARGS = _CREATE_OBJECT_KWARGS + ("typeclass", "permissions", "locks",
+                                          "aliases", "tags", "exec", "prototype")
+# (modules,): PrototypeRegistry
+_REGISTRIES = {}
 
 _handle_dbref = lambda inp: dbid_to_obj(inp, ObjectDB)
 
@@ -117,24 +128,265 @@ def _validate_prototype(key, prototype, protparents, visited):
             _validate_prototype(protstring, protparent, protparents, visited)
 
 
-def _get_prototype(dic, prot, protparents):
+def _compile_prototype(prot):
     """
-    Recursively traverse a prototype dictionary, including multiple
-    inheritance. Use _validate_prototype before this, we don't check
-    for infinite recursion here.
+    Sort the keys of a prototype with resolved inheritance into the
+    arguments used when spawning it. Values are not evaluated, since
+    callables must be called anew for every spawned object.
+
+    Args:
+        prot (dict): A prototype without a `prototype` key.
+
+    Returns:
+        compiled (tuple): `(special, nattributes, attributes)`, where
+            `special` holds the keys of `_SPECIAL_KWARGS` found in
+            `prot`.
 
     """
-    if "prototype" in dic:
-        # move backwards through the inheritance
-        for prototype in make_iter(dic["prototype"]):
-            # Build the prot dictionary in reverse order, overloading
-            new_prot = _get_prototype(protparents.get(prototype, {}), prot, protparents)
-            prot.update(new_prot)
-    prot.update(dic)
-    prot.pop("prototype", None) # we don't need this anymore
-    return prot
-
-def _batch_create_object(*objparams):
+    special = dict((key, value) for key, value in prot.items() if key in _SPECIAL_KWARGS)
+    nattributes = dict((key.split("_", 1)[1], value)
+                       for key, value in prot.items() if key.startswith("ndb_"))
+    attributes = dict((key, value) for key, value in prot.items()
+                      if not (key in _SPECIAL_KWARGS or key.startswith("ndb_")))
+    return special, nattributes, attributes
+
+
+def _get_objparams(compiled):
+    """
+    Evaluate a compiled prototype into the arguments of
+    `_batch_create_object`.
+
+    Args:
+        compiled (tuple): A prototype compiled by `_compile_prototype`.
+
+    Returns:
+        objparams (tuple): The arguments for creating one object.
+
+    """
+    special, nattributes, attributes = compiled
+    # extract the keyword args we need to create the object itself. If we get a callable,
+    # call that to get the value (don't catch errors)
+    create_kwargs = {}
+    keyval = special.get("key", "Spawned Object %06i" % randint(1,100000))
+    create_kwargs["db_key"] = keyval() if callable(keyval) else keyval
+
+    locval  = special.get("location", None)
+    create_kwargs["db_location"] = locval() if callable(locval) else _handle_dbref(locval)
+
+    homval = special.get("home", settings.DEFAULT_HOME)
+    create_kwargs["db_home"] = homval() if callable(homval) else _handle_dbref(homval)
+
+    destval = special.get("destination", None)
+    create_kwargs["db_destination"] = destval() if callable(destval) else _handle_dbref(destval)
+
+    typval = special.get("typeclass", settings.BASE_OBJECT_TYPECLASS)
+    create_kwargs["db_typeclass_path"] = typval() if callable(typval) else typval
+
+    # extract calls to handlers
+    permval = special.get("permissions", "")
+    permission_string = permval() if callable(permval) else permval
+    lockval = special.get("locks", "")
+    lock_string = lockval() if callable(lockval) else lockval
+    aliasval = special.get("aliases", "")
+    alias_string =  aliasval() if callable(aliasval) else aliasval
+    tagval = special.get("tags", "")
+    tags = tagval() if callable(tagval) else tagval
+    exval = special.get("exec", "")
+    execs = make_iter(exval() if callable(exval) else exval)
+
+    # extract ndb assignments
+    nattributes = dict((key, value() if callable(value) else value)
+                       for key, value in nattributes.items())
+
+    # the rest are attributes
+    attributes = dict((key, value() if callable(value) else value)
+                      for key, value in attributes.items())
+
+    # pack for call into _batch_create_object
+    return (create_kwargs, permission_string, lock_string,
+            alias_string, nattributes, attributes, tags, execs)
+
+
+class PrototypeRegistry(object):
+    """
+    The prototype parents found in a set of prototype modules. The
+    inheritance of each parent is resolved and validated once, when
+    the registry is loaded, and the result is kept compiled so that
+    spawning only has to evaluate callable values.
+
+    The registry re-loads its modules when their source files change
+    on disk. It assumes the prototype dictionaries are not changed
+    in-place; call `reload()` after doing so.
+
+    """
+    def __init__(self, modules=(), prototype_parents=None):
+        """
+        Initialize the registry. It is loaded on first use.
+
+        Args:
+            modules (list, optional): Python-paths to prototype modules.
+            prototype_parents (dict, optional): Prototype parents to
+                add to (and overload) those found in the modules.
+
+        """
+        self.modules = tuple(make_iter(modules))
+        self.prototype_parents = prototype_parents or {}
+        # prototype key: prototype, or None if not yet loaded
+        self.protparents = None
+        # id(prototype): (prototype, compiled prototype), for the parents only
+        self.compiled = {}
+        self.parent_ids = set()
+        # prototype key: prototype with resolved inheritance
+        self.flattened = {}
+        # path: mtime of the module files
+        self.mtimes = {}
+
+    def _get_mtimes(self, paths):
+        "Get the modification time of the given files"
+        mtimes = {}
+        for path in paths:
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    def reload(self):
+        """
+        (Re-)load the prototype parents from the modules and validate
+        them. Modules changed on disk since the last load are
+        re-imported.
+
+        Raises:
+            RuntimeError: If a prototype inherits from itself or from
+                a prototype that does not exist.
+
+        """
+        protparents = {}
+        paths = []
+        for module in self.modules:
+            mod = mod_import(module)
+            if not mod:
+                continue
+            path = getattr(mod, "__file__", None)
+            if path:
+                path = path[:-1] if path.endswith(".pyc") else path
+                if path in self.mtimes and self.mtimes[path] != self._get_mtimes([path])[path]:
+                    mod = imp.reload(mod)
+                paths.append(path)
+            protparents.update(dict((key, val) for key, val in all_from_module(mod).items()
+                                    if isinstance(val, dict)))
+        # overload module's protparents with specifically given protparents
+        protparents.update(self.prototype_parents)
+        for key, prototype in protparents.items():
+            _validate_prototype(key, prototype, protparents, [])
+        self.protparents = protparents
+        self.parent_ids = set(id(prototype) for prototype in protparents.values())
+        self.compiled = {}
+        self.flattened = {}
+        self.mtimes = self._get_mtimes(paths)
+
+    def check(self):
+        """
+        Load the registry if it was not loaded yet, or re-load it if
+        any of its modules changed on disk.
+
+        """
+        if self.protparents is None or self._get_mtimes(self.mtimes) != self.mtimes:
+            self.reload()
+
+    def get_flattened(self, key):
+        """
+        Get a prototype parent with all its inheritance resolved.
+
+        Args:
+            key (str): The name of the prototype parent.
+
+        Returns:
+            prototype (dict): The prototype, including everything it
+                inherits, without a `prototype` key. This should not
+                be modified.
+
+        """
+        flattened = self.flattened.get(key)
+        if flattened is None:
+            flattened = self.flattened[key] = self.flatten(self.protparents.get(key, {}))
+        return flattened
+
+    def flatten(self, prototype):
+        """
+        Resolve the inheritance of a prototype. Parents further to the
+        right take precedence and the prototype itself overloads them
+        all.
+
+        Args:
+            prototype (dict): The prototype to resolve.
+
+        Returns:
+            prot (dict): A new dictionary with everything `prototype`
+                defines or inherits, without a `prototype` key.
+
+        """
+        prot = {}
+        for parent in make_iter(prototype.get("prototype", ())):
+            prot.update(self.get_flattened(parent))
+        prot.update(prototype)
+        prot.pop("prototype", None) # we don't need this anymore
+        return prot
+
+    def compile(self, prototype):
+        """
+        Get the compiled version of a prototype. Prototype parents of
+        the registry are only compiled once.
+
+        Args:
+            prototype (dict): A prototype to spawn. It can inherit from
+                any of the registry's prototype parents.
+
+        Returns:
+            compiled (tuple): See `_compile_prototype`.
+
+        Raises:
+            RuntimeError: If `prototype` inherits from a prototype that
+                does not exist.
+
+        """
+        compiled = self.compiled.get(id(prototype))
+        if compiled is not None and compiled[0] is prototype:
+            return compiled[1]
+        for parent in make_iter(prototype.get("prototype", ())):
+            if parent not in self.protparents:
+                raise RuntimeError("%s's prototype '%s' was not found." % (prototype, parent))
+        compiled = _compile_prototype(self.flatten(prototype))
+        if id(prototype) in self.parent_ids:
+            # keep a reference to the prototype so its id stays valid
+            self.compiled[id(prototype)] = (prototype, compiled)
+        return compiled
+
+
+def get_prototype_registry(modules=None):
+    """
+    Get the shared registry for a set of prototype modules.
+
+    Args:
+        modules (list, optional): Python-paths to prototype modules.
+            Defaults to `settings.PROTOTYPE_MODULES`.
+
+    Returns:
+        registry (PrototypeRegistry): The registry. It is loaded
+            on first use.
+
+    """
+    if modules is None:
+        modules = getattr(settings, "PROTOTYPE_MODULES", ())
+    modules = tuple(make_iter(modules))
+    registry = _REGISTRIES.get(modules)
+    if registry is None:
+        registry = _REGISTRIES[modules] = PrototypeRegistry(modules)
+    return registry
+
+
+def _batch_create_object(*objparams, **kwargs):
     """
     This is a cut-down version of the create_object() function,
     optimized for speed. It does NOT check and convert various input
@@ -144,17 +396,36 @@ def _batch_create_object(*objparams):
         objsparams (any): Aach argument should be a tuple of arguments
             for the respective creation/add handlers in the following
             order: (create, permissions, locks, aliases, nattributes,
-            attributes)
+            attributes, tags, execs)
+
+    Kwargs:
+        bulk (bool): Insert all objects, Tags and Attributes with a
+            few bulk queries using `ObjectDB.objects.batch_create_objects`
+            instead of saving each object separately.
+
     Returns:
         objects (list): A list of created objects
 
     """
-
-    # bulk create all objects in one go
-
-    # unfortunately this doesn't work since bulk_create doesn't creates pks;
-    # the result are double objects at the next stage
-    #dbobjs = _ObjectDB.objects.bulk_create(dbobjs)
+    if kwargs.get("bulk"):
+        objs = ObjectDB.objects.batch_create_objects(
+            [{"typeclass": objparam[0]["db_typeclass_path"],
+              "key": objparam[0]["db_key"],
+              "location": objparam[0]["db_location"],
+              "home": objparam[0]["db_home"],
+              "destination": objparam[0]["db_destination"],
+              "permissions": objparam[1],
+              "locks": objparam[2],
+              "aliases": objparam[3],
+              "nattributes": objparam[4],
+              "attributes": objparam[5],
+              "tags": objparam[6]} for objparam in objparams])
+        for obj, objparam in zip(objs, objparams):
+            # run eventual extra code
+            for code in objparam[7]:
+                if code:
+                    exec(code, {}, {"evennia": evennia, "obj": obj})
+        return objs
 
     dbobjs = [ObjectDB(**objparam[0]) for objparam in objparams]
     objs = []
@@ -194,76 +465,33 @@ def spawn(*prototypes, **kwargs):
             prototypes from prototype_modules.
         return_prototypes (bool): Only return a list of the
             prototype-parents (no object creation happens)
+        batch (bool): Create all objects with a few bulk database
+            queries instead of saving each separately. This is much
+            faster when spawning many objects at once.
     """
 
-    protparents = {}
-    protmodules = make_iter(kwargs.get("prototype_modules", []))
-    if not protmodules and hasattr(settings, "PROTOTYPE_MODULES"):
-        protmodules = make_iter(settings.PROTOTYPE_MODULES)
-    for prototype_module in protmodules:
-        protparents.update(dict((key, val)
-                for key, val in all_from_module(prototype_module).items() if isinstance(val, dict)))
-    #overload module's protparents with specifically given protparents
-    protparents.update(kwargs.get("prototype_parents", {}))
-    for key, prototype in protparents.items():
-        _validate_prototype(key, prototype, protparents, [])
+    protmodules = make_iter(kwargs.get("prototype_modules", [])) or None
+    if kwargs.get("prototype_parents"):
+        # custom parents are not shared between calls
+        registry = PrototypeRegistry(protmodules if protmodules is not None else
+                                     getattr(settings, "PROTOTYPE_MODULES", ()),
+                                     prototype_parents=kwargs["prototype_parents"])
+    else:
+        registry = get_prototype_registry(protmodules)
+    registry.check()
 
     if "return_prototypes" in kwargs:
         # only return the parents
-        return copy.deepcopy(protparents)
+        return copy.deepcopy(registry.protparents)
 
     objsparams = []
     for prototype in prototypes:
-
-        _validate_prototype(None, prototype, protparents, [])
-        prot = _get_prototype(prototype, {}, protparents)
-        if not prot:
+        compiled = registry.compile(prototype)
+        if not any(compiled):
             continue
+        objsparams.append(_get_objparams(compiled))
 
-        # extract the keyword args we need to create the object itself. If we get a callable,
-        # call that to get the value (don't catch errors)
-        create_kwargs = {}
-        keyval = prot.pop("key", "Spawned Object %06i" % randint(1,100000))
-        create_kwargs["db_key"] = keyval() if callable(keyval) else keyval
-
-        locval  = prot.pop("location", None)
-        create_kwargs["db_location"] = locval() if callable(locval) else _handle_dbref(locval)
-
-        homval = prot.pop("home", settings.DEFAULT_HOME)
-        create_kwargs["db_home"] = homval() if callable(homval) else _handle_dbref(homval)
-
-        destval = prot.pop("destination", None)
-        create_kwargs["db_destination"] = destval() if callable(destval) else _handle_dbref(destval)
-
-        typval = prot.pop("typeclass", settings.BASE_OBJECT_TYPECLASS)
-        create_kwargs["db_typeclass_path"] = typval() if callable(typval) else typval
-
-        # extract calls to handlers
-        permval = prot.pop("permissions", "")
-        permission_string = permval() if callable(permval) else permval
-        lockval = prot.pop("locks", "")
-        lock_string = lockval() if callable(lockval) else lockval
-        aliasval = prot.pop("aliases", "")
-        alias_string =  aliasval() if callable(aliasval) else aliasval
-        tagval = prot.pop("tags", "")
-        tags = tagval() if callable(tagval) else tagval
-        exval = prot.pop("exec", "")
-        execs = make_iter(exval() if callable(exval) else exval)
-
-        # extract ndb assignments
-        nattributes = dict((key.split("_", 1)[1], value() if callable(value) else value)
-                            for key, value in prot.items() if key.startswith("ndb_"))
-
-        # the rest are attributes
-        attributes = dict((key, value() if callable(value) else value)
-                           for key, value in prot.items()
-                           if not (key in _CREATE_OBJECT_KWARGS or key.startswith("ndb_")))
-
-        # pack for call into _batch_create_object
-        objsparams.append( (create_kwargs, permission_string, lock_string,
-                            alias_string, nattributes, attributes, tags, execs) )
-
-    return _batch_create_object(*objsparams)
+    return _batch_create_object(*objsparams, bulk=kwargs.get("batch", False))
 
 
 if __name__ == "__main__":
@@ -356,3 +356,73 @@ class TestEvForm(TestCase):
         # note that in a msg() call, the result would be the  correct |-----,
         # in a print, ansi only gets called once, so ||----- is the result
         self.assertEqual(unicode(evform.EvForm(form={"FORM":"\n||-----"})), "||-----")
+
+from evennia.utils import txws
+
+class TestTxws(TestCase):
+    "Test the websocket frame codec"
+    def _client_frame(self, payload, key="abcd"):
+        # masked text frame, as sent by a browser
+        return "\x81%s%s%s" % (chr(0x80 | len(payload)), key, txws.mask(payload, key))
+
+    def test_mask(self):
+        self.assertEqual(txws.mask("\x00\x01\x02\x03\x04", "\x01\x01\x01\x01"),
+                         "\x01\x00\x03\x02\x05")
+        self.assertEqual(txws.mask(txws.mask("Hello world", "wxyz"), "wxyz"), "Hello world")
+        self.assertEqual(txws.mask("", "wxyz"), "")
+
+    def test_parse_hybi07_frames(self):
+        frames, rest = txws.parse_hybi07_frames(self._client_frame("look") + "\x81")
+        self.assertEqual(frames, [(txws.NORMAL, "look")])
+        self.assertEqual(rest, "\x81")
+
+    def test_parse_hybi07_buffer(self):
+        data = self._client_frame("look") + self._client_frame("get sword")
+        buf = bytearray(data[:-3])
+        frames, consumed = txws.parse_hybi07_buffer(buf)
+        self.assertEqual(frames, [(txws.NORMAL, "look")])
+        del buf[:consumed]
+        buf.extend(data[-3:])
+        frames, consumed = txws.parse_hybi07_buffer(buf)
+        self.assertEqual(frames, [(txws.NORMAL, "get sword")])
+        self.assertEqual(consumed, len(buf))
+
+    def test_make_hybi07_frame(self):
+        self.assertEqual(txws.make_hybi07_frame("look"), "\x81\x04look")
+        self.assertEqual(txws.make_hybi07_header(300), "\x81\x7e\x01\x2c")
+
+
+from evennia.utils import spawner
+
+class TestPrototypeRegistry(TestCase):
+    "Test resolving and compiling prototype inheritance"
+    def setUp(self):
+        self.parents = {
+            "GOBLIN": {"key": "goblin", "health": 20, "attacks": ["fists"], "ndb_angry": True},
+            "WIZARD": {"key": "wizard", "spells": ["fire ball"], "locks": "get:false()"},
+            "GOBLIN_WIZARD": {"prototype": ("GOBLIN", "WIZARD"), "key": "goblin wizard"}}
+        self.registry = spawner.PrototypeRegistry(prototype_parents=self.parents)
+        self.registry.check()
+
+    def test_flatten(self):
+        self.assertEqual(self.registry.get_flattened("GOBLIN_WIZARD"),
+                         {"key": "goblin wizard", "health": 20, "attacks": ["fists"],
+                          "spells": ["fire ball"], "locks": "get:false()", "ndb_angry": True})
+        self.assertEqual(self.registry.flatten({"prototype": "GOBLIN", "health": 5})["health"], 5)
+
+    def test_compile(self):
+        compiled = self.registry.compile(self.parents["GOBLIN_WIZARD"])
+        self.assertTrue(self.registry.compile(self.parents["GOBLIN_WIZARD"]) is compiled)
+        special, nattributes, attributes = compiled
+        self.assertEqual(special, {"key": "goblin wizard", "locks": "get:false()"})
+        self.assertEqual(nattributes, {"angry": True})
+        self.assertEqual(sorted(attributes), ["attacks", "health", "spells"])
+        counter = iter(range(10))
+        objparams = spawner._get_objparams(spawner._compile_prototype(
+            {"key": lambda: "goblin %i" % next(counter), "home": lambda: None}))
+        self.assertEqual(objparams[0]["db_key"], "goblin 0")
+        self.assertRaises(RuntimeError, self.registry.compile, {"prototype": "ORC"})
+
+    def test_validate(self):
+        self.parents["GOBLIN"]["prototype"] = "GOBLIN_WIZARD"
+        self.assertRaises(RuntimeError, self.registry.reload)
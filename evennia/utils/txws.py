@@ -29,7 +29,7 @@ __version__ = "0.7.1"
 from base64 import b64encode, b64decode
 from hashlib import md5, sha1
 from string import digits
-from struct import pack, unpack
+from struct import pack, unpack, unpack_from
 
 from twisted.internet.interfaces import ISSLTransport
 from twisted.protocols.policies import ProtocolWrapper, WrappingFactory
@@ -76,6 +76,9 @@ opcode_types = {
     0xa: PONG,
 }
 
+# Opcodes of the data frames we send.
+TEXT_OPCODE, BINARY_OPCODE = 0x1, 0x2
+
 encoders = {
     "base64": b64encode,
 }
@@ -84,6 +87,10 @@ decoders = {
     "base64": b64decode,
 }
 
+# Translation tables for XORing bytes with a given key byte, used for masking.
+_XOR_TABLES = [bytes(bytearray(char ^ keychar for char in range(256)))
+               for keychar in range(256)]
+
 # Fake HTTP stuff, and a couple convenience methods for examining fake HTTP
 # headers.
 
@@ -195,15 +202,37 @@ def mask(buf, key):
     """
     Mask or unmask a buffer of bytes with a masking key.
 
-    The key must be exactly four bytes long.
+    The key must be exactly four bytes long. The buffer may be a str,
+    bytearray or memoryview.
     """
 
     # This is super-secure, I promise~
-    key = [ord(i) for i in key]
-    buf = list(buf)
-    for i, char in enumerate(buf):
-        buf[i] = chr(ord(char) ^ key[i % 4])
-    return "".join(buf)
+    # Every fourth byte is XORed with the same key byte, so we XOR each
+    # of the four strides in one go with a translation table. This keeps
+    # all the per-byte work in C.
+    key = bytearray(key)
+    buf = bytearray(buf)
+    for i in range(4):
+        buf[i::4] = buf[i::4].translate(_XOR_TABLES[key[i]])
+    return bytes(buf)
+
+def make_hybi07_header(length, opcode=0x1):
+    """
+    Make the header of a HyBi-07 frame with a payload of the given length.
+
+    The header is always for an unmasked frame, using the smallest possible
+    length field.
+    """
+
+    if length > 0xffff:
+        length = "\x7f%s" % pack(">Q", length)
+    elif length > 0x7d:
+        length = "\x7e%s" % pack(">H", length)
+    else:
+        length = chr(length)
+
+    # Always make a normal packet.
+    return "%s%s" % (chr(0x80 | opcode), length)
 
 def make_hybi07_frame(buf, opcode=0x1):
     """
@@ -213,52 +242,61 @@ def make_hybi07_frame(buf, opcode=0x1):
     smallest possible lengths.
     """
 
-    if len(buf) > 0xffff:
-        length = "\x7f%s" % pack(">Q", len(buf))
-    elif len(buf) > 0x7d:
-        length = "\x7e%s" % pack(">H", len(buf))
-    else:
-        length = chr(len(buf))
+    return "%s%s" % (make_hybi07_header(len(buf), opcode), buf)
 
-    # Always make a normal packet.
-    header = chr(0x80 | opcode)
-    frame = "%s%s%s" % (header, length, buf)
-    return frame
-
-def make_hybi07_frame_dwim(buf):
+def hybi07_payload_dwim(buf):
     """
-    Make a HyBi-07 frame with binary or text data according to the type of buf.
+    Get the payload and opcode of a HyBi-07 frame with binary or text data
+    according to the type of buf.
     """
 
-    # TODO: eliminate magic numbers.
     if isinstance(buf, str):
-        return make_hybi07_frame(buf, opcode=0x2)
+        return buf, BINARY_OPCODE
     elif isinstance(buf, unicode):
-        return make_hybi07_frame(buf.encode("utf-8"), opcode=0x1)
+        return buf.encode("utf-8"), TEXT_OPCODE
     else:
         raise TypeError("In binary support mode, frame data must be either str or unicode")
 
+def make_hybi07_frame_dwim(buf):
+    """
+    Make a HyBi-07 frame with binary or text data according to the type of buf.
+    """
+
+    payload, opcode = hybi07_payload_dwim(buf)
+    return make_hybi07_frame(payload, opcode=opcode)
+
 def parse_hybi07_frames(buf):
     """
     Parse HyBi-07 frames in a highly compliant manner.
     """
 
+    frames, consumed = parse_hybi07_buffer(bytearray(buf))
+    return frames, buf[consumed:]
+
+def parse_hybi07_buffer(buf):
+    """
+    Parse HyBi-07 frames from a bytearray, without copying it.
+
+    Returns the parsed frames and the number of bytes consumed from the
+    start of the buffer. The caller is responsible for removing these.
+    """
+
     start = 0
     frames = []
+    view = memoryview(buf)
+    buflen = len(buf)
 
     while True:
         # If there's not at least two bytes in the buffer, bail.
-        if len(buf) - start < 2:
+        if buflen - start < 2:
             break
 
         # Grab the header. This single byte holds some flags nobody cares
         # about, and an opcode which nobody cares about.
-        header = ord(buf[start])
+        header = buf[start]
         if header & 0x70:
             # At least one of the reserved flags is set. Pork chop sandwiches!
             raise WSException("Reserved flag in HyBi-07 frame (%d)" % header)
-            frames.append(("", CLOSE))
-            return frames, buf
 
         # Get the opcode, and translate it to a local enum which we actually
         # care about.
@@ -270,7 +308,7 @@ def parse_hybi07_frames(buf):
 
         # Get the payload length and determine whether we need to look for an
         # extra length.
-        length = ord(buf[start + 1])
+        length = buf[start + 1]
         masked = length & 0x80
         length &= 0x7f
 
@@ -281,14 +319,13 @@ def parse_hybi07_frames(buf):
 
         # Extra length fields.
         if length == 0x7e:
-            if len(buf) - start < 4:
+            if buflen - start < 4:
                 break
 
-            length = buf[start + 2:start + 4]
-            length = unpack(">H", length)[0]
+            length = unpack_from(">H", buf, start + 2)[0]
             offset += 2
         elif length == 0x7f:
-            if len(buf) - start < 10:
+            if buflen - start < 10:
                 break
 
             # Protocol bug: The top bit of this long long *must* be cleared;
@@ -296,24 +333,25 @@ def parse_hybi07_frames(buf):
             # fucking stupid, if you don't mind me saying so, and so we're
             # interpreting it as unsigned anyway. If you wanna send exabytes
             # of data down the wire, then go ahead!
-            length = buf[start + 2:start + 10]
-            length = unpack(">Q", length)[0]
+            length = unpack_from(">Q", buf, start + 2)[0]
             offset += 8
 
         if masked:
-            if len(buf) - (start + offset) < 4:
+            if buflen - (start + offset) < 4:
                 break
 
-            key = buf[start + offset:start + offset + 4]
+            key = view[start + offset:start + offset + 4].tobytes()
             offset += 4
 
-        if len(buf) - (start + offset) < length:
+        if buflen - (start + offset) < length:
             break
 
-        data = buf[start + offset:start + offset + length]
+        data = view[start + offset:start + offset + length]
 
         if masked:
             data = mask(data, key)
+        else:
+            data = data.tobytes()
 
         if opcode == CLOSE:
             if len(data) >= 2:
@@ -326,7 +364,7 @@ def parse_hybi07_frames(buf):
         frames.append((opcode, data))
         start += offset + length
 
-    return frames, buf[start:]
+    return frames, start
 
 class WebSocketProtocol(ProtocolWrapper):
     """
@@ -346,6 +384,8 @@ class WebSocketProtocol(ProtocolWrapper):
     def __init__(self, *args, **kwargs):
         ProtocolWrapper.__init__(self, *args, **kwargs)
         self.pending_frames = []
+        # receive buffer for HyBi-07+ frames, reused for the connection
+        self.framebuf = bytearray()
 
     def setBinaryMode(self, mode):
         """
@@ -412,15 +452,19 @@ class WebSocketProtocol(ProtocolWrapper):
         Find frames in incoming data and pass them to the underlying protocol.
         """
 
-        if self.flavor == HYBI00:
-            parser = parse_hybi00_frames
-        elif self.flavor in (HYBI07, HYBI10, RFC6455):
-            parser = parse_hybi07_frames
-        else:
-            raise WSException("Unknown flavor %r" % self.flavor)
-
         try:
-            frames, self.buf = parser(self.buf)
+            if self.flavor == HYBI00:
+                frames, self.buf = parse_hybi00_frames(self.buf)
+            elif self.flavor in (HYBI07, HYBI10, RFC6455):
+                if self.buf:
+                    # data left over from the handshake
+                    self.framebuf.extend(self.buf)
+                    self.buf = ""
+                frames, consumed = parse_hybi07_buffer(self.framebuf)
+                if consumed:
+                    del self.framebuf[:consumed]
+            else:
+                raise WSException("Unknown flavor %r" % self.flavor)
         except WSException as wse:
             # Couldn't parse all the frames, something went wrong, let's bail.
             self.close(wse.args[0])
@@ -451,22 +495,31 @@ class WebSocketProtocol(ProtocolWrapper):
             return
 
         if self.flavor == HYBI00:
-            maker = make_hybi00_frame
+            hybi07 = False
         elif self.flavor in (HYBI07, HYBI10, RFC6455):
-            if self.do_binary_frames:
-                maker = make_hybi07_frame_dwim
-            else:
-                maker = make_hybi07_frame
+            hybi07 = True
         else:
             raise WSException("Unknown flavor %r" % self.flavor)
 
+        # Build all frames as a sequence of headers and payloads, so the
+        # payloads need not be copied into a joined frame string.
+        packets = []
         for frame in self.pending_frames:
             # Encode the frame before sending it.
             if self.codec:
                 frame = encoders[self.codec](frame)
-            packet = maker(frame)
-            self.transport.write(packet)
+            if not hybi07:
+                packets.append(make_hybi00_frame(frame))
+                continue
+            if self.do_binary_frames:
+                frame, opcode = hybi07_payload_dwim(frame)
+            else:
+                opcode = TEXT_OPCODE
+            packets.append(make_hybi07_header(len(frame), opcode))
+            packets.append(frame)
         self.pending_frames = []
+        if packets:
+            self.transport.writeSequence(packets)
 
     def validateHeaders(self):
         """
@@ -541,6 +594,14 @@ class WebSocketProtocol(ProtocolWrapper):
         return True
 
     def dataReceived(self, data):
+        if self.state == FRAMES and self.flavor != HYBI00:
+            # fast path for an established HyBi-07+ connection
+            self.framebuf.extend(data)
+            self.parseFrames()
+            if self.pending_frames:
+                self.sendFrames()
+            return
+
         self.buf += data
 
         oldstate = None
@@ -880,6 +880,7 @@ def uses_database(name="sqlite3"):
     return engine == "django.db.backends.%s" % name
 
 
+_TASK_HANDLER = None
 def delay(delay, callback, *args, **kwargs):
     """
     Delay the return of a value.
@@ -890,17 +891,22 @@ def delay(delay, callback, *args, **kwargs):
         arguments after `delay` seconds.
       args (any, optional): Will be used as arguments to callback
     Kwargs:
+        persistent (bool): If set, the delayed call will survive a
+            server reload. The callback must then be a function in a
+            module or a method on a typeclassed entity, and all
+            arguments must be possible to pickle.
         any (any): Will be used to call the callback.
 
     Returns:
-        deferred (deferred): Will fire fire with callback after
-            `delay` seconds. Note that if `delay()` is used in the
-            commandhandler callback chain, the callback chain can be
-            defined directly in the command body and don't need to be
-            specified here.
+        task (TaskHandle): The scheduled task. This has a `cancel()`
+            method for aborting the call before it happens. See
+            `evennia.scripts.taskhandler`.
 
     """
-    return reactor.callLater(delay, callback, *args, **kwargs)
+    global _TASK_HANDLER
+    if not _TASK_HANDLER:
+        from evennia.scripts.taskhandler import TASK_HANDLER as _TASK_HANDLER
+    return _TASK_HANDLER.add(delay, callback, *args, **kwargs)
 
 
 _TYPECLASSMODELS = None